@@ -3,6 +3,13 @@ ASGI config for ParkEasy project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The project is deployed with it (see the Procfile): the async views
+(available_times, the listing search and map endpoints and the live update
+stream) then wait for the database and for events without holding a worker
+thread, while sync views keep running in threads. WEB_CONCURRENCY sets the
+number of workers; live updates reach all of them through the PostgreSQL
+broker (see LIVE_UPDATES_BROKER in settings).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
@@ -13,4 +20,10 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ParkEasy.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up
+from accounts.live import notify_disconnect  # noqa: E402
+
+# Ends the live update streams of closed pages
+application = notify_disconnect(django_application)
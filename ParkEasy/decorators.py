@@ -0,0 +1,36 @@
+"""
+Decorators for async views.
+
+Django 4.2's login_required calls the view it wraps synchronously, so it
+cannot wrap an async view, and loading request.user reads the session and
+the database, which must not run on the event loop.
+"""
+
+import functools
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+
+
+def _is_authenticated(request):
+    return request.user.is_authenticated
+
+
+async def is_authenticated(request):
+    """
+    Load request.user in a thread and return whether it is logged in. The
+    user is cached on the request, so reading it afterwards is safe.
+    """
+    return await sync_to_async(_is_authenticated)(request)
+
+
+def async_login_required(view):
+    """login_required for async views."""
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if await is_authenticated(request):
+            return await view(request, *args, **kwargs)
+        return redirect_to_login(request.get_full_path())
+
+    return wrapper
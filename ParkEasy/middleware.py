@@ -0,0 +1,212 @@
+"""
+Per-request instrumentation.
+
+RequestMetricsMiddleware records, for every request, the number of SQL
+queries and the time spent in them, the time spent rendering templates and
+the query shapes that were run more than once (the usual sign of an N+1
+pattern). The numbers are logged as one JSON line on the "ParkEasy.metrics"
+logger, tagged with the resolved URL name, and can be sent back as response
+headers while debugging.
+
+The middleware works in both WSGI and ASGI stacks, so async views are not
+forced through a thread by it.
+"""
+
+import functools
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import Template as DjangoTemplate
+
+logger = logging.getLogger("ParkEasy.metrics")
+
+# Requests running more queries than this are logged as warnings
+DEFAULT_QUERY_WARNING_THRESHOLD = 50
+
+# Number of repeated query shapes reported per request
+REPEATED_QUERY_LIMIT = 5
+
+_current_metrics = ContextVar("request_metrics", default=None)
+
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+
+def query_shape(sql):
+    """
+    Reduce a SQL statement to its shape so the same query run with different
+    parameters (or IN lists of different lengths) is counted together.
+    """
+    shape = _STRING_LITERAL.sub("?", sql)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _PLACEHOLDER_LIST.sub("(...)", shape)
+    return shape.replace("%s", "?")
+
+
+class RequestMetrics:
+    """Counters collected while one request is handled."""
+
+    def __init__(self):
+        self.url_name = None
+        self.query_count = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.total_time = 0.0
+        self.query_shapes = Counter()
+        self.rendering = False
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed as a database execute wrapper for the whole request
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.query_count += 1
+            self.query_shapes[query_shape(sql)] += 1
+
+    def repeated_queries(self, limit=REPEATED_QUERY_LIMIT):
+        """Return the most repeated query shapes as (shape, count) pairs."""
+        return [
+            (shape, count)
+            for shape, count in self.query_shapes.most_common(limit)
+            if count > 1
+        ]
+
+    def as_dict(self):
+        return {
+            "url_name": self.url_name,
+            "queries": self.query_count,
+            "db_ms": round(self.db_time * 1000, 2),
+            "template_ms": round(self.template_time * 1000, 2),
+            "total_ms": round(self.total_time * 1000, 2),
+            "repeated_queries": [
+                {"sql": shape, "count": count}
+                for shape, count in self.repeated_queries()
+            ],
+        }
+
+
+def _instrument_template_rendering():
+    """
+    Wrap the Django template backend's render() so the time spent in the
+    outermost template of a request is added to its metrics.
+    """
+    if getattr(DjangoTemplate.render, "records_metrics", False):
+        return
+    original_render = DjangoTemplate.render
+
+    @functools.wraps(original_render)
+    def render(self, context=None, request=None):
+        metrics = _current_metrics.get()
+        if metrics is None or metrics.rendering:
+            return original_render(self, context, request)
+        metrics.rendering = True
+        start = time.perf_counter()
+        try:
+            return original_render(self, context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - start
+            metrics.rendering = False
+
+    render.records_metrics = True
+    DjangoTemplate.render = render
+
+
+class RequestMetricsMiddleware:
+    """
+    Log SQL count, DB time, template time and repeated queries per request.
+
+    Settings:
+        REQUEST_METRICS_HEADERS: add X-Query-Count and Server-Timing headers
+            to responses (defaults to DEBUG).
+        REQUEST_METRICS_QUERY_WARNING: query count above which the request
+            is logged as a warning.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        _instrument_template_rendering()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                self.record_queries(stack, metrics)
+                response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        return self.finish(request, response, metrics, start)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        start = time.perf_counter()
+        stack = ExitStack()
+        try:
+            # Database connections belong to a thread, and an async request
+            # runs its queries in its own sync thread, so the wrappers are
+            # installed (and removed) there.
+            await sync_to_async(self.record_queries)(stack, metrics)
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            _current_metrics.reset(token)
+        return self.finish(request, response, metrics, start)
+
+    def record_queries(self, stack, metrics):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+
+    def finish(self, request, response, metrics, start):
+        metrics.total_time = time.perf_counter() - start
+
+        resolver_match = getattr(request, "resolver_match", None)
+        if resolver_match is not None:
+            metrics.url_name = resolver_match.view_name
+
+        self.log(metrics)
+        if getattr(settings, "REQUEST_METRICS_HEADERS", settings.DEBUG):
+            self.add_headers(response, metrics)
+        # Lets tests read the numbers off the test client's response
+        response.request_metrics = metrics
+        return response
+
+    def log(self, metrics):
+        threshold = getattr(
+            settings, "REQUEST_METRICS_QUERY_WARNING", DEFAULT_QUERY_WARNING_THRESHOLD
+        )
+        level = logging.WARNING if metrics.query_count > threshold else logging.INFO
+        if not logger.isEnabledFor(level):
+            return
+        data = metrics.as_dict()
+        logger.log(level, json.dumps(data), extra={"request_metrics": data})
+
+    def add_headers(self, response, metrics):
+        response["X-Query-Count"] = str(metrics.query_count)
+        response["Server-Timing"] = ", ".join(
+            [
+                f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.query_count} queries"',
+                f"template;dur={metrics.template_time * 1000:.2f}",
+                f"total;dur={metrics.total_time * 1000:.2f}",
+            ]
+        )
@@ -0,0 +1,98 @@
+"""
+Keyset ("seek") pagination for newest-first lists.
+
+Page-number pagination has to count every row and skip over all the earlier
+pages with OFFSET, which gets slower the further back a user pages. Keyset
+pagination instead remembers where the previous page stopped (the timestamp,
+usually created_at, and primary key of its last row) and asks the database for the rows that sort
+after it, which an index on (owner, -created_at) answers directly.
+
+Several querysets can be paged through together as one list, e.g. a user's
+notifications and the broadcasts they receive. Rows are ordered by
+(timestamp, source, pk), newest first, where source is the position of the
+queryset in the list, so rows with the same timestamp still have a stable
+order.
+"""
+
+import datetime as dt
+
+from django.db.models import Q
+
+_EPOCH = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+_MICROSECOND = dt.timedelta(microseconds=1)
+
+
+class KeysetPage:
+    """One page of rows, and the cursor of the page after it."""
+
+    def __init__(self, object_list, next_cursor, is_first):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.is_first = is_first
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def encode_cursor(timestamp, source, pk):
+    micros = (timestamp - _EPOCH) // _MICROSECOND
+    return f"{micros}.{source}.{pk}"
+
+
+def decode_cursor(cursor):
+    """Return (timestamp, source, pk), or None for a missing or bad cursor."""
+    try:
+        micros, source, pk = (int(part) for part in cursor.split("."))
+    except (AttributeError, ValueError):
+        return None
+    try:
+        timestamp = _EPOCH + micros * _MICROSECOND
+    except OverflowError:
+        return None
+    return timestamp, source, pk
+
+
+def _after(field, source, cursor):
+    """Filter for the rows of the given source that sort after the cursor."""
+    timestamp, cursor_source, pk = cursor
+    if source < cursor_source:
+        return Q(**{f"{field}__lte": timestamp})
+    if source > cursor_source:
+        return Q(**{f"{field}__lt": timestamp})
+    return Q(**{f"{field}__lt": timestamp}) | Q(**{field: timestamp, "pk__lt": pk})
+
+
+def keyset_page(querysets, cursor, per_page, field="created_at"):
+    """
+    Return the KeysetPage of rows from the given querysets that follows the
+    cursor (the first page when the cursor is missing or malformed). Rows
+    are ordered by the given non-null datetime field, which every queryset
+    must have; one query is run per queryset.
+    """
+    if not isinstance(querysets, (list, tuple)):
+        querysets = [querysets]
+    position = decode_cursor(cursor)
+
+    rows = []
+    for source, queryset in enumerate(querysets):
+        if position is not None:
+            queryset = queryset.filter(_after(field, source, position))
+        for obj in queryset.order_by(f"-{field}", "-pk")[: per_page + 1]:
+            rows.append(((getattr(obj, field), source, obj.pk), obj))
+    rows.sort(key=lambda row: row[0], reverse=True)
+
+    next_cursor = None
+    if len(rows) > per_page:
+        next_cursor = encode_cursor(*rows[per_page - 1][0])
+    return KeysetPage(
+        [obj for _, obj in rows[:per_page]], next_cursor, is_first=position is None
+    )
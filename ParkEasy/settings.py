@@ -56,6 +56,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "ParkEasy.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -80,16 +81,15 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
-                "messaging.context_processors.unread_messages_count",
-                "accounts.context_processors.notification_count",
-                "accounts.context_processors.verification_count",  # Add this line
-                "accounts.context_processors.report_count",  # Add this line
+                "accounts.context_processors.unread_counters",
+                "accounts.context_processors.live_updates",
             ],
         },
     },
 ]
 
 WSGI_APPLICATION = "ParkEasy.wsgi.application"
+ASGI_APPLICATION = "ParkEasy.asgi.application"
 
 
 # Database
@@ -119,6 +119,68 @@ else:
     }
 
 
+# Cache
+# Production workers share a database cache so that an invalidation made by
+# one worker is seen by all of them; local development uses process memory.
+
+if "RDS_DB_NAME" in os.environ:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "parkeasy_cache",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+
+# Request metrics
+# ParkEasy.middleware.RequestMetricsMiddleware logs SQL count, DB and template
+# time per request as JSON lines on the "ParkEasy.metrics" logger. Requests
+# over REQUEST_METRICS_QUERY_WARNING queries are logged as warnings; the rest
+# at INFO, which is only shown when REQUEST_METRICS_LOG_LEVEL allows it.
+
+REQUEST_METRICS_HEADERS = DEBUG
+REQUEST_METRICS_QUERY_WARNING = 50
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "metrics": {"format": "%(asctime)s %(levelname)s %(name)s %(message)s"},
+    },
+    "handlers": {
+        "metrics": {"class": "logging.StreamHandler", "formatter": "metrics"},
+    },
+    "loggers": {
+        "ParkEasy.metrics": {
+            "handlers": ["metrics"],
+            "level": os.environ.get(
+                "REQUEST_METRICS_LOG_LEVEL", "WARNING" if DEBUG else "INFO"
+            ),
+            "propagate": False,
+        },
+    },
+}
+
+# Live updates
+# accounts.live streams counter changes and new notifications to open pages
+# as server-sent events. Pages only open the stream when served over ASGI
+# (ParkEasy.asgi), which also ends streams when their page closes. The
+# PostgreSQL broker sends events through LISTEN/NOTIFY so they reach every
+# worker (WEB_CONCURRENCY). With a single-process broker such as
+# accounts.live.InProcessBroker, pages only open the stream when one worker
+# runs. Streams close after LIVE_UPDATES_STREAM_SECONDS and the browser
+# reconnects.
+
+LIVE_UPDATES_BROKER = "accounts.live.PostgresBroker"
+LIVE_UPDATES_STREAM_SECONDS = 300
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -0,0 +1,61 @@
+"""Test helpers shared by the app test suites."""
+
+from django.core.cache import cache
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin asserting how many queries a page may run. It reads the
+    numbers recorded by RequestMetricsMiddleware, so a failure lists the
+    repeated query shapes that blew the budget.
+    """
+
+    def assertQueryBudget(self, url, budget, **kwargs):
+        response = self.client.get(url, **kwargs)
+        metrics = getattr(response, "request_metrics", None)
+        if metrics is None:
+            self.fail("RequestMetricsMiddleware is not installed")
+        if metrics.query_count > budget:
+            repeated = "\n".join(
+                f"  {count}x {shape}" for shape, count in metrics.repeated_queries()
+            )
+            self.fail(
+                f"{metrics.url_name or url} ran {metrics.query_count} queries, "
+                f"budget is {budget}. Repeated queries:\n{repeated or '  none'}"
+            )
+        return response
+
+
+class QueryScalingMixin:
+    """
+    TestCase mixin checking that a page runs the same number of queries
+    whatever the amount of data behind it, which catches N+1 patterns.
+    """
+
+    def measure_queries(self, url, **kwargs):
+        # Cached counters would make the second request cheaper
+        cache.clear()
+        response = self.client.get(url, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return response.request_metrics
+
+    def assertQueriesDoNotScale(self, url, seed, scales=(2, 8), **kwargs):
+        """
+        Call seed(n) to grow the data to each of the given scales and assert
+        the page runs the same number of queries at every one of them.
+        """
+        seeded = 0
+        counts = []
+        for scale in scales:
+            seed(scale - seeded)
+            seeded = scale
+            metrics = self.measure_queries(url, **kwargs)
+            counts.append(metrics.query_count)
+        if len(set(counts)) > 1:
+            repeated = "\n".join(
+                f"  {count}x {shape}" for shape, count in metrics.repeated_queries()
+            )
+            self.fail(
+                f"{metrics.url_name or url} ran {counts} queries at scales "
+                f"{list(scales)}. Repeated queries:\n{repeated or '  none'}"
+            )
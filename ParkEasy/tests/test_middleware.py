@@ -0,0 +1,149 @@
+import datetime as dt
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from booking.models import Booking, BookingSlot
+from listings.models import Listing, ListingSlot
+from messaging.models import Message
+
+from ..middleware import RequestMetrics, query_shape
+from ..testing import QueryBudgetMixin
+
+
+class QueryShapeTest(TestCase):
+    def test_parameters_and_literals_are_folded(self):
+        self.assertEqual(
+            query_shape("SELECT * FROM t WHERE a = %s AND b = 'x' LIMIT 21"),
+            "SELECT * FROM t WHERE a = ? AND b = ? LIMIT ?",
+        )
+
+    def test_in_lists_of_any_length_share_a_shape(self):
+        self.assertEqual(
+            query_shape("SELECT * FROM t WHERE id IN (%s, %s, %s)"),
+            query_shape("SELECT * FROM t WHERE id IN (%s)"),
+        )
+
+    def test_repeated_queries(self):
+        metrics = RequestMetrics()
+        metrics.query_shapes.update(["a", "a", "a", "b", "c", "c"])
+        self.assertEqual(metrics.repeated_queries(), [("a", 3), ("c", 2)])
+
+
+class RequestMetricsMiddlewareTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="metrics", password="pass123")
+        self.client.login(username="metrics", password="pass123")
+
+    def test_metrics_recorded_for_request(self):
+        response = self.client.get(reverse("inbox"))
+        metrics = response.request_metrics
+        self.assertEqual(metrics.url_name, "inbox")
+        self.assertGreater(metrics.query_count, 0)
+        self.assertGreater(metrics.db_time, 0)
+        self.assertGreater(metrics.template_time, 0)
+        self.assertGreaterEqual(metrics.total_time, metrics.template_time)
+
+    async def test_metrics_recorded_for_async_request(self):
+        # The async client runs the middleware in async mode
+        response = await self.async_client.get(
+            reverse("map_view_listings"), {"lat": "40.7", "lng": "-73.9"}
+        )
+        self.assertEqual(response.status_code, 200)
+        metrics = response.request_metrics
+        self.assertEqual(metrics.url_name, "map_view_listings")
+        self.assertGreater(metrics.query_count, 0)
+
+    def test_metrics_logged_as_json(self):
+        with self.assertLogs("ParkEasy.metrics", level="INFO") as logs:
+            self.client.get(reverse("inbox"))
+        data = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(data["url_name"], "inbox")
+        self.assertEqual(data, logs.records[-1].request_metrics)
+        self.assertIn("queries", data)
+        self.assertIn("db_ms", data)
+        self.assertIn("template_ms", data)
+
+    @override_settings(REQUEST_METRICS_QUERY_WARNING=0)
+    def test_requests_over_threshold_logged_as_warning(self):
+        with self.assertLogs("ParkEasy.metrics", level="WARNING") as logs:
+            self.client.get(reverse("inbox"))
+        self.assertEqual(logs.records[-1].levelname, "WARNING")
+
+    @override_settings(REQUEST_METRICS_HEADERS=True)
+    def test_debug_headers(self):
+        response = self.client.get(reverse("inbox"))
+        self.assertEqual(
+            response["X-Query-Count"], str(response.request_metrics.query_count)
+        )
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.assertIn("template;dur=", response["Server-Timing"])
+
+    @override_settings(REQUEST_METRICS_HEADERS=False)
+    def test_headers_disabled(self):
+        response = self.client.get(reverse("inbox"))
+        self.assertNotIn("X-Query-Count", response)
+        self.assertNotIn("Server-Timing", response)
+
+
+class ViewQueryBudgetTest(QueryBudgetMixin, TestCase):
+    """
+    Query budgets for the busiest pages with five rows of everything. The
+    budgets are the current counts; lower them as pages are optimized.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username="owner", password="pass123")
+        cls.renter = User.objects.create_user(username="renter", password="pass123")
+        tomorrow = dt.date.today() + dt.timedelta(days=1)
+        for i in range(5):
+            listing = Listing.objects.create(
+                user=cls.owner,
+                title=f"Spot {i}",
+                location=f"Spot {i} [40.7{i}, -73.9{i}]",
+                rent_per_hour=10 + i,
+                description="Spot",
+            )
+            ListingSlot.objects.create(
+                listing=listing,
+                start_date=tomorrow,
+                start_time=dt.time(8),
+                end_date=tomorrow,
+                end_time=dt.time(18),
+            )
+            booking = Booking.objects.create(
+                user=cls.renter,
+                listing=listing,
+                email="renter@example.com",
+                total_price=10,
+                status="APPROVED",
+            )
+            BookingSlot.objects.create(
+                booking=booking,
+                start_date=tomorrow,
+                start_time=dt.time(9),
+                end_date=tomorrow,
+                end_time=dt.time(10),
+            )
+            Message.objects.create(
+                sender=cls.owner, recipient=cls.renter, subject=f"Hi {i}", body="Hi"
+            )
+
+    def test_view_listings(self):
+        self.client.login(username="renter", password="pass123")
+        self.assertQueryBudget(reverse("view_listings"), 7)
+
+    def test_manage_listings(self):
+        self.client.login(username="owner", password="pass123")
+        self.assertQueryBudget(reverse("manage_listings"), 12)
+
+    def test_my_bookings(self):
+        self.client.login(username="renter", password="pass123")
+        self.assertQueryBudget(reverse("my_bookings"), 9)
+
+    def test_inbox(self):
+        self.client.login(username="renter", password="pass123")
+        self.assertQueryBudget(reverse("inbox"), 8)
@@ -0,0 +1,77 @@
+import datetime as dt
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import Broadcast, Notification
+
+from ..pagination import decode_cursor, encode_cursor, keyset_page
+
+
+class KeysetPageTest(TestCase):
+    """Paging through one or several querysets newest first."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="user", password="pass123")
+        cls.now = timezone.now().replace(microsecond=0)
+
+    def notify(self, subject, created_at):
+        notification = Notification.objects.create(
+            recipient=self.user, subject=subject, content="Hi"
+        )
+        Notification.objects.filter(pk=notification.pk).update(created_at=created_at)
+        return notification
+
+    def broadcast(self, subject, created_at):
+        broadcast = Broadcast.objects.create(
+            audience="ALL", subject=subject, content="Hi"
+        )
+        Broadcast.objects.filter(pk=broadcast.pk).update(created_at=created_at)
+        return broadcast
+
+    def pages(self, querysets, per_page):
+        """Follow the cursors and return the subjects on every page."""
+        pages, cursor = [], None
+        while True:
+            page = keyset_page(querysets, cursor, per_page)
+            pages.append([obj.subject for obj in page])
+            if not page.has_next():
+                return pages
+            cursor = page.next_cursor
+
+    def test_cursor_round_trip(self):
+        cursor = encode_cursor(self.now, 1, 42)
+        self.assertEqual(decode_cursor(cursor), (self.now, 1, 42))
+
+    def test_bad_cursor_gives_first_page(self):
+        self.notify("Only", self.now)
+        for cursor in (None, "", "garbage", "1.2", "9" * 30 + ".0.1"):
+            page = keyset_page(Notification.objects.all(), cursor, 10)
+            self.assertTrue(page.is_first)
+            self.assertEqual(len(page), 1)
+
+    def test_pages_through_one_queryset(self):
+        for i in range(5):
+            self.notify(f"N{i}", self.now + dt.timedelta(minutes=i))
+        self.assertEqual(
+            self.pages(Notification.objects.all(), 2),
+            [["N4", "N3"], ["N2", "N1"], ["N0"]],
+        )
+
+    def test_rows_with_the_same_timestamp_are_not_skipped(self):
+        for i in range(5):
+            self.notify(f"N{i}", self.now)
+        pages = self.pages(Notification.objects.all(), 2)
+        self.assertEqual(pages, [["N4", "N3"], ["N2", "N1"], ["N0"]])
+
+    def test_merges_several_querysets(self):
+        self.notify("N0", self.now)
+        self.broadcast("B0", self.now)
+        self.notify("N1", self.now + dt.timedelta(minutes=1))
+        self.broadcast("B1", self.now + dt.timedelta(minutes=2))
+        self.notify("N2", self.now - dt.timedelta(minutes=1))
+        pages = self.pages([Notification.objects.all(), Broadcast.objects.all()], 2)
+        # Same timestamp: the later queryset comes first
+        self.assertEqual(pages, [["B1", "N1"], ["B0", "N0"], ["N2"]])
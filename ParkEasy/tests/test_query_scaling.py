@@ -0,0 +1,128 @@
+import datetime as dt
+import itertools
+
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+from django.urls import reverse
+
+from booking.models import Booking, BookingSlot
+from listings.models import BookmarkedListing, Listing, ListingSlot, Review
+from messaging.models import Message
+from reports.models import Report
+
+from ..testing import QueryScalingMixin
+
+
+class ViewQueryScalingTest(QueryScalingMixin, TestCase):
+    """
+    Seed listings, bookings, reviews, bookmarks, messages and reports at two
+    scales and check the major pages run the same number of queries at both.
+    Every row gets its own counterpart user so per-row user lookups show up.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = User.objects.create_user(username="host", password="pass123")
+        cls.host.profile.is_verified = True
+        cls.host.profile.save()
+        cls.renter = User.objects.create_user(username="renter", password="pass123")
+        cls.staff = User.objects.create_user(
+            username="staff", password="pass123", is_staff=True
+        )
+
+    def setUp(self):
+        self.counter = itertools.count()
+
+    def seed(self, count):
+        tomorrow = dt.date.today() + dt.timedelta(days=1)
+        listing_type = ContentType.objects.get_for_model(Listing)
+        for _ in range(count):
+            i = next(self.counter)
+            other = User.objects.create_user(username=f"other{i}", password="pass123")
+            listing = Listing.objects.create(
+                user=self.host,
+                title=f"Spot {i}",
+                location=f"Spot {i} [40.7{i:02d}, -73.9{i:02d}]",
+                rent_per_hour=10 + i,
+                description="Spot",
+            )
+            ListingSlot.objects.create(
+                listing=listing,
+                start_date=tomorrow,
+                start_time=dt.time(8),
+                end_date=tomorrow,
+                end_time=dt.time(18),
+            )
+            for user, status in ((self.renter, "APPROVED"), (other, "PENDING")):
+                booking = Booking.objects.create(
+                    user=user,
+                    listing=listing,
+                    email="renter@example.com",
+                    total_price=10,
+                    status=status,
+                )
+                BookingSlot.objects.create(
+                    booking=booking,
+                    start_date=tomorrow,
+                    start_time=dt.time(9),
+                    end_date=tomorrow,
+                    end_time=dt.time(10),
+                )
+            Review.objects.create(
+                booking=booking, listing=listing, user=other, rating=4, comment="Ok"
+            )
+            BookmarkedListing.objects.create(user=self.renter, listing=listing)
+            Message.objects.create(
+                sender=other, recipient=self.renter, subject=f"Hi {i}", body="Hi"
+            )
+            Report.objects.create(
+                reporter=other,
+                content_type=listing_type,
+                object_id=listing.pk,
+                report_type="SPAM",
+                description="Spam",
+            )
+
+    def login(self, user):
+        self.client.login(username=user.username, password="pass123")
+
+    def test_view_listings(self):
+        self.login(self.renter)
+        self.assertQueriesDoNotScale(reverse("view_listings"), self.seed)
+
+    def test_map_view_listings(self):
+        self.login(self.renter)
+        self.assertQueriesDoNotScale(reverse("map_view_listings"), self.seed)
+
+    def test_manage_listings(self):
+        self.login(self.host)
+        self.assertQueriesDoNotScale(reverse("manage_listings"), self.seed)
+
+    def test_my_bookings(self):
+        self.login(self.renter)
+        self.assertQueriesDoNotScale(reverse("my_bookings"), self.seed)
+
+    def test_user_listings(self):
+        self.login(self.renter)
+        self.assertQueriesDoNotScale(
+            reverse("user_listings", args=[self.host.username]), self.seed
+        )
+
+    def test_bookmarked_listings(self):
+        self.login(self.renter)
+        self.assertQueriesDoNotScale(reverse("bookmarked_listings"), self.seed)
+
+    def test_inbox(self):
+        self.login(self.renter)
+        self.assertQueriesDoNotScale(reverse("inbox"), self.seed)
+
+    def test_admin_reports(self):
+        self.login(self.staff)
+        self.assertQueriesDoNotScale(reverse("admin_reports"), self.seed)
+
+    def test_public_profile(self):
+        self.login(self.renter)
+        self.assertQueriesDoNotScale(
+            reverse("public_profile", args=[self.host.username]), self.seed
+        )
@@ -1,106 +1,106 @@
-from .models import Notification, VerificationRequest
-from messaging.models import Message
-from reports.models import Report
+import operator
 
+from django.core.handlers.asgi import ASGIRequest
+from django.utils.functional import SimpleLazyObject, new_method_proxy
 
-def notification_count(request):
+from .counters import get_user_counters
+from .live import live_updates_reach_all_workers
+
+EMPTY_COUNTERS = {
+    "unread_count": 0,
+    "unread_notification_count": 0,
+    "unread_message_count": 0,
+    "total_unread_count": 0,
+    "pending_verifications_count": 0,
+    "pending_reports_count": 0,
+}
+
+
+class LazyCount(SimpleLazyObject):
     """
-    Context processor to add unread notification count to all templates.
+    A count that is only looked up when a template uses it. Adds the numeric
+    operations templates rely on ({% if count > 0 %}, |add) to
+    SimpleLazyObject.
     """
+
+    __int__ = new_method_proxy(int)
+    __le__ = new_method_proxy(operator.le)
+    __ge__ = new_method_proxy(operator.ge)
+    __add__ = new_method_proxy(operator.add)
+
+    def __radd__(self, other):
+        return other + int(self)
+
+
+def _load_counters(user):
     try:
-        if (
-            hasattr(request, "user")
-            and hasattr(request.user, "is_authenticated")
-            and request.user.is_authenticated
-        ):
-            # Count unread notifications (get direct SQL count for performance)
-            unread_notification_count = Notification.objects.filter(
-                recipient=request.user, read=False
-            ).count()
-
-            # Count unread messages (also using direct SQL count)
-            unread_message_count = (
-                Message.objects.filter(recipient=request.user, read=False)
-                .exclude(subject="Account Verification Approved")
-                .count()
-            )
-
-            # Calculate total unread items
-            total_unread_count = unread_notification_count + unread_message_count
-
-            # Return all counts
-            return {
-                "unread_notification_count": unread_notification_count,
-                "unread_message_count": unread_message_count,
-                "total_unread_count": total_unread_count,
-            }
+        return get_user_counters(user)
     except Exception:
         # Handle any errors (this ensures our site keeps working)
-        pass
+        return dict(EMPTY_COUNTERS)
+
+
+def unread_counters(request):
+    """
+    Context processor adding every navbar badge count to all templates:
+    unread messages and notifications, and for staff the pending
+    verification requests and reports.
 
-    # Return 0 for all counts for unauthenticated users or in case of errors
+    The values are lazy: nothing is looked up until a template renders one of
+    them, so JSON views and partials that never show the navbar cost nothing.
+    The first value used loads all of them from the cached counter service.
+    """
+    if not (
+        hasattr(request, "user")
+        and hasattr(request.user, "is_authenticated")
+        and request.user.is_authenticated
+    ):
+        # Return 0 for all counts for unauthenticated users
+        return dict(EMPTY_COUNTERS)
+
+    user = request.user
+    counters = SimpleLazyObject(lambda: _load_counters(user))
     return {
-        "unread_notification_count": 0,
-        "unread_message_count": 0,
-        "total_unread_count": 0,
+        name: LazyCount(lambda name=name: counters[name]) for name in EMPTY_COUNTERS
     }
 
 
-def verification_count(request):
+def notification_count(request):
     """
-    Context processor to add pending verification count to all templates.
+    Unread notification and message counts. Kept for callers of the former
+    per-count processors; settings use unread_counters.
     """
-    try:
-        if (
-            hasattr(request, "user")
-            and hasattr(request.user, "is_authenticated")
-            and request.user.is_authenticated
-            and hasattr(request.user, "is_staff")
-            and request.user.is_staff
-        ):
-
-            # Count pending verification requests
-            pending_verifications_count = VerificationRequest.objects.filter(
-                status="PENDING"
-            ).count()
-
-            return {
-                "pending_verifications_count": pending_verifications_count,
-            }
-    except Exception:
-        # Handle any errors
-        pass
+    counters = unread_counters(request)
+    return {
+        "unread_notification_count": counters["unread_notification_count"],
+        "unread_message_count": counters["unread_message_count"],
+        "total_unread_count": counters["total_unread_count"],
+    }
 
-    # Return 0 for non-admins or unauthenticated users or in case of errors
+
+def verification_count(request):
+    """Pending verification count for staff (see unread_counters)."""
+    counters = unread_counters(request)
     return {
-        "pending_verifications_count": 0,
+        "pending_verifications_count": counters["pending_verifications_count"],
     }
 
 
 def report_count(request):
+    """Pending report count for staff (see unread_counters)."""
+    counters = unread_counters(request)
+    return {
+        "pending_reports_count": counters["pending_reports_count"],
+    }
+
+
+def live_updates(request):
     """
-    Context processor to add report count to all templates.
+    Whether pages open the live update stream. It needs an ASGI server, so
+    pages served over WSGI (runserver) leave it out, as do workers whose
+    broker does not reach the other workers.
     """
-    try:
-        if (
-            hasattr(request, "user")
-            and hasattr(request.user, "is_authenticated")
-            and request.user.is_authenticated
-            and hasattr(request.user, "is_staff")
-            and request.user.is_staff
-        ):
-
-            # Count pending reports
-            pending_reports_count = Report.objects.filter(status="PENDING").count()
-
-            return {
-                "pending_reports_count": pending_reports_count,
-            }
-    except Exception:
-        # Handle any errors
-        pass
-
-    # Return 0 for non-admins or unauthenticated users or in case of errors
     return {
-        "pending_reports_count": 0,
+        "live_updates_enabled": isinstance(request, ASGIRequest)
+        and live_updates_reach_all_workers()
     }
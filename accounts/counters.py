@@ -0,0 +1,177 @@
+"""
+Cached unread/pending counters shown in the navbar.
+
+Per-user counts are keyed by user id, staff counts are global. The receivers
+in the models modules adjust a cached count in place when an unread row is
+created, and drop it when rows are read or removed; a missing count is
+recomputed from the database on the next read. Cached counts only change once
+the transaction commits, so a rollback leaves them as they were. Every change
+is also published to the live update streams (see accounts.live).
+
+A new broadcast changes the unread count of every user it reaches. Instead
+of touching each of those cached counts, broadcast counts are stored with
+the current broadcast generation and ignored once it has moved on.
+"""
+
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .live import BROADCASTS_CHANNEL, publish, publish_counters_changed
+
+COUNTER_TIMEOUT = 60 * 60
+
+# Legacy verification approvals were sent as messages; they are shown with
+# the notifications rather than in the inbox badge.
+VERIFICATION_MESSAGE_SUBJECT = "Account Verification Approved"
+
+USER_COUNTERS = ("notifications", "broadcasts", "messages", "verification_messages")
+STAFF_COUNTERS = ("pending_verifications", "pending_reports")
+
+# Counters cached together with the broadcast generation they were computed at
+GENERATION_COUNTERS = ("broadcasts",)
+BROADCAST_GENERATION_KEY = "counter:broadcast_generation"
+
+
+def counter_key(name, user_id=None):
+    if user_id is None:
+        return f"counter:{name}"
+    return f"counter:{name}:{user_id}"
+
+
+def _compute_counts(names, user_id=None):
+    # Imported here because the models modules import this one for their
+    # signal receivers.
+    from accounts.models import Notification, VerificationRequest, unread_broadcasts_for
+    from messaging.models import Message
+    from reports.models import Report
+
+    counts = {}
+    if "notifications" in names:
+        counts["notifications"] = Notification.objects.filter(
+            recipient_id=user_id, read=False
+        ).count()
+    if "broadcasts" in names:
+        user = User.objects.select_related("profile").get(pk=user_id)
+        counts["broadcasts"] = unread_broadcasts_for(user).count()
+    if "messages" in names or "verification_messages" in names:
+        # One query for both message counters
+        counts.update(
+            Message.objects.filter(recipient_id=user_id, read=False).aggregate(
+                messages=Count("id"),
+                verification_messages=Count(
+                    "id", filter=Q(subject=VERIFICATION_MESSAGE_SUBJECT)
+                ),
+            )
+        )
+    if "pending_verifications" in names:
+        counts["pending_verifications"] = VerificationRequest.objects.filter(
+            status="PENDING"
+        ).count()
+    if "pending_reports" in names:
+        counts["pending_reports"] = Report.objects.filter(status="PENDING").count()
+    return counts
+
+
+def broadcast_generation():
+    """Return the current broadcast generation, starting a new one if needed."""
+    generation = cache.get(BROADCAST_GENERATION_KEY)
+    if generation is None:
+        cache.add(BROADCAST_GENERATION_KEY, uuid.uuid4().hex, None)
+        generation = cache.get(BROADCAST_GENERATION_KEY)
+    return generation
+
+
+def bump_broadcast_generation():
+    """Invalidate every cached broadcast count at once."""
+    transaction.on_commit(
+        lambda: cache.set(BROADCAST_GENERATION_KEY, uuid.uuid4().hex, None)
+    )
+    publish(BROADCASTS_CHANNEL, "counters")
+
+
+def get_counts(names, user_id=None):
+    """
+    Return {name: count} for the given counters, reading them from the cache
+    in one round trip and computing only the missing ones.
+    """
+    keys = {counter_key(name, user_id): name for name in names}
+    with_generation = any(name in GENERATION_COUNTERS for name in names)
+    cached = cache.get_many(
+        [*keys, BROADCAST_GENERATION_KEY] if with_generation else list(keys)
+    )
+    generation = cached.pop(BROADCAST_GENERATION_KEY, None)
+
+    counts = {}
+    for key, value in cached.items():
+        name = keys[key]
+        if name in GENERATION_COUNTERS:
+            if generation is None or value[0] != generation:
+                continue
+            value = value[1]
+        counts[name] = value
+
+    missing = [name for name in names if name not in counts]
+    if missing:
+        if with_generation and generation is None:
+            generation = broadcast_generation()
+        computed = _compute_counts(missing, user_id)
+        cache.set_many(
+            {
+                counter_key(name, user_id): (
+                    (generation, computed[name])
+                    if name in GENERATION_COUNTERS
+                    else computed[name]
+                )
+                for name in missing
+            },
+            COUNTER_TIMEOUT,
+        )
+        counts.update(computed)
+    return {name: counts[name] for name in names}
+
+
+def increment_count(name, user_id=None, delta=1):
+    """Adjust a cached count in place; uncached counts are left to be computed."""
+
+    def increment():
+        try:
+            cache.incr(counter_key(name, user_id), delta)
+        except ValueError:
+            pass
+
+    transaction.on_commit(increment)
+    publish_counters_changed(user_id)
+
+
+def reset_counts(names, user_id=None):
+    """Drop cached counts so they are recomputed on the next read."""
+    keys = [counter_key(name, user_id) for name in names]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+    publish_counters_changed(user_id)
+
+
+def get_user_counters(user):
+    """
+    Return the template variables for the navbar badges of the given user.
+    Staff counts are only looked up for staff.
+    """
+    counts = get_counts(USER_COUNTERS, user.pk)
+    unread_message_count = counts["messages"] - counts["verification_messages"]
+    unread_notification_count = counts["notifications"] + counts["broadcasts"]
+    counters = {
+        "unread_count": counts["messages"],
+        "unread_notification_count": unread_notification_count,
+        "unread_message_count": unread_message_count,
+        "total_unread_count": unread_notification_count + unread_message_count,
+        "pending_verifications_count": 0,
+        "pending_reports_count": 0,
+    }
+    if user.is_staff:
+        staff_counts = get_counts(STAFF_COUNTERS)
+        counters["pending_verifications_count"] = staff_counts["pending_verifications"]
+        counters["pending_reports_count"] = staff_counts["pending_reports"]
+    return counters
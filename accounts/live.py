@@ -0,0 +1,298 @@
+"""
+Live updates pushed to open pages.
+
+Model receivers publish small events on per-user channels (plus one channel
+for broadcasts and one for staff): a counter changed, a notification or
+message arrived, a booking changed state. The live_updates view subscribes
+to the channels of the logged-in user and streams the events to the browser
+as server-sent events, so the navbar badges update without page reloads.
+
+Events are published once the surrounding transaction commits. The broker
+is named in the LIVE_UPDATES_BROKER setting. InProcessBroker only reaches
+the streams served by the process that published the event, which covers a
+single ASGI worker. PostgresBroker sends events through PostgreSQL
+LISTEN/NOTIFY so they reach the streams of every worker. RecordingBroker is
+a stand-in for tests that keeps every event. With several workers and a
+single-process broker, live_updates_reach_all_workers() is false and pages
+do not open the stream.
+
+Streams need an ASGI server, and the ASGI application is wrapped with
+notify_disconnect() so a stream ends as soon as its page is closed.
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import select
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BROKER = "accounts.live.InProcessBroker"
+
+BROADCASTS_CHANNEL = "broadcasts"
+STAFF_CHANNEL = "staff"
+
+# Events waiting for a slow stream before it is told to resync instead
+MAX_QUEUED_EVENTS = 100
+
+# Sent to a stream whose queue overflowed; it reloads the counts
+RESYNC_EVENT = {"type": "counters"}
+
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+MAX_NOTIFY_PAYLOAD_BYTES = 7999
+
+# Seconds the PostgresBroker listener waits before reconnecting
+LISTENER_RETRY_SECONDS = 5
+
+# Seconds without notifications after which the listener checks its connection
+LISTENER_PING_SECONDS = 60
+
+# ASGI scope key of the asyncio.Event set once the client has disconnected
+DISCONNECTED_SCOPE_KEY = "parkeasy.disconnected"
+
+
+def user_channel(user_id):
+    return f"user:{user_id}"
+
+
+def _deliver(queue, event):
+    # Runs on the subscriber's event loop
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(RESYNC_EVENT)
+
+
+class InProcessBroker:
+    """
+    Publish/subscribe between the threads and event loops of one process.
+    publish() may be called from any thread; subscribers are asyncio queues
+    read by the streaming view.
+    """
+
+    # Events only reach the streams of the publishing process
+    single_process = True
+
+    def __init__(self, max_queued=MAX_QUEUED_EVENTS):
+        self.max_queued = max_queued
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_deliver, queue, event)
+            except RuntimeError:
+                # The subscriber's loop has closed
+                pass
+
+    @contextmanager
+    def subscribe(self, *channels):
+        """Yield an asyncio.Queue receiving the events of the given channels."""
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(self.max_queued))
+        with self._lock:
+            for channel in channels:
+                self._subscribers[channel].add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                for channel in channels:
+                    self._subscribers[channel].discard(subscriber)
+                    if not self._subscribers[channel]:
+                        del self._subscribers[channel]
+
+
+class PostgresBroker(InProcessBroker):
+    """
+    InProcessBroker whose events reach every process sharing the database.
+
+    publish() sends the event with NOTIFY on one PostgreSQL channel. Each
+    process runs a listener thread, started with its first subscriber, that
+    LISTENs on its own connection and hands the events to the local streams.
+    Events too large for a NOTIFY payload (a broadcast to many selected
+    users) are replaced by RESYNC_EVENT, and the streams are also told to
+    resync after the listener reconnects, since events may have been missed.
+
+    On other databases (SQLite in tests) it only reaches the publishing
+    process, like InProcessBroker.
+    """
+
+    pg_channel = "parkeasy_live_updates"
+
+    def __init__(self, *args, using=DEFAULT_DB_ALIAS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.using = using
+        self._listener = None
+
+    @property
+    def single_process(self):
+        return connections[self.using].vendor != "postgresql"
+
+    def publish(self, channel, event):
+        if self.single_process:
+            return super().publish(channel, event)
+        payload = json.dumps({"channel": channel, "event": event})
+        if len(payload.encode()) > MAX_NOTIFY_PAYLOAD_BYTES:
+            payload = json.dumps({"channel": channel, "event": RESYNC_EVENT})
+        try:
+            with connections[self.using].cursor() as cursor:
+                cursor.execute("SELECT pg_notify(%s, %s)", [self.pg_channel, payload])
+        except DatabaseError as error:
+            # The change itself is committed; the pages catch up on reload
+            logger.warning("Could not publish a live update: %s", error)
+
+    def subscribe(self, *channels):
+        if not self.single_process:
+            self._start_listener()
+        return super().subscribe(*channels)
+
+    def _start_listener(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(
+                    target=self._listen, name="live-updates-listener", daemon=True
+                )
+                self._listener.start()
+
+    def _listen(self):
+        reconnecting = False
+        while True:
+            connection = connections.create_connection(self.using)
+            try:
+                connection.ensure_connection()
+                pg_connection = connection.connection
+                cursor = pg_connection.cursor()
+                cursor.execute(f"LISTEN {self.pg_channel}")
+                if reconnecting:
+                    self._publish_to_all(RESYNC_EVENT)
+                reconnecting = True
+                while True:
+                    ready, _, _ = select.select(
+                        [pg_connection], [], [], LISTENER_PING_SECONDS
+                    )
+                    if not ready:
+                        cursor.execute("SELECT 1")
+                    pg_connection.poll()
+                    while pg_connection.notifies:
+                        message = json.loads(pg_connection.notifies.pop(0).payload)
+                        InProcessBroker.publish(
+                            self, message["channel"], message["event"]
+                        )
+            except (DatabaseError, connection.Database.Error, OSError) as error:
+                logger.warning("Live updates listener disconnected: %s", error)
+            finally:
+                connection.close()
+            time.sleep(LISTENER_RETRY_SECONDS)
+
+    def _publish_to_all(self, event):
+        with self._lock:
+            channels = list(self._subscribers)
+        for channel in channels:
+            InProcessBroker.publish(self, channel, event)
+
+
+class RecordingBroker(InProcessBroker):
+    """InProcessBroker that also keeps every published (channel, event)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.published = []
+
+    def publish(self, channel, event):
+        self.published.append((channel, event))
+        super().publish(channel, event)
+
+
+@functools.lru_cache(maxsize=None)
+def get_broker():
+    return import_string(getattr(settings, "LIVE_UPDATES_BROKER", DEFAULT_BROKER))()
+
+
+@receiver(setting_changed)
+def reset_broker(setting, **kwargs):
+    if setting == "LIVE_UPDATES_BROKER":
+        get_broker.cache_clear()
+
+
+def live_updates_reach_all_workers():
+    """
+    Whether published events reach the streams of every server worker.
+    Several workers (WEB_CONCURRENCY, which gunicorn reads as its worker
+    count) with a single-process broker would each see only their own
+    events, so live updates are turned off instead.
+    """
+    workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+    return workers <= 1 or not getattr(get_broker(), "single_process", False)
+
+
+def publish(channel, event_type, **data):
+    """Publish an event on a channel once the current transaction commits."""
+    event = {"type": event_type, **data}
+    transaction.on_commit(lambda: get_broker().publish(channel, event))
+
+
+def publish_counters_changed(user_id=None):
+    """Tell a user's streams (all staff streams without a user) to reload counts."""
+    publish(STAFF_CHANNEL if user_id is None else user_channel(user_id), "counters")
+
+
+def notify_disconnect(application):
+    """
+    Wrap an ASGI application so that views can tell when the client is gone.
+
+    Django 4.2 keeps iterating a streaming response after the client has
+    disconnected, and ASGI servers drop what is sent to a closed connection
+    without an error, so every page navigation would leave a live update
+    stream running until its end. Once the request body has been read, the
+    wrapper waits for the server's http.disconnect message and sets the
+    asyncio.Event stored in the scope under DISCONNECTED_SCOPE_KEY.
+    """
+
+    async def wrapper(scope, receive, send):
+        if scope["type"] != "http":
+            return await application(scope, receive, send)
+
+        disconnected = asyncio.Event()
+        watcher = None
+
+        async def watch():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        async def receive_body():
+            nonlocal watcher
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+            elif not message.get("more_body") and watcher is None:
+                # Django does not read anything after the body
+                watcher = asyncio.create_task(watch())
+            return message
+
+        try:
+            await application(
+                {**scope, DISCONNECTED_SCOPE_KEY: disconnected}, receive_body, send
+            )
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+
+    return wrapper
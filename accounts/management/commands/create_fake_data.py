@@ -1,231 +1,371 @@
+import multiprocessing
 import random
 from datetime import date, datetime, time, timedelta
 
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Exists, OuterRef
 from django.utils import timezone
 from faker import Faker
 
-from accounts.utilities import get_valid_nyc_coordinate
+from accounts.models import Profile
+from accounts.utilities import (
+    borough_for_district,
+    find_nyc_districts,
+    sample_nyc_coordinates,
+)
 from booking.models import Booking, BookingSlot
-from listings.models import Listing, ListingSlot, Review
+from listings.models import BookmarkedListing, Listing, ListingSlot, Review
 
-# Import block_out_booking so that approved bookings subtract availability.
-from booking.utils import block_out_booking
+# subtract_interval/merge_intervals let approved bookings block out availability
+# in memory, the same way block_out_booking does for a single listing.
+from booking.utils import merge_intervals, subtract_interval
+
+# Seeded users are recognised by their email domain, which real users cannot
+# sign up with (.invalid is reserved and never resolves).
+FAKE_EMAIL_DOMAIN = "fake-data.invalid"
+# Earlier versions seeded userN accounts, so the prefix keeps new seeds from
+# colliding with those or with real users.
+FAKE_USERNAME_PREFIX = "fakeuser"
+STATUS_CHOICES = ["PENDING", "APPROVED", "DECLINED"]
+
+
+def _random_listing_intervals(rng):
+    """Return 1 to 3 availability intervals starting within the next 30 days."""
+    intervals = []
+    for _ in range(rng.randint(1, 3)):
+        start_date_obj = date.today() + timedelta(days=rng.randint(0, 30))
+        # 0 for a same-day slot, or 1-3 days for a multi-day slot.
+        duration_days = rng.randint(0, 3)
+        end_date_obj = start_date_obj + timedelta(days=duration_days)
+
+        if duration_days == 0:
+            # Same-day slot: start between 6:00 and 16:00, end by 22:00
+            start_minutes = rng.choice(range(360, 960, 30))
+            end_minutes = rng.choice(range(start_minutes + 30, 1320, 30))
+        else:
+            # Multi-day slot: use a morning start and an evening end.
+            start_minutes = rng.choice(range(360, 721, 30))  # 6:00 to 12:00
+            end_minutes = rng.choice(range(960, 1320, 30))  # 16:00 to 22:00
+
+        intervals.append(
+            (
+                datetime.combine(
+                    start_date_obj, time(start_minutes // 60, start_minutes % 60)
+                ),
+                datetime.combine(
+                    end_date_obj, time(end_minutes // 60, end_minutes % 60)
+                ),
+            )
+        )
+    return merge_intervals(intervals)
+
+
+def generate_listing_rows(args):
+    """
+    Build the plain data for a chunk of listings: (title, location, rent,
+    description, district, intervals). Runs in worker processes, so it must not touch
+    the database.
+    """
+    first_index, count, seed = args
+    rng = random.Random(seed)
+    fake = Faker()
+    fake.seed_instance(seed)
+    coordinates = sample_nyc_coordinates(count, seed=seed)
+    # bulk_create skips Listing.save(), so tag the districts here.
+    districts = find_nyc_districts(*zip(*coordinates))
+
+    rows = []
+    for i, (latitude, longitude) in enumerate(coordinates, start=first_index):
+        rows.append(
+            (
+                f"Listing #{i}",
+                f"Sample Location {i} [{latitude},{longitude}]",
+                round(rng.uniform(10.00, 50.00), 2),
+                fake.text(max_nb_chars=200),
+                districts[i - first_index],
+                _random_listing_intervals(rng),
+            )
+        )
+    return rows
+
+
+def _random_booking_interval(rng, interval):
+    """Pick a half-hour aligned sub-interval of an availability interval."""
+    start_dt, end_dt = interval
+    total_minutes = int((end_dt - start_dt).total_seconds() // 60)
+    if total_minutes < 30:
+        return None
+    start_offset = rng.randint(0, total_minutes // 30 - 1) * 30
+    remaining_minutes = total_minutes - start_offset
+    duration = rng.randint(1, remaining_minutes // 30) * 30
+    booking_start = start_dt + timedelta(minutes=start_offset)
+    return booking_start, booking_start + timedelta(minutes=duration)
+
+
+def _chunks(total, size):
+    for start in range(0, total, size):
+        yield start, min(size, total - start)
 
 
 class Command(BaseCommand):
-    help = "Create fake data: 10 users, 100 listings, 200 bookings, and 100 reviews"
+    help = (
+        "Create fake data: users (password 'testdata'), listings with availability, "
+        "bookings and reviews. Defaults to 10 users, 100 listings, 200 bookings "
+        "and 100 reviews; use the size flags to build load-test datasets."
+    )
 
-    def handle(self, *args, **kwargs):
-        # Check if fake data exists by verifying the existence of "user1"
-        if User.objects.filter(username="user1").exists():
-            self.stdout.write("Existing fake data found. Deleting...")
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument("--listings", type=int, default=100)
+        parser.add_argument("--bookings", type=int, default=200)
+        parser.add_argument(
+            "--reviews",
+            type=int,
+            default=100,
+            help="Number of reviews (capped at the number of bookings)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows per bulk insert",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Processes used to generate listing data (coordinates and text)",
+        )
 
-            # Delete all users created by this script (user1 through user10)
-            for i in range(1, 11):
-                username = f"user{i}"
-                User.objects.filter(username=username).delete()
+    def handle(self, *args, **options):
+        for name in ("users", "listings", "batch_size", "workers"):
+            if options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be at least 1.")
+        for name in ("bookings", "reviews"):
+            if options[name] < 0:
+                raise CommandError(f"--{name} must not be negative.")
+        self.batch_size = options["batch_size"]
+        self.rng = random.Random()
 
+        fake_users = User.objects.filter(email__endswith=f"@{FAKE_EMAIL_DOMAIN}")
+        if fake_users.exists():
+            self.stdout.write("Existing fake data found. Deleting...")
+            with transaction.atomic():
+                self.delete_fake_data(fake_users)
             self.stdout.write(self.style.SUCCESS("Existing fake data deleted."))
-
-        # Continue with creating new fake data...
-        fake = Faker()
-        users = []
-
-        # Create 10 users with password "testdata"
-        self.stdout.write("Creating users...")
-        for i in range(1, 11):
-            username = f"user{i}"
-            email = f"{username}@example.com"
-            user, created = User.objects.get_or_create(
-                username=username, defaults={"email": email}
+        if User.objects.filter(
+            username__regex=rf"^{FAKE_USERNAME_PREFIX}[0-9]+$"
+        ).exists():
+            raise CommandError(
+                f"Users named {FAKE_USERNAME_PREFIX}N already exist and were not "
+                "created by this command; rename them before seeding."
             )
-            user.set_password("testdata")
-            user.save()
-            users.append(user)
-            self.stdout.write(self.style.SUCCESS(f"User created: {username}"))
 
-        # Create 100 listings with valid NYC coordinates
-        self.stdout.write("Creating listings...")
-        listings = []
-        for i in range(1, 101):
-            user = random.choice(users)
-            title = f"Listing #{i}"
-
-            # Generate valid NYC coordinates
-            latitude, longitude = get_valid_nyc_coordinate()
-            location = f"Sample Location {i} [{latitude},{longitude}]"
-
-            rent_per_hour = round(random.uniform(10.00, 50.00), 2)
-            description = fake.text(max_nb_chars=200)
-            listing = Listing.objects.create(
-                user=user,
-                title=title,
-                location=location,
-                rent_per_hour=rent_per_hour,
-                description=description,
+        listing_chunks = self.generate_listings(options["listings"], options["workers"])
+        with transaction.atomic():
+            user_ids = self.create_users(options["users"])
+            listing_ids, intervals = self.create_listings(listing_chunks, user_ids)
+            bookings = self.create_bookings(
+                options["bookings"], user_ids, listing_ids, intervals
             )
-            listings.append(listing)
-            self.stdout.write(
-                self.style.SUCCESS(f"Listing created: {title} at {location}")
+            self.create_listing_slots(listing_ids, intervals)
+            self.create_reviews(min(options["reviews"], len(bookings)), bookings)
+
+        self.stdout.write(self.style.SUCCESS("Fake data creation complete."))
+
+    def delete_fake_data(self, users):
+        """
+        Delete the rows seeded by a previous run, children first. Tables
+        without delete receivers (reviews, booking slots) are emptied with one
+        DELETE each; the rest still run their receivers.
+
+        Only rows made of seeded data are deleted up front. Anything else
+        pointing at the seeded users or listings (a real user's booking,
+        messages, notifications) goes with the users' cascade.
+        """
+        listings = Listing.objects.filter(user__in=users)
+        bookings = Booking.objects.filter(user__in=users, listing__in=listings)
+        unused_listings = listings.exclude(
+            Exists(Booking.objects.filter(listing=OuterRef("pk")))
+        ).exclude(Exists(BookmarkedListing.objects.filter(listing=OuterRef("pk"))))
+        for queryset in (
+            Review.objects.filter(booking__in=bookings),
+            BookingSlot.objects.filter(booking__in=bookings),
+            bookings,
+            ListingSlot.objects.filter(listing__in=listings),
+            Review.objects.filter(listing__in=unused_listings),
+            unused_listings,
+        ):
+            queryset.delete()
+        users.delete()
+
+    def create_users(self, count):
+        self.stdout.write(f"Creating {count} users...")
+        # Hashing is deliberately slow, so every fake user shares one hash.
+        password = make_password("testdata")
+        user_ids = []
+        for start, size in _chunks(count, self.batch_size):
+            users = User.objects.bulk_create(
+                [
+                    User(
+                        username=f"{FAKE_USERNAME_PREFIX}{i}",
+                        email=f"{FAKE_USERNAME_PREFIX}{i}@{FAKE_EMAIL_DOMAIN}",
+                        password=password,
+                    )
+                    for i in range(start + 1, start + size + 1)
+                ]
             )
+            # bulk_create skips the post_save receiver that creates profiles.
+            Profile.objects.bulk_create([Profile(user=user) for user in users])
+            user_ids.extend(user.pk for user in users)
+        return user_ids
 
-        # Create ListingSlots for each listing (1 to 3 slots per listing)
-        self.stdout.write("Creating listing slots...")
-        for listing in listings:
-            num_slots = random.randint(1, 3)
-            for _ in range(num_slots):
-                # Choose a random start_date from today to 30 days ahead
-                start_date_obj = date.today() + timedelta(days=random.randint(0, 30))
-                # Determine duration: 0 for same-day, or 1-3 days for a multi-day slot.
-                duration_days = random.randint(0, 3)
-                end_date_obj = start_date_obj + timedelta(days=duration_days)
-
-                if duration_days == 0:
-                    # Same-day slot: choose a start time between 6:00 and 16:00 (in minutes)
-                    start_minutes = random.choice(range(360, 960, 30))
-                    # End time must be at least 30 minutes after start, up to 22:00 (1320 minutes)
-                    possible_end_minutes = [
-                        m for m in range(start_minutes + 30, 1320, 30)
-                    ]
-                    if not possible_end_minutes:
-                        continue
-                    end_minutes = random.choice(possible_end_minutes)
-                else:
-                    # Multi-day slot: use a morning start and an evening end.
-                    start_minutes = random.choice(range(360, 721, 30))  # 6:00 to 12:00
-                    end_minutes = random.choice(range(960, 1320, 30))  # 16:00 to 22:00
-
-                st_time = time(hour=start_minutes // 60, minute=start_minutes % 60)
-                et_time = time(hour=end_minutes // 60, minute=end_minutes % 60)
-
-                listing_slot = ListingSlot.objects.create(
-                    listing=listing,
-                    start_date=start_date_obj,
-                    start_time=st_time,
-                    end_date=end_date_obj,
-                    end_time=et_time,
-                )
-                listing_slot.listing = listing
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f"ListingSlot for {listing.title}: {start_date_obj} {st_time} - {end_date_obj} {et_time}"
+    def generate_listings(self, count, workers):
+        """
+        Generate listing data in chunks of batch_size, spread over worker
+        processes when more than one is requested.
+        """
+        self.stdout.write(f"Generating {count} listings...")
+        tasks = [
+            (start + 1, size, self.rng.getrandbits(32))
+            for start, size in _chunks(count, self.batch_size)
+        ]
+        if workers == 1:
+            return [generate_listing_rows(task) for task in tasks]
+        # Forked workers must not share the parent's database connections.
+        connections.close_all()
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            return pool.map(generate_listing_rows, tasks)
+
+    def create_listings(self, chunks, user_ids):
+        """
+        Insert the listings and return their ids along with their availability
+        intervals, which are written as ListingSlots once bookings are placed.
+        """
+        self.stdout.write("Creating listings...")
+        listing_ids = []
+        intervals = []
+        for rows in chunks:
+            listings = Listing.objects.bulk_create(
+                [
+                    Listing(
+                        user_id=self.rng.choice(user_ids),
+                        title=title,
+                        location=location,
+                        rent_per_hour=rent_per_hour,
+                        description=description,
+                        community_district=district,
+                        borough=borough_for_district(district),
                     )
-                )
+                    for title, location, rent_per_hour, description, district, _ in rows
+                ]
+            )
+            listing_ids.extend(listing.pk for listing in listings)
+            intervals.extend(row[5] for row in rows)
+        return listing_ids, intervals
 
-        # Create 200 bookings linking users and listings
-        self.stdout.write("Creating bookings...")
+    def create_bookings(self, count, user_ids, listing_ids, intervals):
+        """
+        Insert bookings with one slot each. Approved bookings are subtracted
+        from the in-memory availability before it is written.
+        """
+        self.stdout.write(f"Creating {count} bookings...")
         bookings = []
-        status_choices = ["PENDING", "APPROVED", "DECLINED"]
-        for i in range(1, 201):
-            user = random.choice(users)
-            listing = random.choice(listings)
-            email = "no-email@example.com"
-            total_price = round(random.uniform(20.00, 500.00), 2)
-            status = random.choice(status_choices)
-            booking = Booking.objects.create(
-                user=user,
-                listing=listing,
-                email=email,
-                total_price=total_price,
-                status=status,
-            )
-            bookings.append(booking)
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f"Booking #{booking.pk} for listing '{listing.title}' created."
+        for _, size in _chunks(count, self.batch_size):
+            chunk = []
+            booked_intervals = []
+            for _ in range(size):
+                index = self.rng.randrange(len(listing_ids))
+                booking = Booking(
+                    user_id=self.rng.choice(user_ids),
+                    listing_id=listing_ids[index],
+                    email="no-email@example.com",
+                    total_price=round(self.rng.uniform(20.00, 500.00), 2),
+                    status=self.rng.choice(STATUS_CHOICES),
                 )
-            )
+                booked = None
+                if intervals[index]:
+                    booked = _random_booking_interval(
+                        self.rng, self.rng.choice(intervals[index])
+                    )
+                if booked and booking.status == "APPROVED":
+                    remaining = []
+                    for start_dt, end_dt in intervals[index]:
+                        remaining.extend(
+                            subtract_interval(start_dt, end_dt, booked[0], booked[1])
+                        )
+                    intervals[index] = merge_intervals(remaining)
+                chunk.append(booking)
+                booked_intervals.append(booked)
 
-        # Create BookingSlots for each booking (1 slot per booking)
-        self.stdout.write("Creating booking slots...")
-        for booking in bookings:
-            listing = booking.listing
-            listing_slots = list(listing.slots.all())
-            if not listing_slots:
-                continue
-            chosen_slot = random.choice(listing_slots)
-            # Compute listing slot start and end datetimes
-            listing_start_dt = datetime.combine(
-                chosen_slot.start_date, chosen_slot.start_time
-            )
-            listing_end_dt = datetime.combine(
-                chosen_slot.end_date, chosen_slot.end_time
-            )
-            total_minutes = int(
-                (listing_end_dt - listing_start_dt).total_seconds() // 60
-            )
-            if total_minutes < 30:
-                continue
-
-            # Choose a random start offset in 30-minute increments
-            max_offset_slots = (
-                total_minutes // 30 - 1
-            )  # ensure at least one slot is available
-            if max_offset_slots < 0:
-                max_offset_slots = 0
-            start_offset = random.randint(0, max_offset_slots) * 30
-            booking_start_dt = listing_start_dt + timedelta(minutes=start_offset)
-
-            # Choose a duration (in half-hour increments) that fits within the listing slot
-            remaining_minutes = total_minutes - start_offset
-            possible_durations = [
-                30 * i for i in range(1, (remaining_minutes // 30) + 1)
-            ]
-            if not possible_durations:
-                continue
-            duration = random.choice(possible_durations)
-            booking_end_dt = booking_start_dt + timedelta(minutes=duration)
-
-            bs_start_date = booking_start_dt.date()
-            bs_start_time = booking_start_dt.time().replace(second=0, microsecond=0)
-            bs_end_date = booking_end_dt.date()
-            bs_end_time = booking_end_dt.time().replace(second=0, microsecond=0)
-
-            booking_slot = BookingSlot.objects.create(
-                booking=booking,
-                start_date=bs_start_date,
-                start_time=bs_start_time,
-                end_date=bs_end_date,
-                end_time=bs_end_time,
+            # bulk_create skips Booking.save(), so no confirmation emails are sent.
+            chunk = Booking.objects.bulk_create(chunk)
+            BookingSlot.objects.bulk_create(
+                [
+                    BookingSlot(
+                        booking=booking,
+                        start_date=booked[0].date(),
+                        start_time=booked[0].time(),
+                        end_date=booked[1].date(),
+                        end_time=booked[1].time(),
+                    )
+                    for booking, booked in zip(chunk, booked_intervals)
+                    if booked
+                ],
+                batch_size=self.batch_size,
             )
-            booking_slot.booking = booking
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f"BookingSlot for Booking \
-                        #{booking.pk}: {bs_start_date} {bs_start_time} - {bs_end_date} {bs_end_time}"
+            bookings.extend(chunk)
+        return bookings
+
+    def create_listing_slots(self, listing_ids, intervals):
+        self.stdout.write("Creating listing slots...")
+        slots = []
+        for listing_id, listing_intervals in zip(listing_ids, intervals):
+            for start_dt, end_dt in listing_intervals:
+                slots.append(
+                    ListingSlot(
+                        listing_id=listing_id,
+                        start_date=start_dt.date(),
+                        start_time=start_dt.time(),
+                        end_date=end_dt.date(),
+                        end_time=end_dt.time(),
+                    )
                 )
-            )
-            # --- NEW: Subtract booking interval from listing availability if approved ---
-            if booking.status == "APPROVED":
-                block_out_booking(listing, booking)
-            # --- END NEW ---
-
-        # Create 100 reviews for random bookings; each review's created_at is before March 2025.
-        self.stdout.write("Creating reviews...")
-        review_bookings = random.sample(bookings, 100)
+            if len(slots) >= self.batch_size:
+                ListingSlot.objects.bulk_create(slots)
+                slots = []
+        ListingSlot.objects.bulk_create(slots)
+
+    def create_reviews(self, count, bookings):
+        """Create reviews with created_at spread between 2020 and March 2025."""
+        self.stdout.write(f"Creating {count} reviews...")
+        fake = Faker()
         start_date_dt = datetime(2020, 1, 1)
-        end_date_dt = datetime(2025, 3, 1)
-        for booking in review_bookings:
-            rating = random.randint(1, 5)
-            comment = fake.sentence(nb_words=10)
-            review = Review.objects.create(
-                booking=booking,
-                listing=booking.listing,
-                user=booking.user,
-                rating=rating,
-                comment=comment,
-            )
-            delta = end_date_dt - start_date_dt
-            random_seconds = random.randint(0, int(delta.total_seconds()))
-            random_date = start_date_dt + timedelta(seconds=random_seconds)
-            aware_random_date = timezone.make_aware(
-                random_date, timezone.get_default_timezone()
-            )
-            Review.objects.filter(pk=review.pk).update(created_at=aware_random_date)
-            self.stdout.write(
-                self.style.SUCCESS(f"Review for Booking #{booking.pk} created.")
-            )
+        span_seconds = int((datetime(2025, 3, 1) - start_date_dt).total_seconds())
+        default_tz = timezone.get_default_timezone()
 
-        self.stdout.write(self.style.SUCCESS("Fake data creation complete."))
+        review_bookings = self.rng.sample(bookings, count)
+        for start, size in _chunks(count, self.batch_size):
+            chunk = review_bookings[start:][:size]
+            reviews = Review.objects.bulk_create(
+                [
+                    Review(
+                        booking=booking,
+                        listing_id=booking.listing_id,
+                        user_id=booking.user_id,
+                        rating=self.rng.randint(1, 5),
+                        comment=fake.sentence(nb_words=10),
+                    )
+                    for booking in chunk
+                ]
+            )
+            # created_at is auto_now_add, so backdate it after the insert.
+            for review in reviews:
+                random_date = start_date_dt + timedelta(
+                    seconds=self.rng.randint(0, span_seconds)
+                )
+                review.created_at = timezone.make_aware(random_date, default_tz)
+            Review.objects.bulk_update(reviews, ["created_at"])
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.19 on 2026-10-19 12:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0009_verificationrequest"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["recipient", "-created_at"], name="notification_recipient_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                condition=models.Q(("read", False)),
+                fields=["recipient"],
+                name="notification_unread_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="verificationrequest",
+            index=models.Index(
+                condition=models.Q(("status", "PENDING")),
+                fields=["-created_at"],
+                name="verification_pending_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="verificationrequest",
+            index=models.Index(
+                fields=["user", "status"], name="verification_user_status_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,122 @@
+# Generated by Django 4.2.19 on 2026-10-19 12:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("accounts", "0010_notification_verification_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Broadcast",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "audience",
+                    models.CharField(
+                        choices=[
+                            ("ALL", "All Users"),
+                            ("OWNERS", "Verified Users Only"),
+                            ("SELECTED", "Selected Users"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("subject", models.CharField(max_length=255)),
+                ("content", models.TextField()),
+                (
+                    "notification_type",
+                    models.CharField(
+                        choices=[
+                            ("SYSTEM", "System Notification"),
+                            ("BOOKING", "Booking Notification"),
+                            ("ADMIN", "Admin Notification"),
+                            ("VERIFICATION", "Verification Notification"),
+                        ],
+                        default="ADMIN",
+                        max_length=15,
+                    ),
+                ),
+                ("recipient_count", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "sender",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="sent_broadcasts",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="broadcasts_read_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="BroadcastRecipient",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "broadcast",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="selected_recipients",
+                        to="accounts.broadcast",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="received_broadcasts",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="broadcastrecipient",
+            constraint=models.UniqueConstraint(
+                fields=("user", "broadcast"), name="broadcast_recipient_unique"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="broadcast",
+            index=models.Index(
+                fields=["sender", "-created_at"], name="broadcast_sender_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="broadcast",
+            index=models.Index(fields=["-created_at"], name="broadcast_created_idx"),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.19 on 2026-10-19 13:54
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def date_existing_verifications(apps, schema_editor):
+    # Verified when the latest approved request was approved, or else since
+    # joining, so existing users keep the OWNERS broadcasts they had
+    Profile = apps.get_model("accounts", "Profile")
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    VerificationRequest = apps.get_model("accounts", "VerificationRequest")
+    approved_at = (
+        VerificationRequest.objects.filter(user=OuterRef("user"), status="APPROVED")
+        .values("user")
+        .annotate(approved_at=Max("updated_at"))
+        .values("approved_at")
+    )
+    Profile.objects.filter(is_verified=True).update(
+        verified_at=Coalesce(
+            Subquery(approved_at),
+            Subquery(User.objects.filter(pk=OuterRef("user")).values("date_joined")),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("accounts", "0011_broadcast"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="left_staff_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="verified_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(date_existing_verifications, migrations.RunPython.noop),
+    ]
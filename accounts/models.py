@@ -1,8 +1,20 @@
 # accounts/models.py
+from collections import Counter
+
 from django.contrib.auth.models import User
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
+from django.utils import timezone
+
+from .counters import (
+    USER_COUNTERS,
+    bump_broadcast_generation,
+    increment_count,
+    reset_counts,
+)
+from .live import publish, user_channel
 
 
 class Profile(models.Model):
@@ -16,15 +28,69 @@ class Profile(models.Model):
     age = models.PositiveIntegerField(null=True, blank=True)
     address = models.TextField(null=True, blank=True)
     phone_number = models.CharField(max_length=20, null=True, blank=True)
+    # Broadcasts sent up to this time have been read
+    broadcasts_read_at = models.DateTimeField(null=True, blank=True)
+    # Only broadcasts sent since these times were addressed to the user
+    verified_at = models.DateTimeField(null=True, blank=True)
+    left_staff_at = models.DateTimeField(null=True, blank=True)
+
+    # Fields deciding which broadcasts the user has unread
+    BROADCAST_FIELDS = (
+        "is_verified",
+        "broadcasts_read_at",
+        "verified_at",
+        "left_staff_at",
+    )
 
     def __str__(self):
         return f"{self.user.username}'s Profile"
 
+    def save(self, *args, **kwargs):
+        if self.is_verified and self.verified_at is None:
+            self.verified_at = timezone.now()
+        elif not self.is_verified:
+            self.verified_at = None
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "is_verified" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "verified_at"}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        profile = super().from_db(db, field_names, values)
+        profile._saved_broadcast_state = profile.broadcast_state()
+        return profile
+
+    def broadcast_state(self):
+        # Read from __dict__ so deferred fields are not loaded
+        return tuple(self.__dict__.get(name) for name in self.BROADCAST_FIELDS)
+
+
+@receiver(pre_save, sender=User)
+def note_staff_removal(sender, instance, update_fields, **kwargs):
+    # Staff do not receive ALL or OWNERS broadcasts, so a former staff user
+    # only receives the ones sent after they left
+    if instance.pk is None or instance.is_staff:
+        return
+    if update_fields is not None and "is_staff" not in update_fields:
+        return
+    if User.objects.filter(pk=instance.pk, is_staff=True).exists():
+        instance._left_staff_at = timezone.now()
+
 
 @receiver(post_save, sender=User)
-def create_or_update_user_profile(sender, instance, created, **kwargs):
+def create_or_update_user_profile(sender, instance, created, update_fields, **kwargs):
+    left_staff_at = instance.__dict__.pop("_left_staff_at", None)
+    if left_staff_at is not None:
+        instance.profile.left_staff_at = left_staff_at
     if created:
         Profile.objects.create(user=instance)
+        # A new user starts from zero even if their id was used before
+        reset_counts(USER_COUNTERS, instance.pk)
+    elif update_fields is None or {"is_staff", "date_joined"} & set(update_fields):
+        # Staff and join date change which broadcasts the user receives. Logins
+        # only save last_login.
+        reset_counts(["broadcasts"], instance.pk)
     instance.profile.save()
 
 
@@ -57,11 +123,123 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["recipient", "-created_at"], name="notification_recipient_idx"
+            ),
+            # Unread badge count
+            models.Index(
+                fields=["recipient"],
+                condition=models.Q(read=False),
+                name="notification_unread_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Notification for {self.recipient.username}: {self.subject}"
 
 
+class Broadcast(models.Model):
+    """
+    A notification sent by an admin to many users at once.
+
+    The subject and content are stored once. Who receives it is worked out
+    when notifications are read: every non-staff user (ALL), verified users
+    (OWNERS) or the users listed in BroadcastRecipient (SELECTED), in each
+    case only users who had joined when it was sent. A broadcast counts as
+    read for a user once it is older than their Profile.broadcasts_read_at.
+    """
+
+    AUDIENCE_CHOICES = [
+        ("ALL", "All Users"),
+        ("OWNERS", "Verified Users Only"),
+        ("SELECTED", "Selected Users"),
+    ]
+
+    sender = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="sent_broadcasts",
+        null=True,
+        blank=True,
+    )
+    audience = models.CharField(max_length=10, choices=AUDIENCE_CHOICES)
+    subject = models.CharField(max_length=255)
+    content = models.TextField()
+    notification_type = models.CharField(
+        max_length=15, choices=Notification.NOTIFICATION_TYPES, default="ADMIN"
+    )
+    # Number of users the audience matched when it was sent
+    recipient_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["sender", "-created_at"], name="broadcast_sender_idx"),
+            models.Index(fields=["-created_at"], name="broadcast_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"Broadcast to {self.get_audience_display()}: {self.subject}"
+
+
+class BroadcastRecipient(models.Model):
+    """A user picked by hand as a recipient of a SELECTED broadcast."""
+
+    broadcast = models.ForeignKey(
+        Broadcast, on_delete=models.CASCADE, related_name="selected_recipients"
+    )
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="received_broadcasts"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "broadcast"], name="broadcast_recipient_unique"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} receives {self.broadcast.subject}"
+
+
+def broadcasts_for(user):
+    """
+    Return a queryset of the broadcasts the given user receives: the ones
+    their audience matched when they were sent, as counted in
+    Broadcast.recipient_count. A user verified after an OWNERS broadcast, or
+    who was staff when an ALL or OWNERS broadcast went out, does not get it.
+    """
+    selected = Q(
+        Exists(BroadcastRecipient.objects.filter(broadcast=OuterRef("pk"), user=user)),
+        audience="SELECTED",
+    )
+    audience = selected
+    if not user.is_staff:
+        profile = user.profile
+        general = Q(audience="ALL")
+        if profile.is_verified:
+            owners = Q(audience="OWNERS")
+            if profile.verified_at is not None:
+                owners &= Q(created_at__gte=profile.verified_at)
+            general |= owners
+        if profile.left_staff_at is not None:
+            general &= Q(created_at__gte=profile.left_staff_at)
+        audience |= general
+    return Broadcast.objects.filter(audience, created_at__gte=user.date_joined)
+
+
+def unread_broadcasts_for(user):
+    """Return a queryset of the broadcasts the given user has not read yet."""
+    broadcasts = broadcasts_for(user)
+    read_at = user.profile.broadcasts_read_at
+    if read_at is not None:
+        broadcasts = broadcasts.filter(created_at__gt=read_at)
+    return broadcasts
+
+
 # Update the accounts/models.py file with this new model
 
 
@@ -85,6 +263,83 @@ class VerificationRequest(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Admin queue of pending requests, newest first
+            models.Index(
+                fields=["-created_at"],
+                condition=models.Q(status="PENDING"),
+                name="verification_pending_idx",
+            ),
+            models.Index(
+                fields=["user", "status"], name="verification_user_status_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"Verification request for {self.user.username} ({self.get_status_display()})"
+
+
+@receiver(post_save, sender=Notification)
+def update_notification_counter(sender, instance, created, **kwargs):
+    if created:
+        if not instance.read:
+            increment_count("notifications", instance.recipient_id)
+    else:
+        reset_counts(["notifications"], instance.recipient_id)
+
+
+@receiver(post_save, sender=Notification)
+def publish_new_notification(sender, instance, created, **kwargs):
+    if created:
+        publish(
+            user_channel(instance.recipient_id),
+            "notification",
+            subject=instance.subject,
+            notification_type=instance.notification_type,
+            created_at=instance.created_at.isoformat(),
+        )
+
+
+def create_notifications(notifications):
+    """
+    Save many notifications with one INSERT. bulk_create skips the post_save
+    receivers above, so their counter updates and live events are sent here.
+    """
+    notifications = Notification.objects.bulk_create(notifications)
+    unread = Counter(
+        notification.recipient_id
+        for notification in notifications
+        if not notification.read
+    )
+    for recipient_id, count in unread.items():
+        increment_count("notifications", recipient_id, count)
+    for notification in notifications:
+        publish_new_notification(Notification, notification, created=True)
+    return notifications
+
+
+@receiver(post_delete, sender=Notification)
+def reset_notification_counter(sender, instance, **kwargs):
+    reset_counts(["notifications"], instance.recipient_id)
+
+
+@receiver(post_save, sender=VerificationRequest)
+@receiver(post_delete, sender=VerificationRequest)
+def reset_verification_counter(sender, instance, **kwargs):
+    reset_counts(["pending_verifications"])
+
+
+@receiver(post_save, sender=Profile)
+def reset_broadcast_counter(sender, instance, created, **kwargs):
+    # Verification changes which broadcasts the user receives. The profile is
+    # saved along with every User.save(), mostly unchanged.
+    state = instance.broadcast_state()
+    if not created and state != getattr(instance, "_saved_broadcast_state", None):
+        reset_counts(["broadcasts"], instance.user_id)
+    instance._saved_broadcast_state = state
+
+
+@receiver(post_save, sender=Broadcast)
+@receiver(post_delete, sender=Broadcast)
+def invalidate_broadcast_counters(sender, instance, **kwargs):
+    bump_broadcast_generation()
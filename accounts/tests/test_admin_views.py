@@ -3,13 +3,21 @@
 import shutil
 import tempfile
 
+from django.db import connection
 from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
 
-from accounts.models import Notification, VerificationRequest
-from accounts.views import create_notification
+from accounts.models import (
+    Broadcast,
+    Notification,
+    VerificationRequest,
+    broadcasts_for,
+    unread_broadcasts_for,
+)
+from accounts.views import create_broadcast, create_notification
 
 # Create a temporary directory for MEDIA_ROOT during tests
 TEMP_MEDIA_ROOT = tempfile.mkdtemp()
@@ -288,15 +296,19 @@ class NotificationViewsTest(TestCase):
             response.context["recipient_count"], 3
         )  # should be all non-admin users
 
-        # Check that notifications were created
-        self.assertEqual(
+        # The content is stored once, not per recipient
+        broadcast = Broadcast.objects.get(sender=self.admin)
+        self.assertEqual(broadcast.audience, "ALL")
+        self.assertEqual(broadcast.notification_type, "ADMIN")
+        self.assertEqual(broadcast.recipient_count, 3)
+        self.assertFalse(
             Notification.objects.filter(
-                sender=self.admin,
-                subject="Test Notification",
-                notification_type="ADMIN",
-            ).count(),
-            3,  # One for each non-admin user
+                sender=self.admin, subject="Test Notification"
+            ).exists()
         )
+        for user in (self.user1, self.user2, self.verified_user):
+            self.assertIn(broadcast, broadcasts_for(user))
+        self.assertNotIn(broadcast, broadcasts_for(self.admin))
 
     def test_admin_send_notification_post_verified_users(self):
         """Test sending notification to verified users only"""
@@ -314,15 +326,11 @@ class NotificationViewsTest(TestCase):
         self.assertTemplateUsed(response, "accounts/admin_notification_sent.html")
         self.assertEqual(response.context["recipient_count"], 1)  # only verified_user
 
-        # Check that notification was created
-        self.assertTrue(
-            Notification.objects.filter(
-                sender=self.admin,
-                recipient=self.verified_user,
-                subject="Test Notification",
-                notification_type="ADMIN",
-            ).exists()
-        )
+        # Only the verified user receives the broadcast
+        broadcast = Broadcast.objects.get(sender=self.admin)
+        self.assertEqual(broadcast.audience, "OWNERS")
+        self.assertIn(broadcast, broadcasts_for(self.verified_user))
+        self.assertNotIn(broadcast, broadcasts_for(self.user1))
 
     def test_admin_send_notification_post_selected_users(self):
         """Test sending notification to selected users"""
@@ -341,16 +349,102 @@ class NotificationViewsTest(TestCase):
         self.assertTemplateUsed(response, "accounts/admin_notification_sent.html")
         self.assertEqual(response.context["recipient_count"], 2)
 
-        # Check that notifications were created for both selected users
+        # Both selected users receive the broadcast, nobody else does
+        broadcast = Broadcast.objects.get(sender=self.admin)
+        self.assertEqual(broadcast.audience, "SELECTED")
         self.assertEqual(
-            Notification.objects.filter(
-                sender=self.admin,
-                subject="Test Notification",
-                notification_type="ADMIN",
-                recipient__in=[self.user1, self.user2],
-            ).count(),
-            2,
+            set(broadcast.selected_recipients.values_list("user", flat=True)),
+            {self.user1.id, self.user2.id},
+        )
+        self.assertIn(broadcast, broadcasts_for(self.user1))
+        self.assertIn(broadcast, broadcasts_for(self.user2))
+        self.assertNotIn(broadcast, broadcasts_for(self.verified_user))
+
+    def test_admin_send_notification_writes_content_once(self):
+        """Sending to all users writes one row whatever the number of users"""
+        self.client.login(username="admin", password="adminpass")
+        data = {"recipient_type": "ALL", "subject": "Hello", "content": "Hello all"}
+        with CaptureQueriesContext(connection) as few_users:
+            self.client.post(self.admin_send_notification_url, data)
+        for i in range(10):
+            User.objects.create_user(username=f"extra{i}", password="pass")
+        with CaptureQueriesContext(connection) as many_users:
+            self.client.post(self.admin_send_notification_url, data)
+        # One row written for the content, however many users receive it
+        for queries in (few_users, many_users):
+            inserts = [q for q in queries if q["sql"].startswith("INSERT")]
+            self.assertEqual(len(inserts), 1)
+            self.assertIn("accounts_broadcast", inserts[0]["sql"])
+        self.assertEqual(
+            list(
+                Broadcast.objects.order_by("id").values_list(
+                    "recipient_count", flat=True
+                )
+            ),
+            [3, 13],
+        )
+
+    def test_user_notifications_include_broadcasts(self):
+        """Broadcasts are listed with the user's notifications and marked read"""
+        create_broadcast(
+            sender=self.admin,
+            audience="ALL",
+            recipients=User.objects.exclude(is_staff=True),
+            subject="Broadcast",
+            content="To everyone",
         )
+        self.client.login(username="user1", password="userpass1")
+        response = self.client.get(self.user_notifications_url)
+
+        notifications = response.context["notifications"]
+        self.assertEqual(len(notifications), 3)
+        self.assertEqual(notifications[0].subject, "Broadcast")
+        self.assertTrue(all(notification.read for notification in notifications))
+        self.user1.profile.refresh_from_db()
+        self.assertIsNotNone(self.user1.profile.broadcasts_read_at)
+        self.assertFalse(unread_broadcasts_for(self.user1).exists())
+
+    def test_broadcast_audience_fixed_when_sent(self):
+        """Users only receive the broadcasts their audience matched when sent"""
+        owners = create_broadcast(
+            sender=self.admin,
+            audience="OWNERS",
+            recipients=User.objects.filter(profile__is_verified=True),
+            subject="Owners",
+            content="To owners",
+        )
+        everyone = create_broadcast(
+            sender=self.admin,
+            audience="ALL",
+            recipients=User.objects.exclude(is_staff=True),
+            subject="Everyone",
+            content="To everyone",
+        )
+        self.user1.profile.is_verified = True
+        self.user1.profile.save(update_fields=["is_verified"])
+        self.admin.is_staff = False
+        self.admin.save()
+        self.admin.refresh_from_db()
+
+        self.assertIsNotNone(self.user1.profile.verified_at)
+        self.assertIsNotNone(self.admin.profile.left_staff_at)
+        self.assertNotIn(owners, broadcasts_for(self.user1))
+        self.assertIn(everyone, broadcasts_for(self.user1))
+        self.assertFalse(broadcasts_for(self.admin).exists())
+        # The users receiving each broadcast are the ones it was counted for
+        users = User.objects.select_related("profile")
+        for broadcast in (owners, everyone):
+            receivers = [user for user in users if broadcast in broadcasts_for(user)]
+            self.assertEqual(len(receivers), broadcast.recipient_count)
+
+        later = create_broadcast(
+            sender=self.user2,
+            audience="OWNERS",
+            recipients=User.objects.filter(profile__is_verified=True),
+            subject="Later",
+            content="To owners",
+        )
+        self.assertIn(later, broadcasts_for(self.user1))
 
     def test_admin_send_notification_non_admin_forbidden(self):
         """Test that non-admin users cannot access send notification page"""
@@ -383,6 +477,108 @@ class NotificationViewsTest(TestCase):
         self.assertTemplateUsed(response, "accounts/admin_sent_notifications.html")
         self.assertIn("notification_groups", response.context)
 
+    def test_admin_sent_notifications_groups_in_database(self):
+        """Each broadcast and each legacy send is one group with its count"""
+        for recipient in (self.user1, self.user2):
+            create_notification(
+                sender=self.admin,
+                recipient=recipient,
+                subject="Legacy",
+                content="Sent one row per recipient.",
+                notification_type="ADMIN",
+            )
+        create_broadcast(self.admin, "ALL", User.objects.none(), "To everyone", "Hello")
+        create_broadcast(
+            self.admin,
+            "SELECTED",
+            User.objects.filter(pk=self.user2.pk),
+            "To one",
+            "Hi",
+        )
+
+        self.client.login(username="admin", password="adminpass")
+        response = self.client.get(self.admin_sent_notifications_url)
+
+        groups = {
+            group["subject"]: group for group in response.context["notification_groups"]
+        }
+        self.assertEqual(
+            set(groups),
+            {
+                "Legacy",
+                "To everyone",
+                "To one",
+                "Test Notification 1",
+                "Test Notification 2",
+            },
+        )
+        self.assertEqual(groups["Legacy"]["recipient_count"], 2)
+        self.assertIsNone(groups["Legacy"]["audience"])
+        self.assertEqual(groups["To everyone"]["audience"], "All Users")
+        self.assertEqual(groups["To one"]["recipient_count"], 1)
+        # Newest first
+        self.assertEqual(
+            response.context["notification_groups"][0]["subject"], "To one"
+        )
+
+    def test_admin_sent_notifications_paginated(self):
+        """Groups are split into pages"""
+        for i in range(25):
+            create_broadcast(
+                self.admin, "ALL", User.objects.none(), f"Broadcast {i}", "Hello"
+            )
+
+        self.client.login(username="admin", password="adminpass")
+        response = self.client.get(self.admin_sent_notifications_url)
+        self.assertEqual(len(response.context["notification_groups"]), 20)
+        self.assertEqual(response.context["page_obj"].paginator.count, 27)
+
+        response = self.client.get(self.admin_sent_notifications_url + "?page=2")
+        self.assertEqual(len(response.context["notification_groups"]), 7)
+
+    def test_admin_sent_notification_recipients(self):
+        """Recipients of a group are loaded on demand"""
+        first = None
+        for recipient in (self.user2, self.user1):
+            notification = create_notification(
+                sender=self.admin,
+                recipient=recipient,
+                subject="Legacy",
+                content="Sent one row per recipient.",
+                notification_type="ADMIN",
+            )
+            first = first or notification
+        broadcast = create_broadcast(
+            self.admin,
+            "SELECTED",
+            User.objects.filter(pk__in=[self.user2.pk, self.verified_user.pk]),
+            "To two",
+            "Hi",
+        )
+        url = reverse("admin_sent_notification_recipients")
+
+        self.client.login(username="admin", password="adminpass")
+        response = self.client.get(url, {"notification": first.pk})
+        self.assertEqual(
+            response.json(), {"recipients": ["user1", "user2"], "next_page": None}
+        )
+        response = self.client.get(url, {"broadcast": broadcast.pk})
+        self.assertEqual(response.json()["recipients"], ["user2", "verified"])
+
+    def test_admin_sent_notification_recipients_invalid_id(self):
+        """Malformed or missing ids are a 404, not a server error"""
+        url = reverse("admin_sent_notification_recipients")
+        self.client.login(username="admin", password="adminpass")
+        for params in ({"broadcast": "abc"}, {"notification": "1x"}, {}):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 404, params)
+
+    def test_admin_sent_notification_recipients_non_admin_forbidden(self):
+        """Non-admin users cannot list recipients"""
+        self.client.login(username="user1", password="userpass1")
+        response = self.client.get(reverse("admin_sent_notification_recipients"))
+        self.assertEqual(response.status_code, 403)
+
     def test_admin_sent_notifications_non_admin_forbidden(self):
         """Test that non-admin users cannot access sent notifications page"""
         self.client.login(username="user1", password="userpass1")
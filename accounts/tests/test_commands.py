@@ -0,0 +1,121 @@
+import datetime as dt
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import Profile
+from booking.models import Booking, BookingSlot
+from listings.models import Listing, ListingSlot, Review
+
+
+class CreateFakeDataCommandTest(TestCase):
+    def run_command(self, **options):
+        call_command("create_fake_data", stdout=StringIO(), **options)
+
+    def test_creates_requested_volume(self):
+        self.run_command(users=3, listings=7, bookings=12, reviews=5, batch_size=4)
+
+        self.assertEqual(
+            User.objects.filter(username__startswith="fakeuser").count(), 3
+        )
+        self.assertEqual(Listing.objects.count(), 7)
+        self.assertEqual(Booking.objects.count(), 12)
+        self.assertEqual(Review.objects.count(), 5)
+        self.assertTrue(ListingSlot.objects.exists())
+        # bulk_create bypasses Listing.save(), so districts are tagged up front
+        self.assertFalse(Listing.objects.filter(borough="").exists())
+        self.assertTrue(
+            User.objects.get(username="fakeuser1").check_password("testdata")
+        )
+        # Reviews are backdated
+        self.assertFalse(
+            Review.objects.filter(created_at__date__gte=dt.date(2025, 3, 2)).exists()
+        )
+
+    def test_approved_bookings_are_blocked_out(self):
+        self.run_command(users=2, listings=3, bookings=30, reviews=0)
+
+        for slot in BookingSlot.objects.filter(booking__status="APPROVED"):
+            start = dt.datetime.combine(slot.start_date, slot.start_time)
+            end = dt.datetime.combine(slot.end_date, slot.end_time)
+            for avail in ListingSlot.objects.filter(listing=slot.booking.listing):
+                avail_start = dt.datetime.combine(avail.start_date, avail.start_time)
+                avail_end = dt.datetime.combine(avail.end_date, avail.end_time)
+                self.assertFalse(avail_start < end and start < avail_end)
+
+    def test_rerun_replaces_existing_fake_data(self):
+        self.run_command(users=2, listings=2, bookings=2, reviews=1)
+        self.run_command(users=2, listings=2, bookings=2, reviews=1)
+
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Profile.objects.count(), 2)
+        self.assertEqual(Listing.objects.count(), 2)
+        self.assertEqual(Booking.objects.count(), 2)
+        self.assertEqual(Review.objects.count(), 1)
+
+    def test_seed_usernames_do_not_clash_with_old_seeds(self):
+        User.objects.create_user(
+            username="user1", email="user1@example.com", password="pass"
+        )
+
+        self.run_command(users=2, listings=2, bookings=0, reviews=0)
+
+        self.assertEqual(User.objects.count(), 3)
+
+    def test_refuses_to_reuse_real_usernames(self):
+        User.objects.create_user(
+            username="fakeuser1", email="someone@example.com", password="pass"
+        )
+
+        with self.assertRaises(CommandError):
+            self.run_command(users=2, listings=2, bookings=0, reviews=0)
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_rejects_negative_sizes(self):
+        for name in ("bookings", "reviews"):
+            with self.subTest(name=name), self.assertRaises(CommandError):
+                self.run_command(**{name: -1})
+        self.assertFalse(User.objects.exists())
+
+    def test_seeded_users_can_log_in(self):
+        self.run_command(users=2, listings=3, bookings=4, reviews=1)
+
+        self.assertTrue(self.client.login(username="fakeuser1", password="testdata"))
+        for name in (
+            "view_listings",
+            "my_bookings",
+            "manage_listings",
+            "bookmarked_listings",
+            "user_notifications",
+            "inbox",
+            "profile",
+        ):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name))
+                self.assertEqual(response.status_code, 200)
+
+    def test_rerun_keeps_real_users(self):
+        self.run_command(users=2, listings=2, bookings=0, reviews=0)
+        real_user = User.objects.create_user(
+            username="user2024", email="user2024@example.com", password="pass"
+        )
+        real_listing = Listing.objects.create(
+            user=real_user,
+            title="Real Spot",
+            location="Somewhere",
+            rent_per_hour="10.00",
+            description="Spot",
+        )
+        # A real booking of a seeded listing goes with the listing
+        seeded_listing = Listing.objects.exclude(pk=real_listing.pk).first()
+        Booking.objects.create(user=real_user, listing=seeded_listing)
+
+        self.run_command(users=2, listings=2, bookings=0, reviews=0)
+
+        self.assertTrue(User.objects.filter(pk=real_user.pk).exists())
+        self.assertTrue(Listing.objects.filter(pk=real_listing.pk).exists())
+        self.assertFalse(Booking.objects.exists())
+        self.assertEqual(Listing.objects.count(), 3)
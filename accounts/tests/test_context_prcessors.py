@@ -1,17 +1,24 @@
+from django.core.cache import cache
+from django.db import connection, transaction
 from django.test import TestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from django.contrib.auth.models import User, AnonymousUser
-from accounts.models import Notification, VerificationRequest
+from accounts.models import Notification, VerificationRequest, create_notifications
+from accounts.views import create_broadcast
 from messaging.models import Message
 from accounts.context_processors import (
     notification_count,
     verification_count,
     report_count,
+    unread_counters,
 )
 
 
 class NotificationCountTest(TestCase):
     def setUp(self):
         """Set up test data and request factory"""
+        cache.clear()
         self.factory = RequestFactory()
 
         # Create users
@@ -77,6 +84,22 @@ class NotificationCountTest(TestCase):
         self.assertEqual(context["unread_message_count"], 1)
         self.assertEqual(context["total_unread_count"], 4)
 
+    def test_bulk_created_notifications_counted(self):
+        """Notifications saved with create_notifications update the cached count"""
+        request = self.factory.get("/")
+        request.user = self.user
+        notification_count(request)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_notifications(
+                [
+                    Notification(recipient=self.user, subject="Bulk", read=read)
+                    for read in (False, False, True)
+                ]
+            )
+        context = notification_count(request)
+        self.assertEqual(context["unread_notification_count"], 5)
+
     def test_notification_count_unauthenticated(self):
         """Test notification_count for an unauthenticated user"""
         request = self.factory.get("/")
@@ -116,6 +139,7 @@ class NotificationCountTest(TestCase):
 class VerificationCountTest(TestCase):
     def setUp(self):
         """Set up test data and request factory"""
+        cache.clear()
         self.factory = RequestFactory()
 
         # Create users
@@ -179,6 +203,7 @@ class VerificationCountTest(TestCase):
 class ReportCountTest(TestCase):
     def setUp(self):
         """Set up test data and request factory"""
+        cache.clear()
         self.factory = RequestFactory()
 
         # Create users
@@ -227,3 +252,195 @@ class ReportCountTest(TestCase):
 
         context = report_count(request)
         self.assertEqual(context["pending_reports_count"], 0)
+
+
+class UnreadCountersTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(username="testuser", password="pass")
+        self.admin = User.objects.create_user(
+            username="admin", password="adminpass", is_staff=True
+        )
+        self.sender = User.objects.create_user(username="sender", password="pass")
+        Notification.objects.create(
+            sender=self.sender, recipient=self.user, subject="N", content="c"
+        )
+        Message.objects.create(
+            sender=self.sender, recipient=self.user, subject="Hi", body="b"
+        )
+        Message.objects.create(
+            sender=self.admin,
+            recipient=self.user,
+            subject="Account Verification Approved",
+            body="b",
+        )
+
+    def counters_for(self, user):
+        request = self.factory.get("/")
+        request.user = user
+        return unread_counters(request)
+
+    def test_all_counts_in_one_processor(self):
+        counters = self.counters_for(self.user)
+        self.assertEqual(counters["unread_count"], 2)
+        self.assertEqual(counters["unread_notification_count"], 1)
+        self.assertEqual(counters["unread_message_count"], 1)
+        self.assertEqual(counters["total_unread_count"], 2)
+        self.assertEqual(counters["pending_verifications_count"], 0)
+        self.assertEqual(counters["pending_reports_count"], 0)
+
+    def test_counts_are_cached(self):
+        self.counters_for(self.user)
+        with self.assertNumQueries(0):
+            self.counters_for(self.user)
+
+    def test_counts_follow_creates_and_reads(self):
+        self.counters_for(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            notification = Notification.objects.create(
+                sender=self.sender, recipient=self.user, subject="N2", content="c"
+            )
+            Message.objects.create(
+                sender=self.sender, recipient=self.user, subject="Again", body="b"
+            )
+        with self.assertNumQueries(0):
+            counters = self.counters_for(self.user)
+        self.assertEqual(counters["unread_notification_count"], 2)
+        self.assertEqual(counters["unread_message_count"], 2)
+
+        notification.read = True
+        with self.captureOnCommitCallbacks(execute=True):
+            notification.save()
+        self.assertEqual(self.counters_for(self.user)["unread_notification_count"], 1)
+
+    def test_rolled_back_changes_leave_counts_alone(self):
+        self.counters_for(self.user)
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                Notification.objects.create(
+                    sender=self.sender, recipient=self.user, subject="N2", content="c"
+                )
+                transaction.set_rollback(True)
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.counters_for(self.user)["unread_notification_count"], 1)
+
+    def test_login_leaves_counts_alone(self):
+        self.counters_for(self.user)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.login(username="testuser", password="pass")
+        self.assertEqual(callbacks, [])
+
+    def test_broadcasts_counted_until_read(self):
+        self.counters_for(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            create_broadcast(
+                sender=self.admin,
+                audience="ALL",
+                recipients=User.objects.exclude(is_staff=True),
+                subject="Hello",
+                content="Everyone",
+            )
+        # The new broadcast invalidates every cached broadcast count
+        counters = self.counters_for(self.user)
+        self.assertEqual(counters["unread_notification_count"], 2)
+        self.assertEqual(counters["total_unread_count"], 3)
+        self.assertEqual(self.counters_for(self.admin)["unread_notification_count"], 0)
+
+        self.client.login(username="testuser", password="pass")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse("user_notifications"))
+        self.assertEqual(self.counters_for(self.user)["unread_notification_count"], 0)
+
+    def test_verification_changes_broadcast_count(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.profile.is_verified = True
+        with self.captureOnCommitCallbacks(execute=True):
+            user.profile.save()
+            create_broadcast(
+                sender=self.admin,
+                audience="OWNERS",
+                recipients=User.objects.filter(pk=user.pk),
+                subject="Owners",
+                content="Verified owners only",
+            )
+        self.assertEqual(self.counters_for(user)["unread_notification_count"], 2)
+
+        user.profile.is_verified = False
+        with self.captureOnCommitCallbacks(execute=True):
+            user.profile.save()
+        self.assertEqual(self.counters_for(user)["unread_notification_count"], 1)
+        # Verified again, the user does not get back what was sent before
+        user.profile.is_verified = True
+        with self.captureOnCommitCallbacks(execute=True):
+            user.profile.save()
+        self.assertEqual(self.counters_for(user)["unread_notification_count"], 1)
+
+    def test_staff_counts(self):
+        VerificationRequest.objects.create(user=self.user, status="PENDING")
+        counters = self.counters_for(self.admin)
+        self.assertEqual(counters["pending_verifications_count"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            VerificationRequest.objects.create(user=self.sender, status="PENDING")
+        self.assertEqual(
+            self.counters_for(self.admin)["pending_verifications_count"], 2
+        )
+
+    def test_unauthenticated(self):
+        counters = self.counters_for(AnonymousUser())
+        self.assertEqual(set(counters.values()), {0})
+
+
+class LazyCountersTest(TestCase):
+    COUNTER_TABLES = (
+        "accounts_broadcast",
+        "accounts_notification",
+        "accounts_verificationrequest",
+        "messaging_message",
+        "reports_report",
+    )
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(
+            username="admin", password="adminpass", is_staff=True
+        )
+        self.client.login(username="admin", password="adminpass")
+
+    def counter_queries(self, queries):
+        return [
+            query["sql"]
+            for query in queries
+            if any(table in query["sql"] for table in self.COUNTER_TABLES)
+        ]
+
+    def test_values_computed_on_first_use(self):
+        request = RequestFactory().get("/")
+        request.user = self.admin
+        with self.assertNumQueries(0):
+            counters = unread_counters(request)
+        with self.assertNumQueries(6):
+            self.assertEqual(counters["pending_reports_count"], 0)
+        # Every other value was loaded by the first lookup
+        with self.assertNumQueries(0):
+            self.assertFalse(counters["total_unread_count"] > 0)
+            self.assertEqual(counters["unread_count"] + 1, 1)
+
+    def test_ajax_endpoints_run_no_counter_queries(self):
+        ajax_requests = [
+            (reverse("view_listings"), {"ajax": "1"}),
+            (reverse("map_view_listings"), {}),
+            (reverse("available_times"), {"listing_id": "1", "date": "bad"}),
+        ]
+        for url, params in ajax_requests:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.counter_queries(queries), [], url)
+
+    def test_full_page_renders_counts(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("view_listings"))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(self.counter_queries(queries), [])
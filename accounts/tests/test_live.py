@@ -0,0 +1,339 @@
+import asyncio
+import json
+import os
+import threading
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.db import connection
+from django.test import (
+    AsyncRequestFactory,
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from accounts.context_processors import live_updates as live_updates_context
+from accounts.live import (
+    BROADCASTS_CHANNEL,
+    DISCONNECTED_SCOPE_KEY,
+    RESYNC_EVENT,
+    STAFF_CHANNEL,
+    InProcessBroker,
+    PostgresBroker,
+    get_broker,
+    live_updates_reach_all_workers,
+    notify_disconnect,
+    user_channel,
+)
+from accounts.models import Notification
+from accounts.views import create_broadcast, live_update_stream, live_updates
+from messaging.models import Message
+
+
+def parse_events(chunk):
+    """Return the (event, data) pairs in a chunk of server-sent events."""
+    events = []
+    for block in chunk.strip().split("\n\n"):
+        fields = dict(
+            line.split(": ", 1)
+            for line in block.split("\n")
+            if not line.startswith(":")
+        )
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+class InProcessBrokerTest(TestCase):
+    async def test_publish_from_another_thread(self):
+        broker = InProcessBroker()
+        with broker.subscribe("a", "b") as queue:
+            thread = threading.Thread(
+                target=broker.publish, args=("b", {"type": "counters"})
+            )
+            thread.start()
+            thread.join()
+            event = await asyncio.wait_for(queue.get(), 1)
+            self.assertEqual(event, {"type": "counters"})
+            broker.publish("c", {"type": "counters"})
+            await asyncio.sleep(0)
+            self.assertTrue(queue.empty())
+        # Unsubscribed on exit
+        self.assertEqual(broker._subscribers, {})
+
+    async def test_overflow_asks_for_resync(self):
+        broker = InProcessBroker(max_queued=2)
+        with broker.subscribe("a") as queue:
+            for i in range(3):
+                broker.publish("a", {"type": "message", "subject": str(i)})
+            await asyncio.sleep(0)
+            self.assertEqual(queue.qsize(), 1)
+            self.assertEqual(queue.get_nowait(), RESYNC_EVENT)
+
+
+class SharedBroker(InProcessBroker):
+    single_process = False
+
+
+@override_settings(LIVE_UPDATES_BROKER="accounts.live.InProcessBroker")
+class SeveralWorkersTest(TestCase):
+    def test_single_process_broker_with_several_workers(self):
+        with mock.patch.dict(os.environ, {"WEB_CONCURRENCY": "1"}):
+            self.assertTrue(live_updates_reach_all_workers())
+        with mock.patch.dict(os.environ, {"WEB_CONCURRENCY": "3"}):
+            self.assertFalse(live_updates_reach_all_workers())
+            with override_settings(
+                LIVE_UPDATES_BROKER="accounts.tests.test_live.SharedBroker"
+            ):
+                self.assertTrue(live_updates_reach_all_workers())
+
+    @mock.patch.dict(os.environ, {"WEB_CONCURRENCY": "3"})
+    async def test_live_updates_turned_off(self):
+        request = AsyncRequestFactory().get("/accounts/live/")
+        self.assertFalse(live_updates_context(request)["live_updates_enabled"])
+        request.user = await sync_to_async(User.objects.create_user)(
+            username="user", password="pass123"
+        )
+        response = await live_updates(request)
+        self.assertEqual(response.status_code, 204)
+
+
+class PostgresBrokerTest(TestCase):
+    def test_publish_sends_notify(self):
+        broker = PostgresBroker()
+        with mock.patch.object(PostgresBroker, "single_process", False), mock.patch(
+            "accounts.live.connections"
+        ) as connections:
+            cursor = connections.__getitem__().cursor().__enter__()
+            broker.publish("user:1", {"type": "counters"})
+            broker.publish(
+                "broadcasts",
+                {"type": "broadcast", "recipient_ids": list(range(5000))},
+            )
+
+        (_, (channel, payload)), (_, (_, oversized)) = [
+            call.args for call in cursor.execute.call_args_list
+        ]
+        self.assertEqual(channel, PostgresBroker.pg_channel)
+        self.assertEqual(
+            json.loads(payload), {"channel": "user:1", "event": {"type": "counters"}}
+        )
+        # Too large for NOTIFY, so the streams resync instead
+        self.assertEqual(
+            json.loads(oversized), {"channel": "broadcasts", "event": RESYNC_EVENT}
+        )
+
+    async def test_in_process_on_other_databases(self):
+        if connection.vendor == "postgresql":
+            self.skipTest("Runs on databases without LISTEN/NOTIFY")
+        broker = PostgresBroker()
+        self.assertTrue(broker.single_process)
+        with broker.subscribe("a") as queue:
+            broker.publish("a", {"type": "counters"})
+            event = await asyncio.wait_for(queue.get(), 1)
+        self.assertEqual(event, {"type": "counters"})
+        self.assertIsNone(broker._listener)
+
+
+class PostgresBrokerListenTest(TransactionTestCase):
+    async def test_events_reach_other_connections(self):
+        if connection.vendor != "postgresql":
+            self.skipTest("Needs PostgreSQL LISTEN/NOTIFY")
+        listening, publishing = PostgresBroker(), PostgresBroker()
+        with listening.subscribe("a") as queue:
+            # Wait for the listener to LISTEN before publishing
+            await asyncio.sleep(0.5)
+            await sync_to_async(publishing.publish)("a", {"type": "counters"})
+            event = await asyncio.wait_for(queue.get(), 5)
+        self.assertEqual(event, {"type": "counters"})
+
+
+class NotifyDisconnectTest(TestCase):
+    async def test_sets_event_when_client_disconnects(self):
+        messages = asyncio.Queue()
+        await messages.put({"type": "http.request", "body": b"", "more_body": False})
+        seen = {}
+
+        async def application(scope, receive, send):
+            await receive()
+            seen["event"] = scope[DISCONNECTED_SCOPE_KEY]
+            await messages.put({"type": "http.disconnect"})
+            # A stream runs until the client goes away
+            await asyncio.wait_for(scope[DISCONNECTED_SCOPE_KEY].wait(), 1)
+
+        await notify_disconnect(application)({"type": "http"}, messages.get, None)
+        self.assertTrue(seen["event"].is_set())
+
+
+@override_settings(LIVE_UPDATES_BROKER="accounts.live.RecordingBroker")
+class LiveUpdatePublishingTest(TestCase):
+    """Receivers publish events once the transaction commits."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="user", password="pass123")
+        self.other = User.objects.create_user(username="other", password="pass123")
+        self.broker = get_broker()
+        self.broker.published.clear()
+
+    def published(self, channel):
+        return [event for name, event in self.broker.published if name == channel]
+
+    def test_new_notification(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.create(recipient=self.user, subject="Hello")
+
+        events = self.published(user_channel(self.user.pk))
+        self.assertIn({"type": "counters"}, events)
+        self.assertEqual(events[-1]["type"], "notification")
+        self.assertEqual(events[-1]["subject"], "Hello")
+
+    def test_new_message(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Message.objects.create(
+                sender=self.other, recipient=self.user, subject="Hi", body="Hi"
+            )
+
+        event = self.published(user_channel(self.user.pk))[-1]
+        self.assertEqual(event["type"], "message")
+        self.assertEqual(event["sender"], "other")
+
+    def test_broadcast(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_broadcast(
+                self.other, "SELECTED", User.objects.filter(pk=self.user.pk), "S", "C"
+            )
+
+        events = self.published(BROADCASTS_CHANNEL)
+        self.assertIn({"type": "counters"}, events)
+        self.assertEqual(events[-1]["recipient_ids"], [self.user.pk])
+
+    def test_nothing_published_before_commit(self):
+        Notification.objects.create(recipient=self.user, subject="Hello")
+        self.assertEqual(self.broker.published, [])
+
+
+class LiveUpdateStreamTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="user", password="pass123")
+        self.staff = User.objects.create_user(
+            username="staff", password="pass123", is_staff=True
+        )
+
+    async def test_counts_then_changes(self):
+        broker = InProcessBroker()
+        user = await sync_to_async(User.objects.select_related("profile").get)(
+            pk=self.user.pk
+        )
+        stream = live_update_stream(user, broker, duration=5, heartbeat=5)
+
+        [(name, counts)] = parse_events(await anext(stream))
+        self.assertEqual(name, "counters")
+        self.assertEqual(counts["unread_notification_count"], 0)
+
+        await sync_to_async(Notification.objects.create)(
+            recipient=self.user, subject="Hello"
+        )
+        # Cached counts change on commit, which never comes inside a test
+        await cache.aclear()
+        broker.publish(user_channel(user.pk), {"type": "counters"})
+        # Only the counts that changed are sent
+        self.assertEqual(
+            parse_events(await anext(stream)),
+            [
+                (
+                    "counters",
+                    {
+                        "unread_notification_count": 1,
+                        "total_unread_count": 1,
+                    },
+                )
+            ],
+        )
+
+        broker.publish(
+            BROADCASTS_CHANNEL,
+            {
+                "type": "broadcast",
+                "audience": "OWNERS",
+                "recipient_ids": [],
+                "subject": "Owners only",
+                "notification_type": "ADMIN",
+                "created_at": "",
+            },
+        )
+        broker.publish(
+            user_channel(user.pk),
+            {"type": "message", "subject": "Hi", "sender": "other"},
+        )
+        # The broadcast is for verified users only
+        self.assertEqual(
+            parse_events(await anext(stream)),
+            [("message", {"subject": "Hi", "sender": "other"})],
+        )
+        await stream.aclose()
+        self.assertEqual(broker._subscribers, {})
+
+    async def test_staff_subscribe_to_staff_channel(self):
+        broker = InProcessBroker()
+        stream = live_update_stream(self.staff, broker, duration=5, heartbeat=5)
+        await anext(stream)
+        self.assertIn(STAFF_CHANNEL, broker._subscribers)
+        await stream.aclose()
+
+    async def test_heartbeat_and_end(self):
+        stream = live_update_stream(
+            self.user, InProcessBroker(), duration=0.2, heartbeat=0.05
+        )
+        await anext(stream)
+        self.assertEqual(await anext(stream), ": keep-alive\n\n")
+        rest = [chunk async for chunk in stream]
+        self.assertTrue(all(chunk == ": keep-alive\n\n" for chunk in rest))
+
+    async def test_disconnect_ends_stream(self):
+        broker = InProcessBroker()
+        disconnected = asyncio.Event()
+        stream = live_update_stream(
+            self.user, broker, duration=60, heartbeat=60, disconnected=disconnected
+        )
+        await anext(stream)
+        disconnected.set()
+        rest = await asyncio.wait_for(self.collect(stream), 1)
+        self.assertEqual(rest, [])
+        self.assertEqual(broker._subscribers, {})
+
+    async def collect(self, stream):
+        return [chunk async for chunk in stream]
+
+    def test_not_streamed_under_wsgi(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("live_updates"))
+        self.assertEqual(response.status_code, 204)
+        # Pages served over WSGI do not open the stream
+        response = self.client.get(reverse("user_notifications"))
+        self.assertNotContains(response, "live_updates.js")
+
+    def test_context_processor(self):
+        request = RequestFactory().get("/")
+        self.assertFalse(live_updates_context(request)["live_updates_enabled"])
+        request = AsyncRequestFactory().get("/")
+        self.assertTrue(live_updates_context(request)["live_updates_enabled"])
+
+    async def test_view(self):
+        request = AsyncRequestFactory().get("/accounts/live/")
+        request.user = AnonymousUser()
+        response = await live_updates(request)
+        self.assertEqual(response.status_code, 204)
+
+        request.user = self.user
+        response = await live_updates(request)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        first = await anext(response.streaming_content)
+        self.assertTrue(first.startswith(b"retry: "))
+        await response.streaming_content.aclose()
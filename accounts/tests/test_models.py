@@ -6,7 +6,15 @@ import tempfile
 from django.test import TestCase, override_settings
 from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
-from accounts.models import Profile
+from django.utils import timezone
+
+from accounts.models import (
+    Broadcast,
+    BroadcastRecipient,
+    Profile,
+    broadcasts_for,
+    unread_broadcasts_for,
+)
 
 # Create a temporary directory for MEDIA_ROOT during tests.
 TEMP_MEDIA_ROOT = tempfile.mkdtemp()
@@ -88,3 +96,48 @@ class ProfileModelTest(TestCase):
         self.assertTrue(profile.verification_file)
         # Check that the file name ends with .pdf
         self.assertTrue(profile.verification_file.name.endswith(".pdf"))
+
+
+class BroadcastModelTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username="admin", password="adminpass", is_staff=True
+        )
+        self.user = User.objects.create_user(username="user", password="pass")
+        self.owner = User.objects.create_user(username="owner", password="pass")
+        self.owner.profile.is_verified = True
+        self.owner.profile.save()
+
+    def broadcast(self, audience):
+        return Broadcast.objects.create(
+            sender=self.admin, audience=audience, subject="Hi", content="Hello"
+        )
+
+    def test_audiences(self):
+        to_all = self.broadcast("ALL")
+        to_owners = self.broadcast("OWNERS")
+        to_selected = self.broadcast("SELECTED")
+        BroadcastRecipient.objects.create(broadcast=to_selected, user=self.user)
+
+        self.assertEqual(set(broadcasts_for(self.user)), {to_all, to_selected})
+        self.assertEqual(set(broadcasts_for(self.owner)), {to_all, to_owners})
+        self.assertEqual(set(broadcasts_for(self.admin)), set())
+
+    def test_users_joining_later_do_not_receive_it(self):
+        broadcast = self.broadcast("ALL")
+        newcomer = User.objects.create_user(username="newcomer", password="pass")
+        self.assertIn(broadcast, broadcasts_for(self.user))
+        self.assertNotIn(broadcast, broadcasts_for(newcomer))
+
+    def test_read_watermark(self):
+        old = self.broadcast("ALL")
+        self.user.profile.broadcasts_read_at = timezone.now()
+        self.user.profile.save()
+        new = self.broadcast("ALL")
+        self.assertEqual(list(unread_broadcasts_for(self.user)), [new])
+        self.assertIn(old, broadcasts_for(self.user))
+
+    def test_str(self):
+        self.assertEqual(
+            str(self.broadcast("OWNERS")), "Broadcast to Verified Users Only: Hi"
+        )
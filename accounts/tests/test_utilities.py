@@ -1,15 +1,35 @@
 # accounts/tests/test_utilities.py
 
 import json
+import os
+import tempfile
 import unittest
 from unittest.mock import mock_open, patch
 
 from shapely.geometry import Point, shape
-from accounts.utilities import get_valid_nyc_coordinate
+from accounts.utilities import (
+    borough_for_district,
+    find_nyc_district,
+    find_nyc_districts,
+    get_nyc_land,
+    get_valid_nyc_coordinate,
+    is_in_nyc,
+    load_nyc_districts,
+    nyc_district_choices,
+    sample_nyc_coordinates,
+)
+
+
+def clear_nyc_geometry_caches():
+    load_nyc_districts.cache_clear()
+    get_nyc_land.cache_clear()
 
 
 class GetValidNYCCoordinateTest(unittest.TestCase):
     def setUp(self):
+        # The land polygon is cached, so make each test load its own GeoJSON
+        clear_nyc_geometry_caches()
+        self.addCleanup(clear_nyc_geometry_caches)
         # Create a dummy GeoJSON that covers the entire NYC_BOUNDS defined in the function.
         # This polygon is a rectangle matching the bounding box.
         self.dummy_geojson = {
@@ -72,6 +92,70 @@ class GetValidNYCCoordinateTest(unittest.TestCase):
         polygon = shape(self.dummy_geojson["features"][0]["geometry"])
         self.assertTrue(polygon.contains(point))
 
+    def test_polygons_loaded_once(self):
+        with patch("builtins.open", new_callable=mock_open) as mock_file:
+            mock_file.return_value.read.return_value = self.dummy_geojson_str
+            get_valid_nyc_coordinate()
+            get_valid_nyc_coordinate()
+        self.assertEqual(mock_file.call_count, 1)
+
+
+class SampleNYCCoordinatesTest(unittest.TestCase):
+    def setUp(self):
+        clear_nyc_geometry_caches()
+
+    def test_samples_fall_on_land(self):
+        coordinates = sample_nyc_coordinates(200, seed=1)
+        self.assertEqual(len(coordinates), 200)
+        for latitude, longitude in coordinates:
+            self.assertTrue(is_in_nyc(latitude, longitude))
+
+    def test_seed_is_reproducible(self):
+        self.assertEqual(
+            sample_nyc_coordinates(5, seed=7), sample_nyc_coordinates(5, seed=7)
+        )
+
+    def test_is_in_nyc(self):
+        self.assertTrue(is_in_nyc(40.7580, -73.9855))  # Times Square
+        self.assertFalse(is_in_nyc(40.66, -74.05))  # Upper New York Bay
+        self.assertFalse(is_in_nyc(42.3601, -71.0589))  # Boston
+
+
+class FindNYCDistrictTest(unittest.TestCase):
+    def test_find_nyc_district(self):
+        self.assertEqual(find_nyc_district(40.7580, -73.9855), 105)  # Midtown
+        self.assertEqual(find_nyc_district(40.6826, -73.9754), 302)  # Barclays
+        self.assertIsNone(find_nyc_district(40.66, -74.05))
+
+    def test_batched_lookup_matches_single_lookups(self):
+        coordinates = sample_nyc_coordinates(50, seed=3)
+        latitudes, longitudes = zip(*coordinates)
+        self.assertEqual(
+            find_nyc_districts(latitudes, longitudes),
+            [find_nyc_district(lat, lng) for lat, lng in coordinates],
+        )
+
+    def test_geojson_found_from_any_working_directory(self):
+        clear_nyc_geometry_caches()
+        self.addCleanup(clear_nyc_geometry_caches)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(tempfile.gettempdir())
+        self.assertEqual(find_nyc_district(40.7580, -73.9855), 105)
+
+    def test_district_choices(self):
+        choices = dict(nyc_district_choices())
+        self.assertEqual(choices[105], "Manhattan District 5")
+        self.assertEqual(choices[483], "Queens Joint Interest Area 83")
+        self.assertEqual(list(choices), sorted(choices))
+
+    def test_borough_for_district(self):
+        self.assertEqual(borough_for_district(105), "Manhattan")
+        self.assertEqual(borough_for_district(212), "Bronx")
+        self.assertEqual(borough_for_district(302), "Brooklyn")
+        self.assertEqual(borough_for_district(414), "Queens")
+        self.assertEqual(borough_for_district(503), "Staten Island")
+        self.assertEqual(borough_for_district(None), "")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -16,7 +16,9 @@ from .views import (
     user_notifications,
     admin_send_notification,
     admin_sent_notifications,
+    admin_sent_notification_recipients,
     debug_notification_counts,
+    live_updates,
     public_profile_view,
 )
 
@@ -50,5 +52,11 @@ urlpatterns = [
         admin_sent_notifications,
         name="admin_sent_notifications",
     ),
+    path(
+        "admin/sent_notifications/recipients/",
+        admin_sent_notification_recipients,
+        name="admin_sent_notification_recipients",
+    ),
     path("debug_counts/", debug_notification_counts, name="debug_notification_counts"),
+    path("live/", live_updates, name="live_updates"),
 ]
@@ -1,37 +1,152 @@
 import json
-import random
+import os
+from functools import lru_cache
 
-from shapely.geometry import Point, shape
+import numpy as np
+import shapely
+from django.conf import settings
+from shapely.geometry import shape
+from shapely.ops import unary_union
 
+NYC_GEOJSON_PATH = os.path.join(
+    settings.BASE_DIR, "data", "community-districts-polygon.geojson"
+)
 
-def get_valid_nyc_coordinate():
+# Define NYC bounding box (approximate limits to sample within)
+NYC_BOUNDS = {
+    "min_lat": 40.477399,  # Southernmost point of NYC
+    "max_lat": 40.917577,  # Northernmost point of NYC
+    "min_lng": -74.259090,  # Westernmost point of NYC
+    "max_lng": -73.700272,  # Easternmost point of NYC
+}
+
+
+# The first digit of a community district code identifies its borough.
+NYC_BOROUGHS = {
+    1: "Manhattan",
+    2: "Bronx",
+    3: "Brooklyn",
+    4: "Queens",
+    5: "Staten Island",
+}
+
+
+@lru_cache(maxsize=None)
+def load_nyc_districts():
     """
-    Reads a GeoJSON file of NYC land boundaries and generates a random latitude
-    and longitude that falls within a land polygon.
+    Read the NYC community district GeoJSON once and return a tuple of
+    (district codes, polygons).
     """
-
-    geojson_path = "data/community-districts-polygon.geojson"
-    # Load GeoJSON file
-    with open(geojson_path, "r") as file:
+    with open(NYC_GEOJSON_PATH, "r") as file:
         geojson_data = json.load(file)
 
-    # Extract polygons from the GeoJSON file
-    polygons = [shape(feature["geometry"]) for feature in geojson_data["features"]]
-
-    # Define NYC bounding box (approximate limits to sample within)
-    NYC_BOUNDS = {
-        "min_lat": 40.477399,  # Southernmost point of NYC
-        "max_lat": 40.917577,  # Northernmost point of NYC
-        "min_lng": -74.259090,  # Westernmost point of NYC
-        "max_lng": -73.700272,  # Easternmost point of NYC
-    }
-
-    # Generate a valid coordinate within NYC land boundaries
-    while True:
-        latitude = random.uniform(NYC_BOUNDS["min_lat"], NYC_BOUNDS["max_lat"])
-        longitude = random.uniform(NYC_BOUNDS["min_lng"], NYC_BOUNDS["max_lng"])
-        point = Point(longitude, latitude)
-
-        # Ensure the point is inside at least one NYC land polygon
-        if any(polygon.contains(point) for polygon in polygons):
-            return latitude, longitude  # Return a valid coordinate
+    features = geojson_data["features"]
+    codes = tuple(
+        feature["properties"].get("communityDistrict") for feature in features
+    )
+    polygons = tuple(shape(feature["geometry"]) for feature in features)
+    shapely.prepare(polygons)
+    return codes, polygons
+
+
+@lru_cache(maxsize=None)
+def get_nyc_land():
+    """
+    Return the union of the NYC community districts, prepared for fast
+    repeated containment tests.
+    """
+    land = unary_union(load_nyc_districts()[1])
+    shapely.prepare(land)
+    return land
+
+
+@lru_cache(maxsize=None)
+def get_nyc_district_index():
+    """Return an STRtree over the community district polygons."""
+    return shapely.STRtree(load_nyc_districts()[1])
+
+
+def find_nyc_districts(latitudes, longitudes):
+    """
+    Return the community district code containing each coordinate, or None
+    for coordinates outside every district.
+    """
+    codes, polygons = load_nyc_districts()
+    longitudes = np.asarray(longitudes, dtype=float)
+    latitudes = np.asarray(latitudes, dtype=float)
+
+    # The tree narrows each point down to the districts whose bounding box
+    # holds it; the prepared polygons then settle the exact containment.
+    point_indexes, district_indexes = get_nyc_district_index().query(
+        shapely.points(longitudes, latitudes)
+    )
+    inside = shapely.contains_xy(
+        np.asarray(polygons, dtype=object)[district_indexes],
+        longitudes[point_indexes],
+        latitudes[point_indexes],
+    )
+
+    districts = [None] * len(latitudes)
+    for point_index, district_index in zip(
+        point_indexes[inside].tolist(), district_indexes[inside].tolist()
+    ):
+        if districts[point_index] is None:
+            districts[point_index] = codes[district_index]
+    return districts
+
+
+def find_nyc_district(latitude, longitude):
+    """Return the community district code containing the coordinate, or None."""
+    return find_nyc_districts([latitude], [longitude])[0]
+
+
+def borough_for_district(district):
+    """Return the borough name of a community district code, or ""."""
+    if district is None:
+        return ""
+    return NYC_BOROUGHS.get(district // 100, "")
+
+
+@lru_cache(maxsize=None)
+def nyc_district_choices():
+    """Return (code, label) choices for the community districts, in code order."""
+    choices = []
+    for code in sorted(set(load_nyc_districts()[0])):
+        number = code % 100
+        # Codes from 50 up are the large parks and airports between districts
+        kind = "District" if number < 50 else "Joint Interest Area"
+        choices.append((code, f"{borough_for_district(code)} {kind} {number}"))
+    return tuple(choices)
+
+
+def is_in_nyc(latitude, longitude):
+    """Return True if the coordinate falls on NYC land."""
+    return bool(shapely.contains_xy(get_nyc_land(), longitude, latitude))
+
+
+def sample_nyc_coordinates(n, seed=None):
+    """
+    Return n random (latitude, longitude) pairs that fall within NYC land.
+
+    Candidates are drawn in batches inside the NYC bounding box and tested
+    against the prepared land polygon all at once.
+    """
+    land = get_nyc_land()
+    rng = np.random.default_rng(seed)
+    coordinates = []
+    while len(coordinates) < n:
+        # Roughly half of the bounding box is land, so oversample a little.
+        size = max(2 * (n - len(coordinates)), 16)
+        latitudes = rng.uniform(NYC_BOUNDS["min_lat"], NYC_BOUNDS["max_lat"], size)
+        longitudes = rng.uniform(NYC_BOUNDS["min_lng"], NYC_BOUNDS["max_lng"], size)
+        inside = shapely.contains_xy(land, longitudes, latitudes)
+        coordinates.extend(zip(latitudes[inside].tolist(), longitudes[inside].tolist()))
+    return coordinates[:n]
+
+
+def get_valid_nyc_coordinate():
+    """
+    Generate a random latitude and longitude that falls within a NYC land
+    polygon.
+    """
+    return sample_nyc_coordinates(1)[0]
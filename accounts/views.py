@@ -1,3 +1,8 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth import login, logout, update_session_auth_hash
 from django.contrib.auth.forms import (
     AuthenticationForm,
@@ -6,17 +11,54 @@ from django.contrib.auth.forms import (
 )
 from django.shortcuts import redirect, render, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseForbidden
+from django.db import transaction
+from django.core.handlers.asgi import ASGIRequest
+from django.core.paginator import Paginator
+from django.db.models import BigIntegerField, Count, F, Max, Min, Value
+from django.db.models.functions import TruncMinute
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseForbidden,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
 from .forms import (
     EmailChangeForm,
     VerificationForm,
     AdminNotificationForm,
 )  # Update import
-from .models import Notification, VerificationRequest
+from .models import (
+    Broadcast,
+    BroadcastRecipient,
+    Notification,
+    Profile,
+    VerificationRequest,
+    broadcasts_for,
+)
+from .counters import (
+    USER_COUNTERS,
+    bump_broadcast_generation,
+    get_user_counters,
+    reset_counts,
+)
+from .live import (
+    BROADCASTS_CHANNEL,
+    DISCONNECTED_SCOPE_KEY,
+    STAFF_CHANNEL,
+    get_broker,
+    live_updates_reach_all_workers,
+    publish,
+    user_channel,
+)
 
 # Import the messaging model and User to send admin notifications.
-from messaging.models import Message
+from messaging.models import Message, refresh_unread_counts
 from django.contrib.auth.models import User
+from ParkEasy.pagination import keyset_page
 
 
 def home(request):
@@ -256,29 +298,57 @@ def admin_verify_user(request, user_id):
     )
 
 
+# Notifications and broadcasts per page on the notifications page
+NOTIFICATIONS_PER_PAGE = 25
+
+
 @login_required
 def user_notifications(request):
     """
     Display all notifications for the user, including system messages,
     booking notifications, and admin messages.
     """
-    # Get all notifications for this user
-    notifications = Notification.objects.filter(recipient=request.user).order_by(
-        "-created_at"
-    )
-
-    # Mark all as read (do this before rendering the template)
+    # Mark all as read (do this before rendering the template); broadcasts
+    # are read up to now
     Notification.objects.filter(recipient=request.user, read=False).update(read=True)
-
-    # Get verification messages from the Message model for backward compatibility
-    verification_messages = Message.objects.filter(
-        recipient=request.user, subject="Account Verification Approved"
-    ).order_by("-created_at")
+    read_at = timezone.now()
+    Profile.objects.filter(user=request.user).update(broadcasts_read_at=read_at)
+
+    # Broadcasts are listed alongside the user's own notifications, one page
+    # at a time
+    notifications = keyset_page(
+        [
+            Notification.objects.filter(recipient=request.user).select_related(
+                "sender"
+            ),
+            broadcasts_for(request.user).select_related("sender"),
+        ],
+        request.GET.get("before"),
+        NOTIFICATIONS_PER_PAGE,
+    )
+    for notification in notifications:
+        if isinstance(notification, Broadcast):
+            notification.read = notification.created_at <= read_at
+
+    # Get verification messages from the Message model for backward compatibility,
+    # listed after the first page of notifications
+    verification_messages = Message.objects.none()
+    if notifications.is_first:
+        verification_messages = (
+            Message.objects.filter(
+                recipient=request.user, subject="Account Verification Approved"
+            )
+            .select_related("sender")
+            .order_by("-created_at")
+        )
 
     # Mark verification messages as read too
     Message.objects.filter(
         recipient=request.user, subject="Account Verification Approved", read=False
     ).update(read=True)
+    # Bulk updates skip the model signals, so refresh the cached counts here
+    reset_counts(USER_COUNTERS, request.user.pk)
+    refresh_unread_counts(request.user)
 
     return render(
         request,
@@ -404,22 +474,20 @@ def admin_send_notification(request):
             else:  # 'SELECTED'
                 recipients = form.cleaned_data["selected_users"]
 
-            # Create notifications for each recipient with our helper function
-            notification_count = 0
-            for recipient in recipients:
-                create_notification(
-                    sender=request.user,
-                    recipient=recipient,
-                    subject=subject,
-                    content=content,
-                    notification_type="ADMIN",
-                )
-                notification_count += 1
+            # Store the notification once; recipients see it when they read
+            # their notifications
+            broadcast = create_broadcast(
+                sender=request.user,
+                audience=recipient_type,
+                recipients=recipients,
+                subject=subject,
+                content=content,
+            )
 
             return render(
                 request,
                 "accounts/admin_notification_sent.html",
-                {"recipient_count": notification_count},
+                {"recipient_count": broadcast.recipient_count},
             )
     else:
         form = AdminNotificationForm()
@@ -427,11 +495,75 @@ def admin_send_notification(request):
     return render(request, "accounts/admin_send_notification.html", {"form": form})
 
 
+# Sent notification groups per page, and recipients per "load more"
+SENT_NOTIFICATIONS_PER_PAGE = 20
+RECIPIENTS_PER_PAGE = 50
+
+# Columns selected by both halves of sent_notification_groups(), in order
+SENT_GROUP_FIELDS = (
+    "group_subject",
+    "group_content",
+    "group_type",
+    "group_audience",
+    "broadcast_id",
+    "sent_minute",
+    "first_notification_id",
+    "total_recipients",
+    "sent_at",
+)
+
+
+def sent_notification_groups(sender):
+    """
+    Return a queryset of dicts, one per notification the sender sent: each
+    of their broadcasts, and the notifications sent one row per recipient
+    before broadcasts existed, grouped in the database by subject, content
+    and minute. Both sides select the same columns so they can be combined
+    into one ordered, sliceable query.
+    """
+    broadcasts = (
+        Broadcast.objects.filter(sender=sender)
+        .annotate(
+            group_subject=F("subject"),
+            group_content=F("content"),
+            group_type=F("notification_type"),
+            group_audience=F("audience"),
+            broadcast_id=F("id"),
+            sent_minute=TruncMinute("created_at"),
+            first_notification_id=Value(None, output_field=BigIntegerField()),
+            total_recipients=F("recipient_count"),
+            sent_at=F("created_at"),
+        )
+        .values(*SENT_GROUP_FIELDS)
+        .order_by()
+    )
+    notifications = (
+        Notification.objects.filter(sender=sender)
+        .annotate(
+            group_subject=F("subject"),
+            group_content=F("content"),
+            group_type=F("notification_type"),
+            group_audience=Value("SELECTED"),
+            broadcast_id=Value(None, output_field=BigIntegerField()),
+            sent_minute=TruncMinute("created_at"),
+        )
+        .values(*SENT_GROUP_FIELDS[:6])
+        .annotate(
+            first_notification_id=Min("id"),
+            total_recipients=Count("recipient", distinct=True),
+            sent_at=Max("created_at"),
+        )
+        .order_by()
+    )
+    return broadcasts.union(notifications, all=True).order_by("-sent_at")
+
+
 @login_required
 def admin_sent_notifications(request):
     """
-    View for administrators to see all notifications they have sent.
-    Groups notifications by content and timestamp to avoid duplicates.
+    View for administrators to see all notifications they have sent, one
+    entry per broadcast, newest first and paginated. Recipient counts come
+    from the database; the recipients of a group are loaded on demand.
     """
     # Check if the current user is an admin
     if not request.user.is_staff:
@@ -439,54 +571,87 @@ def admin_sent_notifications(request):
             "You do not have permission to view sent notifications."
         )
 
-    # Get all notifications sent by this admin
-    sent_notifications = Notification.objects.filter(sender=request.user).order_by(
-        "-created_at"
+    paginator = Paginator(
+        sent_notification_groups(request.user), SENT_NOTIFICATIONS_PER_PAGE
     )
+    page = paginator.get_page(request.GET.get("page"))
+    audiences = dict(Broadcast.AUDIENCE_CHOICES)
 
-    # Create a dictionary to group notifications manually
-    notification_dict = {}
-
-    for notification in sent_notifications:
-        # Create a unique key using subject, content, and rounded timestamp (to the minute)
-        timestamp_minute = notification.created_at.replace(second=0, microsecond=0)
-        key = f"{notification.subject}|{notification.content}|{timestamp_minute}"
-
-        if key not in notification_dict:
-            notification_dict[key] = {
-                "subject": notification.subject,
-                "content": notification.content,
-                "created_at": notification.created_at,
-                "notification_type": notification.notification_type,
-                "recipients": set(),
-            }
-
-        # Add recipient to the set
-        notification_dict[key]["recipients"].add(notification.recipient)
-
-    # Convert dictionary to list and add recipient counts
-    notification_groups = []
-    for data in notification_dict.values():
-        recipients = list(data["recipients"])
-        notification_groups.append(
-            {
-                "subject": data["subject"],
-                "content": data["content"],
-                "created_at": data["created_at"],
-                "notification_type": data["notification_type"],
-                "recipients": recipients[:5],  # First 5 recipients for display
-                "recipient_count": len(recipients),
-                "has_more_recipients": len(recipients) > 5,
-            }
-        )
-
-    # Sort by created_at in descending order
-    notification_groups.sort(key=lambda x: x["created_at"], reverse=True)
+    notification_groups = [
+        {
+            "subject": group["group_subject"],
+            "content": group["group_content"],
+            "created_at": group["sent_at"],
+            "notification_type": group["group_type"],
+            "audience": (
+                None
+                if group["group_audience"] == "SELECTED"
+                else audiences[group["group_audience"]]
+            ),
+            "recipient_count": group["total_recipients"],
+            "recipients_url": (
+                f"{reverse('admin_sent_notification_recipients')}?"
+                + (
+                    f"broadcast={group['broadcast_id']}"
+                    if group["broadcast_id"] is not None
+                    else f"notification={group['first_notification_id']}"
+                )
+            ),
+        }
+        for group in page
+    ]
 
     return render(
         request,
         "accounts/admin_sent_notifications.html",
-        {"notification_groups": notification_groups},
+        {"notification_groups": notification_groups, "page_obj": page},
+    )
+
+
+@login_required
+def admin_sent_notification_recipients(request):
+    """
+    JSON list of the recipients of one sent notification, a page at a time:
+    a broadcast (?broadcast=<id>) or a notification sent one row per
+    recipient (?notification=<id of any row in the group>).
+    """
+    if not request.user.is_staff:
+        return HttpResponseForbidden(
+            "You do not have permission to view sent notifications."
+        )
+
+    # A malformed id would make the pk lookup raise ValueError
+    kind = "broadcast" if "broadcast" in request.GET else "notification"
+    try:
+        object_id = int(request.GET.get(kind, ""))
+    except ValueError:
+        raise Http404(f"Invalid {kind} id.")
+
+    if kind == "broadcast":
+        broadcast = get_object_or_404(Broadcast, pk=object_id, sender=request.user)
+        recipients = User.objects.filter(received_broadcasts__broadcast=broadcast)
+    else:
+        notification = get_object_or_404(
+            Notification, pk=object_id, sender=request.user
+        )
+        minute = notification.created_at.replace(second=0, microsecond=0)
+        recipients = User.objects.filter(
+            notifications__sender=request.user,
+            notifications__subject=notification.subject,
+            notifications__content=notification.content,
+            notifications__created_at__gte=minute,
+            notifications__created_at__lt=minute + timedelta(minutes=1),
+        ).distinct()
+
+    page = Paginator(
+        recipients.order_by("username").values_list("username", flat=True),
+        RECIPIENTS_PER_PAGE,
+    ).get_page(request.GET.get("page"))
+    return JsonResponse(
+        {
+            "recipients": list(page),
+            "next_page": page.next_page_number() if page.has_next() else None,
+        }
     )
 
 
@@ -513,6 +678,174 @@ def debug_notification_counts(request):
     return render(request, "accounts/debug_counts.html", context)
 
 
+# Seconds between keep-alive comments on an idle live update stream
+LIVE_UPDATES_HEARTBEAT_SECONDS = 25
+# Milliseconds the browser waits before reconnecting a closed stream
+LIVE_UPDATES_RETRY_MS = 3000
+
+
+def server_sent_event(event_type, data):
+    return f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+
+def receives_broadcast(user, event):
+    """Whether a new broadcast event is addressed to the given user."""
+    if event["audience"] == "SELECTED":
+        return user.pk in event["recipient_ids"]
+    if user.is_staff:
+        return False
+    return event["audience"] == "ALL" or user.profile.is_verified
+
+
+async def live_update_stream(user, broker, duration, heartbeat, disconnected=None):
+    """
+    Yield the server-sent events for one user: all the navbar counts first,
+    then only the counts that changed, and a summary of each notification,
+    message or booking change as it happens. The stream ends after duration
+    seconds, or as soon as the disconnected asyncio.Event is set.
+    """
+    loop = asyncio.get_running_loop()
+    if disconnected is None:
+        disconnected = asyncio.Event()
+    load_counts = sync_to_async(get_user_counters)
+    channels = [user_channel(user.pk), BROADCASTS_CHANNEL]
+    if user.is_staff:
+        channels.append(STAFF_CHANNEL)
+
+    # Subscribe before reading the counts so no change is missed
+    with broker.subscribe(*channels) as queue:
+        counts = await load_counts(user)
+        yield f"retry: {LIVE_UPDATES_RETRY_MS}\n\n" + server_sent_event(
+            "counters", counts
+        )
+        deadline = loop.time() + duration
+        disconnect = asyncio.ensure_future(disconnected.wait())
+        try:
+            while (remaining := deadline - loop.time()) > 0:
+                get = asyncio.ensure_future(queue.get())
+                await asyncio.wait(
+                    {get, disconnect},
+                    timeout=min(heartbeat, remaining),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not get.done():
+                    get.cancel()
+                    if disconnect.done():
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+                event = get.result()
+                event_type = event["type"]
+                if event_type == "counters":
+                    new_counts = await load_counts(user)
+                    changed = {
+                        name: value
+                        for name, value in new_counts.items()
+                        if counts.get(name) != value
+                    }
+                    counts = new_counts
+                    if changed:
+                        yield server_sent_event("counters", changed)
+                elif event_type == "broadcast":
+                    if receives_broadcast(user, event):
+                        yield server_sent_event(
+                            "notification",
+                            {
+                                "subject": event["subject"],
+                                "notification_type": event["notification_type"],
+                                "created_at": event["created_at"],
+                            },
+                        )
+                else:
+                    data = {key: value for key, value in event.items() if key != "type"}
+                    yield server_sent_event(event_type, data)
+        finally:
+            disconnect.cancel()
+
+
+def _live_update_user(request):
+    if not request.user.is_authenticated:
+        return None
+    return User.objects.select_related("profile").get(pk=request.user.pk)
+
+
+async def live_updates(request):
+    """
+    Server-sent event stream of the logged-in user's live updates, so pages
+    update their badges without reloading.
+
+    Needs an ASGI server: under WSGI, Django collects the whole stream before
+    sending any of it, holding a worker thread for the full duration. Also
+    turned off when the broker cannot reach the other server workers.
+    """
+    if not isinstance(request, ASGIRequest) or not live_updates_reach_all_workers():
+        # 204 tells EventSource not to reconnect
+        return HttpResponse(status=204)
+    user = await sync_to_async(_live_update_user)(request)
+    if user is None:
+        return HttpResponse(status=204)
+
+    response = StreamingHttpResponse(
+        live_update_stream(
+            user,
+            get_broker(),
+            settings.LIVE_UPDATES_STREAM_SECONDS,
+            LIVE_UPDATES_HEARTBEAT_SECONDS,
+            request.scope.get(DISCONNECTED_SCOPE_KEY),
+        ),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    # Stop proxies from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def create_broadcast(
+    sender, audience, recipients, subject, content, notification_type="ADMIN"
+):
+    """
+    Helper function to send one notification to many users. The content is
+    written once whatever the audience size; only hand-picked (SELECTED)
+    recipients get a row each.
+    """
+    with transaction.atomic():
+        if audience == "SELECTED":
+            recipients = list(recipients)
+            recipient_count = len(recipients)
+        else:
+            recipient_count = recipients.count()
+        broadcast = Broadcast.objects.create(
+            sender=sender,
+            audience=audience,
+            subject=subject,
+            content=content,
+            notification_type=notification_type,
+            recipient_count=recipient_count,
+        )
+        if audience == "SELECTED":
+            BroadcastRecipient.objects.bulk_create(
+                [
+                    BroadcastRecipient(broadcast=broadcast, user=recipient)
+                    for recipient in recipients
+                ]
+            )
+    # bulk_create skips the model signals
+    bump_broadcast_generation()
+    publish(
+        BROADCASTS_CHANNEL,
+        "broadcast",
+        audience=audience,
+        recipient_ids=(
+            [recipient.pk for recipient in recipients] if audience == "SELECTED" else []
+        ),
+        subject=subject,
+        notification_type=notification_type,
+        created_at=broadcast.created_at.isoformat(),
+    )
+    return broadcast
+
+
 def create_notification(
     sender, recipient, subject, content, notification_type="SYSTEM"
 ):
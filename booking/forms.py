@@ -3,6 +3,7 @@ import datetime as dt
 from django import forms
 from django.forms import inlineformset_factory, BaseInlineFormSet
 from .models import Booking, BookingSlot
+from .utils import get_availability_grid, day_availability_mask, mask_to_times
 
 HALF_HOUR_CHOICES = [
     (f"{hour:02d}:{minute:02d}", f"{hour:02d}:{minute:02d}")
@@ -81,30 +82,9 @@ class BookingSlotForm(forms.ModelForm):
             start_date = None
 
         if start_date and self.listing:
-            available_slots = self.listing.slots.filter(
-                start_date__lte=start_date, end_date__gte=start_date
-            )
-            valid_times = set()
-            for slot in available_slots:
-                # Use the same logic as in the available_times view.
-                if slot.start_time == slot.end_time:
-                    current_dt = dt.datetime.combine(start_date, dt.time(0, 0))
-                    end_dt = current_dt + dt.timedelta(days=1)
-                else:
-                    if start_date == slot.start_date:
-                        current_dt = dt.datetime.combine(start_date, slot.start_time)
-                    else:
-                        current_dt = dt.datetime.combine(start_date, dt.time(0, 0))
-                    if start_date == slot.end_date:
-                        end_dt = dt.datetime.combine(start_date, slot.end_time)
-                    else:
-                        end_dt = dt.datetime.combine(
-                            start_date, dt.time(0, 0)
-                        ) + dt.timedelta(days=1)
-                while current_dt <= end_dt:
-                    valid_times.add(current_dt.strftime("%H:%M"))
-                    current_dt += dt.timedelta(minutes=30)
-            valid_times = sorted(valid_times)
+            # Use the same cached grid as the available_times view.
+            grid = get_availability_grid(self.listing.pk) or {}
+            valid_times = mask_to_times(day_availability_mask(grid, start_date))
             # If valid_times is nonempty, use them; otherwise fallback.
             if valid_times:
                 choices = [(t, t) for t in valid_times]
@@ -0,0 +1,372 @@
+import datetime as dt
+import json
+import statistics
+import time
+import tracemalloc
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models, reset_queries, transaction
+from django.template.loader import render_to_string
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from booking import views as booking_views
+from booking.models import Booking, BookingSlot
+from booking.utils import (
+    block_out_booking,
+    invalidate_availability_grid,
+)
+from listings.models import Listing, ListingSlot
+from listings.utils import filter_listings
+
+SCENARIOS = [
+    "available_times",
+    "available_times_cold",
+    "filter_listings",
+    "book_listing",
+    "manage_booking",
+    "block_out_booking",
+    "listing_cards",
+]
+
+
+# create_fake_data options the benchmarks pass through with --seed
+SEED_OPTIONS = ["users", "listings", "bookings", "reviews", "workers"]
+
+
+def add_seed_arguments(parser):
+    """Add --seed and the create_fake_data size options to a benchmark."""
+    parser.add_argument(
+        "--seed",
+        action="store_true",
+        help="Regenerate the dataset with create_fake_data before running",
+    )
+    for name in SEED_OPTIONS:
+        flag = "seed-workers" if name == "workers" else name
+        parser.add_argument(
+            f"--{flag}",
+            dest=f"seed_{name}",
+            type=int,
+            metavar="N",
+            help=f"--{name} passed to create_fake_data with --seed",
+        )
+
+
+def seed_dataset(options, stdout):
+    """Run create_fake_data with the size options given to the benchmark."""
+    sizes = {
+        name: options[f"seed_{name}"]
+        for name in SEED_OPTIONS
+        if options[f"seed_{name}"] is not None
+    }
+    call_command("create_fake_data", stdout=stdout, **sizes)
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile of values using nearest-rank."""
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered))) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def compare_results(results, baseline, tolerance):
+    """
+    Compare a run with a baseline run.
+
+    Returns a list of (scenario, message) for every scenario whose median
+    latency grew by more than tolerance or whose query count grew at all.
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if result["p50_ms"] > previous["p50_ms"] * (1 + tolerance):
+            regressions.append(
+                (
+                    name,
+                    f"p50 {result['p50_ms']:.2f}ms vs baseline {previous['p50_ms']:.2f}ms",
+                )
+            )
+        if result["queries"] > previous["queries"]:
+            regressions.append(
+                (
+                    name,
+                    f"{result['queries']} queries vs baseline {previous['queries']}",
+                )
+            )
+    return regressions
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the booking engine (available_times, filter_listings, "
+        "book_listing, manage_booking, block_out_booking) and the rendering of a "
+        "page of listing cards against the data in the database, and optionally "
+        "compare with a stored baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--iterations", type=int, default=20, help="Timed runs per scenario"
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=SCENARIOS,
+            help="Scenario to run (repeatable). Defaults to all of them.",
+        )
+        add_seed_arguments(parser)
+        parser.add_argument(
+            "--baseline", help="JSON results of a previous run to compare against"
+        )
+        parser.add_argument(
+            "--save-baseline", help="Write the results of this run to a JSON file"
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Allowed relative growth of the median latency (default 0.25)",
+        )
+        parser.add_argument(
+            "--fail-on-regression",
+            action="store_true",
+            help="Exit with an error if any scenario regressed",
+        )
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1:
+            raise CommandError("--iterations must be at least 1.")
+
+        if options["seed"]:
+            seed_dataset(options, self.stdout)
+
+        scenarios = options["scenario"] or SCENARIOS
+        self.factory = RequestFactory()
+
+        results = {}
+        # Every write made by a scenario is rolled back and no email is sent.
+        with override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend"
+        ):
+            for name in scenarios:
+                with transaction.atomic():
+                    self.prepare_fixtures()
+                    setup = getattr(self, f"scenario_{name}")
+                    results[name] = self.measure(setup, options["iterations"])
+                    transaction.set_rollback(True)
+                # Rolled back writes do not drop the grids cached meanwhile
+                invalidate_availability_grid(self.listing.pk)
+                self.report(name, results[name])
+
+        if options["save_baseline"]:
+            with open(options["save_baseline"], "w") as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+            self.stdout.write(f"Results written to {options['save_baseline']}")
+
+        if options["baseline"]:
+            with open(options["baseline"]) as file:
+                baseline = json.load(file)
+            regressions = compare_results(results, baseline, options["tolerance"])
+            for name, message in regressions:
+                self.stdout.write(self.style.ERROR(f"REGRESSION {name}: {message}"))
+            if not regressions:
+                self.stdout.write(
+                    self.style.SUCCESS("No regressions against baseline.")
+                )
+            elif options["fail_on_regression"]:
+                raise CommandError(f"{len(regressions)} regression(s) found.")
+
+        return None
+
+    # ------------------------------------------------------------------
+    # Measurement
+    # ------------------------------------------------------------------
+
+    def measure(self, setup, iterations):
+        """
+        Time a scenario. setup() prepares any untimed state and returns the
+        callable to time. Latency and query counts come from the timed runs;
+        peak memory from one extra run under tracemalloc.
+        """
+        timings = []
+        query_counts = []
+        for _ in range(iterations):
+            run = setup()
+            # The query log is capped, so empty it or long runs count zero queries.
+            reset_queries()
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                run()
+                timings.append((time.perf_counter() - start) * 1000)
+            query_counts.append(len(queries))
+
+        run = setup()
+        tracemalloc.start()
+        try:
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            "iterations": iterations,
+            "p50_ms": statistics.median(timings),
+            "p90_ms": percentile(timings, 90),
+            "p99_ms": percentile(timings, 99),
+            "max_ms": max(timings),
+            "queries": max(query_counts),
+            "peak_memory_kb": peak / 1024,
+        }
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"{name:<22} p50 {result['p50_ms']:8.2f}ms  p90 {result['p90_ms']:8.2f}ms  "
+            f"p99 {result['p99_ms']:8.2f}ms  queries {result['queries']:5d}  "
+            f"peak {result['peak_memory_kb']:9.1f}KB"
+        )
+
+    # ------------------------------------------------------------------
+    # Fixtures
+    # ------------------------------------------------------------------
+
+    def prepare_fixtures(self):
+        """Pick a listing slot with at least an hour of future availability."""
+        tomorrow = dt.date.today() + dt.timedelta(days=1)
+        candidates = ListingSlot.objects.filter(start_date__gte=tomorrow).order_by(
+            "start_date", "start_time"
+        )[:200]
+        for slot in candidates:
+            start = dt.datetime.combine(slot.start_date, slot.start_time)
+            end = dt.datetime.combine(slot.end_date, slot.end_time)
+            if end - start >= dt.timedelta(hours=1) and start.time() <= dt.time(22):
+                self.slot = slot
+                break
+        else:
+            raise CommandError(
+                "No listing has an hour of future availability. Run with --seed."
+            )
+
+        self.listing = Listing.objects.get(pk=self.slot.listing_id)
+        self.owner = self.listing.user
+        self.renter, _ = User.objects.get_or_create(
+            username="benchmark-renter", defaults={"email": "benchmark@example.com"}
+        )
+        self.booking_start = dt.datetime.combine(
+            self.slot.start_date, self.slot.start_time
+        )
+        self.booking_end = self.booking_start + dt.timedelta(minutes=30)
+
+    def make_request(self, method, path, data, user):
+        request = getattr(self.factory, method)(path, data)
+        request.user = user
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        return request
+
+    def create_booking(self, status):
+        booking = Booking.objects.create(
+            user=self.renter, listing=self.listing, status=status
+        )
+        BookingSlot.objects.create(
+            booking=booking,
+            start_date=self.booking_start.date(),
+            start_time=self.booking_start.time(),
+            end_date=self.booking_end.date(),
+            end_time=self.booking_end.time(),
+        )
+        return booking
+
+    # ------------------------------------------------------------------
+    # Scenarios: each returns the callable to time
+    # ------------------------------------------------------------------
+
+    def available_times_request(self):
+        return self.make_request(
+            "get",
+            "/booking/available_times/",
+            {
+                "listing_id": self.listing.pk,
+                "date": self.slot.start_date.strftime("%Y-%m-%d"),
+            },
+            self.renter,
+        )
+
+    def scenario_available_times(self):
+        request = self.available_times_request()
+        # An async view, called the way the WSGI handler calls it
+        return lambda: async_to_sync(booking_views.available_times)(request)
+
+    def scenario_available_times_cold(self):
+        request = self.available_times_request()
+        invalidate_availability_grid(self.listing.pk)
+        return lambda: async_to_sync(booking_views.available_times)(request)
+
+    def scenario_filter_listings(self):
+        now = dt.datetime.now()
+        request = self.make_request(
+            "get",
+            "/listings/",
+            {
+                "filter_type": "single",
+                "start_date": self.booking_start.strftime("%Y-%m-%d"),
+                "end_date": self.booking_end.strftime("%Y-%m-%d"),
+                "start_time": self.booking_start.strftime("%H:%M"),
+                "end_time": self.booking_end.strftime("%H:%M"),
+            },
+            self.renter,
+        )
+
+        def run():
+            # Same base queryset as view_listings
+            listings = Listing.objects.filter(
+                models.Q(slots__end_date__gt=now.date())
+                | models.Q(slots__end_date=now.date(), slots__end_time__gt=now.time())
+            ).distinct()
+            filter_listings(listings, request)
+
+        return run
+
+    def scenario_book_listing(self):
+        request = self.make_request(
+            "post",
+            f"/booking/book/{self.listing.pk}/",
+            {
+                "email": "benchmark@example.com",
+                "form-TOTAL_FORMS": "1",
+                "form-INITIAL_FORMS": "0",
+                "form-MIN_NUM_FORMS": "0",
+                "form-MAX_NUM_FORMS": "1000",
+                "form-0-start_date": self.booking_start.strftime("%Y-%m-%d"),
+                "form-0-end_date": self.booking_end.strftime("%Y-%m-%d"),
+                "form-0-start_time": self.booking_start.strftime("%H:%M"),
+                "form-0-end_time": self.booking_end.strftime("%H:%M"),
+            },
+            self.renter,
+        )
+        return lambda: booking_views.book_listing(request, self.listing.pk)
+
+    def scenario_manage_booking(self):
+        booking = self.create_booking("PENDING")
+        request = self.make_request(
+            "get", f"/booking/manage-booking/{booking.pk}/approve/", {}, self.owner
+        )
+        return lambda: booking_views.manage_booking(request, booking.pk, "approve")
+
+    def scenario_block_out_booking(self):
+        booking = self.create_booking("APPROVED")
+        listing = Listing.objects.get(pk=self.listing.pk)
+        return lambda: block_out_booking(listing, booking)
+
+    def scenario_listing_cards(self):
+        request = self.make_request("get", "/listings/", {}, self.renter)
+        listings = list(Listing.objects.select_related("user").order_by("pk")[:10])
+        context = {"listings": listings, "bookmarked_listings": []}
+        return lambda: render_to_string(
+            "listings/partials/listing_cards.html", context, request
+        )
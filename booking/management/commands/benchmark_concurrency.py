@@ -0,0 +1,252 @@
+import asyncio
+import datetime as dt
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from booking.management.commands.benchmark_booking import (
+    add_seed_arguments,
+    percentile,
+    seed_dataset,
+)
+from listings.models import ListingSlot
+
+ENDPOINTS = ["available_times", "map_view_listings", "listing_cards"]
+
+SERVERS = ["wsgi", "asgi"]
+
+HOST = "127.0.0.1"
+
+
+async def asgi_get(application, path, query_string, cookie):
+    """Send one GET request through an ASGI application; return the status."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query_string.encode(),
+        "headers": [(b"host", HOST.encode()), (b"cookie", cookie.encode())],
+        "client": (HOST, 50000),
+        "server": (HOST, 80),
+    }
+    request_sent = False
+    response_done = asyncio.Event()
+    status = None
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif not message.get("more_body"):
+            response_done.set()
+
+    await application(scope, receive, send)
+    return status
+
+
+def wsgi_get(application, path, query_string, cookie):
+    """Send one GET request through a WSGI application; return the status."""
+    environ = {
+        "PATH_INFO": path,
+        "QUERY_STRING": query_string,
+        "HTTP_HOST": HOST,
+        "HTTP_COOKIE": cookie,
+    }
+    setup_testing_defaults(environ)
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(int(status.split()[0]))
+
+    response = application(environ, start_response)
+    try:
+        for _ in response:
+            pass
+    finally:
+        response.close()
+    return statuses[0]
+
+
+class Command(BaseCommand):
+    help = (
+        "Send concurrent requests to the read-heavy endpoints (available_times, "
+        "map_view_listings and the ajax listing cards) through the WSGI handler, "
+        "served by a fixed pool of worker threads, and through the ASGI handler "
+        "on one event loop, and report throughput and latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests", type=int, default=200, help="Requests per endpoint"
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=50,
+            help="Requests in flight at any time (concurrent clients)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Worker threads serving the WSGI handler",
+        )
+        parser.add_argument(
+            "--endpoint",
+            action="append",
+            choices=ENDPOINTS,
+            help="Endpoint to benchmark (repeatable). Defaults to all of them.",
+        )
+        parser.add_argument(
+            "--server",
+            action="append",
+            choices=SERVERS,
+            help="Handler to benchmark (repeatable). Defaults to both.",
+        )
+        add_seed_arguments(parser)
+
+    def handle(self, *args, **options):
+        for option in ("requests", "concurrency", "workers"):
+            if options[option] < 1:
+                raise CommandError(f"--{option} must be at least 1.")
+
+        if options["seed"]:
+            seed_dataset(options, self.stdout)
+
+        endpoints = options["endpoint"] or ENDPOINTS
+        servers = options["server"] or SERVERS
+        requests = self.endpoint_requests()
+
+        # Requests are only read from, and the session of the benchmark user
+        # is the only row written.
+        client = Client()
+        user, _ = User.objects.get_or_create(
+            username="benchmark-renter", defaults={"email": "benchmark@example.com"}
+        )
+        client.force_login(user)
+        session_cookie = client.cookies[settings.SESSION_COOKIE_NAME]
+        cookie = f"{session_cookie.key}={session_cookie.value}"
+
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, HOST]):
+                for name in endpoints:
+                    path, query_string = requests[name]
+                    for server in servers:
+                        run = getattr(self, f"run_{server}")
+                        result = asyncio.run(run(path, query_string, cookie, options))
+                        self.report(name, server, result)
+        finally:
+            client.logout()
+        return None
+
+    def endpoint_requests(self):
+        """Return the (path, query string) requested for each endpoint."""
+        tomorrow = dt.date.today() + dt.timedelta(days=1)
+        slot = (
+            ListingSlot.objects.filter(start_date__gte=tomorrow)
+            .order_by("start_date", "start_time")
+            .first()
+        )
+        if slot is None:
+            raise CommandError("No listing has future availability. Run with --seed.")
+        return {
+            "available_times": (
+                reverse("available_times"),
+                urlencode(
+                    {
+                        "listing_id": slot.listing_id,
+                        "date": slot.start_date.strftime("%Y-%m-%d"),
+                    }
+                ),
+            ),
+            "map_view_listings": (reverse("map_view_listings"), ""),
+            "listing_cards": (reverse("view_listings"), "ajax=1&page=1"),
+        }
+
+    # ------------------------------------------------------------------
+    # Measurement
+    # ------------------------------------------------------------------
+
+    async def run_wsgi(self, path, query_string, cookie, options):
+        application = WSGIHandler()
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+
+            def get():
+                return loop.run_in_executor(
+                    pool, wsgi_get, application, path, query_string, cookie
+                )
+
+            return await self.measure(get, options)
+
+    async def run_asgi(self, path, query_string, cookie, options):
+        application = ASGIHandler()
+
+        def get():
+            return asgi_get(application, path, query_string, cookie)
+
+        return await self.measure(get, options)
+
+    async def measure(self, get, options):
+        """
+        Send the requests, keeping --concurrency of them in flight. Latency
+        is measured from when a request is sent, so it includes the time
+        spent waiting for a free worker.
+        """
+        slots = asyncio.Semaphore(options["concurrency"])
+        timings = []
+        errors = 0
+
+        async def send():
+            nonlocal errors
+            async with slots:
+                start = time.perf_counter()
+                status = await get()
+                timings.append((time.perf_counter() - start) * 1000)
+                if status != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(send() for _ in range(options["requests"])))
+        elapsed = time.perf_counter() - start
+
+        return {
+            "requests": options["requests"],
+            "errors": errors,
+            "requests_per_second": options["requests"] / elapsed,
+            "p50_ms": statistics.median(timings),
+            "p99_ms": percentile(timings, 99),
+            "max_ms": max(timings),
+        }
+
+    def report(self, name, server, result):
+        line = (
+            f"{name:<18} {server:<5} {result['requests_per_second']:8.1f} req/s  "
+            f"p50 {result['p50_ms']:8.2f}ms  p99 {result['p99_ms']:8.2f}ms  "
+            f"max {result['max_ms']:8.2f}ms"
+        )
+        if result["errors"]:
+            line += self.style.ERROR(f"  {result['errors']} errors")
+        self.stdout.write(line)
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.19 on 2026-10-19 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("booking", "0004_booking_email"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["listing", "status"], name="booking_listing_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["user", "status"], name="booking_user_status_idx"
+            ),
+        ),
+    ]
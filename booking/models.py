@@ -1,6 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
-from listings.models import Listing
+from django.db.models import prefetch_related_objects
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from listings.models import Listing, ListingSlot
 from django.core.mail import send_mail
 from django.conf import settings
 from django.template.loader import render_to_string
@@ -8,6 +11,10 @@ from django.utils.html import strip_tags
 from django.utils import timezone
 import datetime as dt
 
+from accounts.live import publish, user_channel
+
+from .utils import invalidate_availability_grid
+
 
 class Booking(models.Model):
     STATUS_CHOICES = [
@@ -25,6 +32,14 @@ class Booking(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["listing", "status"], name="booking_listing_status_idx"
+            ),
+            models.Index(fields=["user", "status"], name="booking_user_status_idx"),
+        ]
+
     def __str__(self):
         return f"Booking #{self.pk} by {self.user.username} for {self.listing.title}"
 
@@ -74,36 +89,62 @@ class Booking(models.Model):
         """Check if booking has been reviewed."""
         return hasattr(self, "review")
 
-    @property
-    def is_within_24_hours(self):
-        """Check if any slot is within 24 hours from now."""
-        now = timezone.now()
+    def time_flags(self, now=None):
+        """
+        Evaluate is_ongoing, has_passed and is_within_24_hours in a single pass
+        over the booking's slots, localizing each slot only once.
+        """
+        now = now or timezone.now()
         time_threshold = now + dt.timedelta(hours=24)
+        tz = timezone.get_current_timezone()
 
-        for slot in self.slots.all():
+        flags = {"is_ongoing": False, "has_passed": False, "is_within_24_hours": False}
+        slots = list(self.slots.all())
+        all_ended = bool(slots)
+        for slot in slots:
             slot_start = timezone.make_aware(
-                dt.datetime.combine(slot.start_date, slot.start_time),
-                timezone.get_current_timezone(),
+                dt.datetime.combine(slot.start_date, slot.start_time), tz
+            )
+            slot_end = timezone.make_aware(
+                dt.datetime.combine(slot.end_date, slot.end_time), tz
             )
+            if slot_start <= now <= slot_end:
+                flags["is_ongoing"] = True
             if now <= slot_start <= time_threshold:
-                return True
-        return False
+                flags["is_within_24_hours"] = True
+            if slot_end > now:
+                all_ended = False
+        flags["has_passed"] = all_ended
+        return flags
+
+    @classmethod
+    def evaluate_time_flags(cls, bookings, now=None):
+        """
+        Compute the time flags of many bookings at once.
+
+        The slots are prefetched for any booking that doesn't have them yet and
+        every booking is evaluated against the same "now", so templates can
+        read is_ongoing, has_passed and is_within_24_hours without queries.
+        """
+        bookings = list(bookings)
+        prefetch_related_objects(bookings, "slots")
+        now = now or timezone.now()
+        for booking in bookings:
+            booking._time_flags = booking.time_flags(now)
+        return bookings
+
+    def _get_time_flags(self):
+        return getattr(self, "_time_flags", None) or self.time_flags()
+
+    @property
+    def is_within_24_hours(self):
+        """Check if any slot is within 24 hours from now."""
+        return self._get_time_flags()["is_within_24_hours"]
 
     @property
     def has_passed(self):
         """Check if all booking slots have passed."""
-        if not self.slots.exists():
-            return False
-
-        now = timezone.now()
-        for slot in self.slots.all():
-            slot_end = timezone.make_aware(
-                dt.datetime.combine(slot.end_date, slot.end_time),
-                timezone.get_current_timezone(),
-            )
-            if slot_end > now:
-                return False
-        return True
+        return self._get_time_flags()["has_passed"]
 
     @property
     def can_be_reviewed(self):
@@ -113,24 +154,7 @@ class Booking(models.Model):
     @property
     def is_ongoing(self):
         """Check if any booking slot is currently active."""
-        now = timezone.now()
-
-        for slot in self.slots.all():
-            # Convert start and end dates/times to datetime with timezone
-            slot_start = timezone.make_aware(
-                dt.datetime.combine(slot.start_date, slot.start_time),
-                timezone.get_current_timezone(),
-            )
-            slot_end = timezone.make_aware(
-                dt.datetime.combine(slot.end_date, slot.end_time),
-                timezone.get_current_timezone(),
-            )
-
-            # If current time is between start and end, booking is ongoing
-            if slot_start <= now <= slot_end:
-                return True
-
-        return False
+        return self._get_time_flags()["is_ongoing"]
 
 
 class BookingSlot(models.Model):
@@ -151,3 +175,32 @@ class BookingSlot(models.Model):
             f"BookingSlot for Booking #{self.booking.pk}: "
             f"{self.start_date} {self.start_time} - {self.end_date} {self.end_time}"
         )
+
+
+@receiver(post_save, sender=Listing)
+@receiver(post_delete, sender=Listing)
+@receiver(post_save, sender=ListingSlot)
+@receiver(post_delete, sender=ListingSlot)
+def invalidate_listing_availability(sender, instance, **kwargs):
+    """
+    Replace the availability version of a listing whenever it or its slots
+    change, once the transaction commits. Grids cached before then, including
+    ones built from the old slots by requests still running, are not read
+    again.
+    """
+    listing_id = instance.pk if sender is Listing else instance.listing_id
+    transaction.on_commit(lambda: invalidate_availability_grid(listing_id))
+
+
+@receiver(post_save, sender=Booking)
+def publish_booking_change(sender, instance, created, **kwargs):
+    """Tell the owner about new booking requests and the renter about updates."""
+    listing = instance.listing
+    user_id = listing.user_id if created else instance.user_id
+    publish(
+        user_channel(user_id),
+        "booking",
+        booking_id=instance.pk,
+        status=instance.status,
+        listing=listing.title,
+    )
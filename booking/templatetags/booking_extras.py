@@ -1,10 +1,15 @@
+from functools import lru_cache
+
 from django import template
 import re
 
+from listings.utils import LOCATION_CACHE_SIZE
+
 register = template.Library()
 
 
 @register.filter
+@lru_cache(maxsize=LOCATION_CACHE_SIZE)
 def format_location(value):
     """
     Extracts the main address from a location string that includes coordinates.
@@ -12,6 +17,8 @@ def format_location(value):
         "383, Grand Street, Lower East Side, Manhattan Community Board 3, Manhattan,
         New York County, New York, 10002, United States"
     Example output: "383 Grand Street, Lower East Side, New York, NY 10002"
+
+    Memoized, since it is a pure function of the location string.
     """
     if not value:
         return ""
@@ -0,0 +1,151 @@
+import datetime as dt
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, TransactionTestCase
+
+from booking.management.commands.benchmark_booking import (
+    compare_results,
+    percentile,
+)
+from booking.models import Booking
+from listings.models import Listing, ListingSlot
+
+User = get_user_model()
+
+
+class BenchmarkHelperTests(TestCase):
+    def test_percentile_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7.0], 90), 7.0)
+
+    def test_compare_results_flags_latency_and_queries(self):
+        baseline = {"a": {"p50_ms": 10.0, "queries": 3}}
+        self.assertEqual(
+            compare_results({"a": {"p50_ms": 12.0, "queries": 3}}, baseline, 0.25), []
+        )
+        regressions = compare_results(
+            {"a": {"p50_ms": 13.0, "queries": 4}}, baseline, 0.25
+        )
+        self.assertEqual(len(regressions), 2)
+        # Scenarios missing from the baseline are ignored
+        self.assertEqual(
+            compare_results({"b": {"p50_ms": 99.0, "queries": 9}}, baseline, 0.25), []
+        )
+
+
+class BenchmarkCommandTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(username="owner", password="pass")
+        self.listing = Listing.objects.create(
+            user=owner,
+            title="Bench Spot",
+            location="Somewhere [40.7, -73.9]",
+            rent_per_hour="10.00",
+            description="Spot",
+        )
+        day = dt.date.today() + dt.timedelta(days=2)
+        ListingSlot.objects.create(
+            listing=self.listing,
+            start_date=day,
+            start_time=dt.time(9, 0),
+            end_date=day,
+            end_time=dt.time(17, 0),
+        )
+
+    def test_runs_all_scenarios_and_rolls_back(self):
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "baseline.json")
+            call_command(
+                "benchmark_booking", iterations=1, save_baseline=path, stdout=out
+            )
+            with open(path) as file:
+                results = json.load(file)
+
+        self.assertIn("available_times", results)
+        self.assertIn("block_out_booking", results)
+        self.assertEqual(results["available_times"]["iterations"], 1)
+        # Nothing written by the scenarios survives the run
+        self.assertFalse(Booking.objects.exists())
+        self.assertFalse(User.objects.filter(username="benchmark-renter").exists())
+        self.assertEqual(self.listing.slots.count(), 1)
+
+    def test_fails_on_regression(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "baseline.json")
+            with open(path, "w") as file:
+                json.dump({"available_times": {"p50_ms": 0.0, "queries": 0}}, file)
+            with self.assertRaises(CommandError):
+                call_command(
+                    "benchmark_booking",
+                    iterations=1,
+                    scenario=["available_times"],
+                    baseline=path,
+                    fail_on_regression=True,
+                    stdout=StringIO(),
+                )
+
+    def test_seed_passes_dataset_size(self):
+        call_command(
+            "benchmark_booking",
+            iterations=1,
+            scenario=["available_times"],
+            seed=True,
+            users=2,
+            listings=5,
+            bookings=3,
+            reviews=0,
+            stdout=StringIO(),
+        )
+        self.assertEqual(Listing.objects.exclude(pk=self.listing.pk).count(), 5)
+        self.assertEqual(Booking.objects.count(), 3)
+
+    def test_requires_future_availability(self):
+        ListingSlot.objects.all().delete()
+        with self.assertRaises(CommandError):
+            call_command("benchmark_booking", iterations=1, stdout=StringIO())
+
+
+class ConcurrencyBenchmarkTests(TransactionTestCase):
+    """The requests are served by other threads, so the data is committed."""
+
+    def setUp(self):
+        owner = User.objects.create_user(username="owner", password="pass")
+        listing = Listing.objects.create(
+            user=owner,
+            title="Bench Spot",
+            location="Somewhere [40.7, -73.9]",
+            rent_per_hour="10.00",
+            description="Spot",
+        )
+        day = dt.date.today() + dt.timedelta(days=2)
+        ListingSlot.objects.create(
+            listing=listing,
+            start_date=day,
+            start_time=dt.time(9, 0),
+            end_date=day,
+            end_time=dt.time(17, 0),
+        )
+
+    def test_runs_every_endpoint_on_both_servers(self):
+        out = StringIO()
+        call_command(
+            "benchmark_concurrency", requests=4, concurrency=2, workers=2, stdout=out
+        )
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertTrue(all("req/s" in line for line in lines))
+        self.assertNotIn("errors", out.getvalue())
+        self.assertIn("asgi", lines[1])
+
+    def test_rejects_zero_concurrency(self):
+        with self.assertRaises(CommandError):
+            call_command("benchmark_concurrency", concurrency=0, stdout=StringIO())
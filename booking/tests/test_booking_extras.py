@@ -3,6 +3,13 @@ from booking.templatetags.booking_extras import format_location
 
 
 class FormatLocationTests(TestCase):
+    def test_results_are_memoized(self):
+        """Formatting the same location twice only parses it once."""
+        input_str = "12, Broad Street, Financial District, New York, 10004"
+        format_location.cache_clear()
+        self.assertEqual(format_location(input_str), format_location(input_str))
+        self.assertEqual(format_location.cache_info().hits, 1)
+
     def test_empty_value(self):
         """An empty string should return an empty string."""
         self.assertEqual(format_location(""), "")
@@ -1,5 +1,6 @@
 import datetime as dt
 
+from django.core.cache import cache
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
@@ -30,6 +31,8 @@ class BookingFormTests(TestCase):
 
 class BookingSlotFormTests(TestCase):
     def setUp(self):
+        # Grids cached by earlier tests stay current, as no test commits
+        cache.clear()
         # Create a test user and listing.
         self.user = get_user_model().objects.create_user(
             username="testuser", password="testpass"
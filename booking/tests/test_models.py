@@ -357,3 +357,30 @@ class BookingPropertiesTest(TestCase):
         )
         self.assertFalse(self.booking.is_ongoing)
         past_slot.delete()
+
+    def test_evaluate_time_flags_batches_queries(self):
+        """Flags for many bookings are computed with one slot query."""
+        other = Booking.objects.create(
+            user=self.user, listing=self.listing, status="APPROVED"
+        )
+        start = timezone.localtime(self.now) - datetime.timedelta(hours=1)
+        end = start + datetime.timedelta(hours=2)
+        BookingSlot.objects.create(
+            booking=self.booking,
+            start_date=start.date(),
+            start_time=start.time(),
+            end_date=end.date(),
+            end_time=end.time(),
+        )
+        bookings = [
+            Booking.objects.get(pk=self.booking.pk),
+            Booking.objects.get(pk=other.pk),
+        ]
+        with self.assertNumQueries(1):
+            Booking.evaluate_time_flags(bookings, now=self.now)
+        with self.assertNumQueries(0):
+            self.assertTrue(bookings[0].is_ongoing)
+            self.assertFalse(bookings[0].has_passed)
+            self.assertFalse(bookings[0].is_within_24_hours)
+            self.assertFalse(bookings[1].is_ongoing)
+            self.assertFalse(bookings[1].has_passed)
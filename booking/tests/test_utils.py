@@ -1,5 +1,6 @@
 import datetime as dt
 
+from django.core.cache import cache
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
@@ -10,6 +11,15 @@ from booking.utils import (
     restore_booking_availability,
     generate_recurring_dates,
     generate_booking_slots,
+    slot_day_mask,
+    build_availability_grid,
+    day_availability_mask,
+    mask_to_times,
+    overnight_continuation_mask,
+    FULL_DAY_MASK,
+    availability_cache_key,
+    get_availability_grid,
+    get_availability_version,
 )
 from listings.models import Listing, ListingSlot
 from booking.models import Booking, BookingSlot
@@ -316,3 +326,87 @@ class UtilsTests(TestCase):
         end_time = dt.time(12, 0)
         slots = generate_booking_slots(dates, start_time, end_time, is_overnight=False)
         self.assertEqual(slots, [])
+
+
+class AvailabilityGridTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="gridowner", password="pass")
+        self.listing = Listing.objects.create(
+            user=self.user,
+            title="Grid Listing",
+            location="123 Test St",
+            rent_per_hour="10.00",
+            description="A test listing",
+        )
+        self.day = dt.date(2025, 3, 14)
+
+    def make_slot(self, start_date, start_time, end_date, end_time):
+        return ListingSlot.objects.create(
+            listing=self.listing,
+            start_date=start_date,
+            start_time=start_time,
+            end_date=end_date,
+            end_time=end_time,
+        )
+
+    def test_same_day_slot_includes_both_ends(self):
+        slot = self.make_slot(self.day, dt.time(8, 0), self.day, dt.time(10, 0))
+        times = mask_to_times(slot_day_mask(slot, self.day))
+        self.assertEqual(times, ["08:00", "08:30", "09:00", "09:30", "10:00"])
+
+    def test_overnight_slot_wraps_midnight(self):
+        next_day = self.day + dt.timedelta(days=1)
+        slot = self.make_slot(self.day, dt.time(22, 0), next_day, dt.time(1, 0))
+        self.assertEqual(
+            mask_to_times(slot_day_mask(slot, self.day)),
+            ["00:00", "22:00", "22:30", "23:00", "23:30"],
+        )
+        self.assertEqual(
+            mask_to_times(slot_day_mask(slot, next_day)),
+            ["00:00", "00:30", "01:00"],
+        )
+
+    def test_no_overnight_continuation_after_last_date(self):
+        grid = {dt.date.max: {1: FULL_DAY_MASK}}
+        self.assertEqual(overnight_continuation_mask(grid, dt.date.max), 0)
+
+    def test_equal_start_and_end_time_is_full_day(self):
+        slot = self.make_slot(self.day, dt.time(9, 0), self.day, dt.time(9, 0))
+        self.assertEqual(len(mask_to_times(slot_day_mask(slot, self.day))), 48)
+
+    def test_grid_combines_slots_and_honours_ref_day(self):
+        first = self.make_slot(self.day, dt.time(8, 0), self.day, dt.time(9, 0))
+        second = self.make_slot(self.day, dt.time(12, 0), self.day, dt.time(13, 0))
+        grid = build_availability_grid([first, second])
+        self.assertEqual(set(grid[self.day]), {first.pk, second.pk})
+        self.assertEqual(
+            mask_to_times(day_availability_mask(grid, self.day)),
+            ["08:00", "08:30", "09:00", "12:00", "12:30", "13:00"],
+        )
+        self.assertEqual(
+            mask_to_times(day_availability_mask(grid, self.day, ref_day=self.day)),
+            ["08:00", "08:30", "09:00"],
+        )
+
+    def test_mask_to_times_window(self):
+        slot = self.make_slot(self.day, dt.time(8, 0), self.day, dt.time(10, 0))
+        mask = slot_day_mask(slot, self.day)
+        self.assertEqual(mask_to_times(mask, 17, 19), ["08:30", "09:00", "09:30"])
+
+    def test_grid_built_from_old_slots_not_served_after_commit(self):
+        slot = self.make_slot(self.day, dt.time(8, 0), self.day, dt.time(10, 0))
+        version = get_availability_version(self.listing.pk)
+        old_grid = get_availability_grid(self.listing.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            slot.end_time = dt.time(9, 0)
+            slot.save()
+            # Not replaced before the commit
+            self.assertEqual(get_availability_version(self.listing.pk), version)
+        # A request that read the old slots caches its grid after the commit
+        cache.set(availability_cache_key(self.listing.pk, version), old_grid)
+
+        grid = get_availability_grid(self.listing.pk)
+        self.assertEqual(
+            mask_to_times(day_availability_mask(grid, self.day)),
+            ["08:00", "08:30", "09:00"],
+        )
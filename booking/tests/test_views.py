@@ -1,18 +1,27 @@
 import datetime as dt
+import json
+import tracemalloc
 
-from django.test import TestCase, Client
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, TestCase, Client
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from listings.models import Listing, ListingSlot, Review
 from booking.models import Booking, BookingSlot
 from booking.utils import block_out_booking
+from booking.views import MAX_AVAILABILITY_RANGE_DAYS, available_times
 
 User = get_user_model()
 
 
 class ViewsTests(TestCase):
     def setUp(self):
+        # Grids cached by earlier tests stay current, as no test commits
+        cache.clear()
         # Create two users: an owner and a non-owner (booking user)
         self.owner = User.objects.create_user(username="owner", password="pass123")
         self.non_owner = User.objects.create_user(
@@ -96,6 +105,184 @@ class ViewsTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), {"times": expected_times})
 
+    def test_available_times_date_range(self):
+        self.client.login(username=self.non_owner.username, password="pass123")
+        next_day = self.slot_date + dt.timedelta(days=1)
+        url = reverse("available_times")
+        response = self.client.get(
+            url,
+            {
+                "listing_id": self.listing.id,
+                "date": self.slot_date.strftime("%Y-%m-%d"),
+                "end_date": next_day.strftime("%Y-%m-%d"),
+                "min_time": "09:00",
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {
+                "dates": {
+                    self.slot_date.strftime("%Y-%m-%d"): ["09:00", "09:30", "10:00"],
+                    next_day.strftime("%Y-%m-%d"): [],
+                }
+            },
+        )
+
+    def test_available_times_unknown_listing(self):
+        self.client.login(username=self.non_owner.username, password="pass123")
+        url = reverse("available_times")
+        response = self.client.get(
+            url, {"listing_id": 9999, "date": self.slot_date.strftime("%Y-%m-%d")}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_available_times_served_from_cache(self):
+        self.client.login(username=self.non_owner.username, password="pass123")
+        url = reverse("available_times")
+        params = {
+            "listing_id": self.listing.id,
+            "date": self.slot_date.strftime("%Y-%m-%d"),
+        }
+        self.client.get(url, params)
+        # Only the session and user lookups remain once the grid is cached.
+        with self.assertNumQueries(2):
+            response = self.client.get(url, params)
+        self.assertEqual(len(response.json()["times"]), 5)
+
+    def test_available_times_invalidated_when_slots_change(self):
+        self.client.login(username=self.non_owner.username, password="pass123")
+        url = reverse("available_times")
+        params = {
+            "listing_id": self.listing.id,
+            "date": self.slot_date.strftime("%Y-%m-%d"),
+        }
+        self.client.get(url, params)
+        self.listing_slot.end_time = dt.time(9, 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.listing_slot.save()
+        response = self.client.get(url, params)
+        self.assertEqual(response.json(), {"times": ["08:00", "08:30", "09:00"]})
+
+    async def test_available_times_async(self):
+        request = AsyncRequestFactory().get(
+            reverse("available_times"),
+            {
+                "listing_id": self.listing.id,
+                "date": self.slot_date.strftime("%Y-%m-%d"),
+            },
+        )
+        request.user = AnonymousUser()
+        response = await available_times(request)
+        self.assertEqual(response.status_code, 302)
+
+        request.user = self.non_owner
+        response = await available_times(request)
+        self.assertEqual(
+            json.loads(response.content)["times"],
+            ["08:00", "08:30", "09:00", "09:30", "10:00"],
+        )
+
+    # ---------------------- available_times_batch ----------------------
+    def test_available_times_batch_dates_and_overnight(self):
+        self.client.login(username=self.non_owner.username, password="pass123")
+        day2 = self.slot_date + dt.timedelta(days=1)
+        day3 = self.slot_date + dt.timedelta(days=2)
+        ListingSlot.objects.create(
+            listing=self.listing,
+            start_date=day2,
+            start_time=dt.time(23, 0),
+            end_date=day3,
+            end_time=dt.time(1, 0),
+        )
+        url = reverse("available_times_batch")
+        response = self.client.get(
+            url,
+            {
+                "listing_id": self.listing.id,
+                "dates": f"{self.slot_date:%Y-%m-%d},{day2:%Y-%m-%d}",
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(
+            data["dates"][f"{self.slot_date:%Y-%m-%d}"],
+            {"times": ["08:00", "08:30", "09:00", "09:30", "10:00"], "overnight": []},
+        )
+        self.assertEqual(
+            data["dates"][f"{day2:%Y-%m-%d}"],
+            {
+                "times": ["00:00", "23:00", "23:30"],
+                "overnight": ["00:00", "00:30", "01:00"],
+            },
+        )
+        self.assertEqual(data["times"], [])
+        self.assertEqual(data["overnight"], [])
+
+    def test_available_times_batch_range_common_times(self):
+        self.client.login(username=self.non_owner.username, password="pass123")
+        day2 = self.slot_date + dt.timedelta(days=1)
+        ListingSlot.objects.create(
+            listing=self.listing,
+            start_date=day2,
+            start_time=dt.time(9, 0),
+            end_date=day2,
+            end_time=dt.time(12, 0),
+        )
+        url = reverse("available_times_batch")
+        response = self.client.get(
+            url,
+            {
+                "listing_id": self.listing.id,
+                "start_date": f"{self.slot_date:%Y-%m-%d}",
+                "end_date": f"{day2:%Y-%m-%d}",
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["dates"]), 2)
+        self.assertEqual(response.json()["times"], ["09:00", "09:30", "10:00"])
+
+    def test_available_times_batch_huge_range_is_clamped(self):
+        self.client.login(username=self.non_owner.username, password="pass123")
+        url = reverse("available_times_batch")
+        tracemalloc.start()
+        try:
+            response = self.client.get(
+                url,
+                {
+                    "listing_id": self.listing.id,
+                    "start_date": "2000-01-01",
+                    "end_date": "9999-12-31",
+                },
+            )
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        dates = list(response.json()["dates"])
+        self.assertEqual(len(dates), MAX_AVAILABILITY_RANGE_DAYS)
+        self.assertEqual(dates[0], "2000-01-01")
+        # The three million days in the range are never built
+        self.assertLess(peak, 10 * 1024 * 1024)
+
+    def test_available_times_batch_last_representable_date(self):
+        self.client.login(username=self.non_owner.username, password="pass123")
+        response = self.client.get(
+            reverse("available_times_batch"),
+            {"listing_id": self.listing.id, "dates": "9999-12-31"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["dates"], {"9999-12-31": {"times": [], "overnight": []}}
+        )
+
+    def test_available_times_batch_invalid_params(self):
+        self.client.login(username=self.non_owner.username, password="pass123")
+        url = reverse("available_times_batch")
+        response = self.client.get(
+            url, {"listing_id": self.listing.id, "dates": "not-a-date"}
+        )
+        self.assertEqual(response.json(), {"dates": {}, "times": [], "overnight": []})
+
     # ---------------------- book_listing ----------------------
     def test_book_listing_owner_cannot_book(self):
         # The listing owner cannot book their own listing.
@@ -501,6 +688,55 @@ class ViewsTests(TestCase):
         self.assertEqual(bookings[1].id, booking2.id)
         self.assertEqual(bookings[2].id, booking3.id)
 
+    def _my_bookings_query_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("my_bookings"))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def _create_booking(self, status="APPROVED", reviewed=True):
+        booking = Booking.objects.create(
+            user=self.non_owner,
+            listing=self.listing,
+            email="nonowner@example.com",
+            total_price=10.00,
+            status=status,
+        )
+        BookingSlot.objects.create(
+            booking=booking,
+            start_date=self.slot_date,
+            start_time=dt.time(8, 0),
+            end_date=self.slot_date,
+            end_time=dt.time(9, 0),
+        )
+        if reviewed:
+            Review.objects.create(
+                booking=booking, listing=self.listing, user=self.non_owner, rating=4
+            )
+        return booking
+
+    def test_my_bookings_query_count_independent_of_bookings(self):
+        self.client.login(username=self.non_owner.username, password="pass123")
+        for status in ("APPROVED", "PENDING", "DECLINED"):
+            self._create_booking(status, reviewed=False)
+        self._create_booking()
+        # Warm the cached navbar counters so both runs read them the same way
+        self._my_bookings_query_count()
+        baseline = self._my_bookings_query_count()
+        for status in ("APPROVED", "PENDING", "DECLINED"):
+            self._create_booking(status, reviewed=False)
+            self._create_booking()
+        self.assertEqual(self._my_bookings_query_count(), baseline)
+
+    def test_my_bookings_paginated(self):
+        self.client.login(username=self.non_owner.username, password="pass123")
+        for _ in range(12):
+            self._create_booking()
+        response = self.client.get(reverse("my_bookings"))
+        self.assertEqual(len(response.context["bookings"]), 10)
+        response = self.client.get(reverse("my_bookings"), {"page": 2})
+        self.assertEqual(len(response.context["bookings"]), 2)
+
 
 class RecurringBookingTests(TestCase):
     def setUp(self):
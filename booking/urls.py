@@ -12,4 +12,9 @@ urlpatterns = [
     ),
     path("review/<int:booking_id>/", views.review_booking, name="review_booking"),
     path("available_times/", views.available_times, name="available_times"),
+    path(
+        "available_times/batch/",
+        views.available_times_batch,
+        name="available_times_batch",
+    ),
 ]
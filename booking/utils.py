@@ -1,5 +1,12 @@
-from listings.models import ListingSlot
+from django.core.cache import cache
+from listings.models import Listing, ListingSlot
 import datetime as dt
+import uuid
+
+# Half-hour labels in the order of the bits used by the availability grid.
+HALF_HOUR_LABELS = [f"{i // 2:02d}:{i % 2 * 30:02d}" for i in range(48)]
+FULL_DAY_MASK = (1 << 48) - 1
+AVAILABILITY_CACHE_TIMEOUT = 60 * 60
 
 
 def subtract_interval(slot_start, slot_end, booking_start, booking_end):
@@ -188,3 +195,167 @@ def generate_booking_slots(dates, start_time, end_time, is_overnight):
         )
 
     return booking_slots
+
+
+def availability_version_key(listing_id):
+    return f"listing-availability-version:{listing_id}"
+
+
+def availability_cache_key(listing_id, version):
+    return f"listing-availability:{listing_id}:{version}"
+
+
+def _new_availability_version():
+    return uuid.uuid4().hex
+
+
+def get_availability_version(listing_id):
+    """
+    Return the current version of a listing's availability grid. Versions
+    are random, so a grid cached under a replaced version is never read
+    again, even if the version entry itself is evicted.
+    """
+    return cache.get_or_set(
+        availability_version_key(listing_id), _new_availability_version, None
+    )
+
+
+async def aget_availability_version(listing_id):
+    return await cache.aget_or_set(
+        availability_version_key(listing_id), _new_availability_version, None
+    )
+
+
+def slot_day_mask(slot, day):
+    """
+    Return a 48-bit mask of the half-hour times a listing slot offers on a day.
+
+    Bit i stands for HALF_HOUR_LABELS[i]. Times run from the slot start (or
+    midnight) up to and including the slot end (or the following midnight,
+    which is listed as "00:00"), the same way the booking form has always
+    listed them.
+    """
+    if slot.start_time == slot.end_time:
+        return FULL_DAY_MASK
+
+    start_minutes = 0
+    if day == slot.start_date:
+        start_minutes = slot.start_time.hour * 60 + slot.start_time.minute
+    end_minutes = 24 * 60
+    if day == slot.end_date:
+        end_minutes = slot.end_time.hour * 60 + slot.end_time.minute
+
+    first = -(-start_minutes // 30)
+    last = end_minutes // 30
+    if last < first:
+        return 0
+
+    mask = ((1 << (last + 1)) - 1) ^ ((1 << first) - 1)
+    if last == 48:
+        # The following midnight wraps around to "00:00".
+        mask = (mask & FULL_DAY_MASK) | 1
+    return mask
+
+
+def build_availability_grid(slots):
+    """
+    Precompute the half-hour grid of a listing's availability.
+
+    Returns a dict mapping each date covered by a slot to a dict of
+    {slot_id: mask}, where mask is the slot_day_mask for that date.
+    """
+    grid = {}
+    for slot in slots:
+        day = slot.start_date
+        while day <= slot.end_date:
+            grid.setdefault(day, {})[slot.pk] = slot_day_mask(slot, day)
+            day += dt.timedelta(days=1)
+    return grid
+
+
+def get_availability_grid(listing_id):
+    """
+    Return the cached availability grid for a listing, building it on a miss.
+
+    Returns None if the listing does not exist. The grid is cached under the
+    listing's availability version, which changes whenever one of its slots
+    changes (see booking.models). The version is read before the slots, so a
+    grid built from slots that changed meanwhile is cached under the old
+    version and never served.
+    """
+    key = availability_cache_key(listing_id, get_availability_version(listing_id))
+    grid = cache.get(key)
+    if grid is not None:
+        return grid
+
+    slots = list(ListingSlot.objects.filter(listing_id=listing_id))
+    if not slots and not Listing.objects.filter(pk=listing_id).exists():
+        return None
+
+    grid = build_availability_grid(slots)
+    cache.set(key, grid, AVAILABILITY_CACHE_TIMEOUT)
+    return grid
+
+
+async def aget_availability_grid(listing_id):
+    """Async version of get_availability_grid, for the async views."""
+    key = availability_cache_key(
+        listing_id, await aget_availability_version(listing_id)
+    )
+    grid = await cache.aget(key)
+    if grid is not None:
+        return grid
+
+    slots = [slot async for slot in ListingSlot.objects.filter(listing_id=listing_id)]
+    if not slots and not await Listing.objects.filter(pk=listing_id).aexists():
+        return None
+
+    grid = build_availability_grid(slots)
+    await cache.aset(key, grid, AVAILABILITY_CACHE_TIMEOUT)
+    return grid
+
+
+def invalidate_availability_grid(listing_id):
+    cache.set(availability_version_key(listing_id), _new_availability_version(), None)
+
+
+def day_availability_mask(grid, day, ref_day=None):
+    """
+    Combine the slot masks of a grid for one day.
+
+    If ref_day is given and the listing has availability on it, only the first
+    slot covering ref_day is considered, so that both ends of a booking stay
+    within the same availability slot.
+    """
+    slots_on_day = grid.get(day, {})
+    if ref_day is not None and grid.get(ref_day):
+        return slots_on_day.get(min(grid[ref_day]), 0)
+
+    mask = 0
+    for slot_mask in slots_on_day.values():
+        mask |= slot_mask
+    return mask
+
+
+def overnight_continuation_mask(grid, day):
+    """
+    Combine the next-day masks of the slots that run past midnight of a day.
+
+    These are the end times an overnight booking starting on day can use on
+    the following date while staying within a single availability slot.
+    """
+    if day == dt.date.max:
+        # No following date to end on
+        return 0
+    next_day = grid.get(day + dt.timedelta(days=1), {})
+    mask = 0
+    for slot_id in grid.get(day, {}):
+        mask |= next_day.get(slot_id, 0)
+    return mask
+
+
+def mask_to_times(mask, first=0, last=47):
+    """Return the "HH:MM" labels set in mask between indexes first and last."""
+    return [
+        HALF_HOUR_LABELS[index] for index in range(first, last + 1) if mask >> index & 1
+    ]
@@ -3,7 +3,9 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 import datetime as dt
 from django.utils import timezone
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
+from django.core.paginator import Paginator
+from django.db.models import Case, F, IntegerField, Prefetch, Value, When
 from .models import Booking, BookingSlot
 from .forms import (
     BookingForm,
@@ -18,14 +20,43 @@ from .utils import (
     restore_booking_availability,
     generate_recurring_dates,
     generate_booking_slots,
+    aget_availability_grid,
+    get_availability_grid,
+    day_availability_mask,
+    overnight_continuation_mask,
+    mask_to_times,
+    FULL_DAY_MASK,
 )
 from accounts.models import Notification
+from ParkEasy.decorators import async_login_required
 
+# Upper bound on the number of dates a single available_times call returns
+MAX_AVAILABILITY_RANGE_DAYS = 366
 
-@login_required
-def available_times(request):
+
+def _half_hour_index(time_str, round_up=False):
+    """Convert an "HH:MM" string to a half-hour grid index, or None if invalid."""
+    try:
+        parsed = dt.datetime.strptime(time_str, "%H:%M")
+    except (TypeError, ValueError):
+        return None
+    minutes = parsed.hour * 60 + parsed.minute
+    if round_up:
+        return -(-minutes // 30)
+    return minutes // 30
+
+
+@async_login_required
+async def available_times(request):
+    """
+    Return the half-hour start/end times bookable on a date.
+
+    Passing end_date as well returns {"dates": {date: times}} for every date
+    from date to end_date (inclusive) in one response.
+    """
     listing_id = request.GET.get("listing_id")
     date_str = request.GET.get("date")
+    end_date_str = request.GET.get("end_date")
     ref_date_str = request.GET.get("ref_date")
     max_time_str = request.GET.get("max_time")
     min_time_str = request.GET.get("min_time")
@@ -33,89 +64,122 @@ def available_times(request):
         return JsonResponse({"times": []})
     try:
         booking_date = dt.datetime.strptime(date_str, "%Y-%m-%d").date()
+        listing_id = int(listing_id)
     except ValueError:
         return JsonResponse({"times": []})
-    listing = get_object_or_404(Listing, pk=listing_id)
 
-    ref_slot = None
+    grid = await aget_availability_grid(listing_id)
+    if grid is None:
+        raise Http404("No Listing matches the given query.")
+
+    ref_date = None
     if ref_date_str:
         try:
             ref_date = dt.datetime.strptime(ref_date_str, "%Y-%m-%d").date()
         except ValueError:
             ref_date = None
-        if ref_date:
-            ref_slots = listing.slots.filter(
-                start_date__lte=ref_date, end_date__gte=ref_date
-            )
-            if ref_slots.exists():
-                ref_slot = ref_slots.first()
 
-    slots = listing.slots.filter(
-        start_date__lte=booking_date, end_date__gte=booking_date
-    )
-    if ref_slot:
-        slots = slots.filter(pk=ref_slot.pk)
-
-    valid_times = set()
-    for slot in slots:
-        if slot.start_time == slot.end_time:
-            current_dt = dt.datetime.combine(booking_date, dt.time(0, 0))
-            end_dt = current_dt + dt.timedelta(days=1)
-        else:
-            if booking_date == slot.start_date:
-                current_dt = dt.datetime.combine(booking_date, slot.start_time)
-            else:
-                current_dt = dt.datetime.combine(booking_date, dt.time(0, 0))
-            if booking_date == slot.end_date:
-                end_dt = dt.datetime.combine(booking_date, slot.end_time)
-            else:
-                end_dt = dt.datetime.combine(
-                    booking_date, dt.time(0, 0)
-                ) + dt.timedelta(days=1)
-        while current_dt <= end_dt:
-            valid_times.add(current_dt.strftime("%H:%M"))
-            current_dt += dt.timedelta(minutes=30)
-    times = sorted(valid_times)
-
-    # Filter out past times for today's date
+    first, last = 0, 47
+    if min_time_str:
+        first = max(first, _half_hour_index(min_time_str, round_up=True) or 0)
+    if max_time_str:
+        max_index = _half_hour_index(max_time_str)
+        if max_index is not None:
+            last = min(last, max_index)
+
+    # Times before the next half hour are no longer bookable today
     today = dt.date.today()
-    if booking_date == today:
-        # Get current time
-        now = dt.datetime.now()
-
-        # Calculate the next available time slot
-        current_minutes = now.minute
-        current_hour = now.hour
-
-        # Round up to the nearest half hour
-        if current_minutes < 30:
-            next_slot_minutes = 30
-            next_slot_hour = current_hour
-        else:
-            next_slot_minutes = 0
-            next_slot_hour = current_hour + 1
+    now = dt.datetime.now()
+    next_index = (now.hour * 60 + now.minute) // 30 + 1
 
-        # Format as HH:MM string
-        next_slot_str = f"{next_slot_hour:02d}:{next_slot_minutes:02d}"
+    def times_for(day):
+        day_first = max(first, next_index) if day == today else first
+        mask = day_availability_mask(grid, day, ref_date)
+        return mask_to_times(mask, day_first, last)
 
-        # Filter out times before the next valid slot
-        times = [t for t in times if t >= next_slot_str]
+    if not end_date_str:
+        return JsonResponse({"times": times_for(booking_date)})
 
-    if max_time_str:
-        times = [t for t in times if t <= max_time_str]
-    if min_time_str:
-        times = [t for t in times if t >= min_time_str]
-    print(
-        "Returning times for listing",
-        listing_id,
-        "on",
-        booking_date,
-        "ref_date=",
-        ref_date_str,
-        ":",
-        times,
+    try:
+        end_date = dt.datetime.strptime(end_date_str, "%Y-%m-%d").date()
+    except ValueError:
+        return JsonResponse({"dates": {}})
+    days = min((end_date - booking_date).days + 1, MAX_AVAILABILITY_RANGE_DAYS)
+    dates = {}
+    for offset in range(max(days, 0)):
+        day = booking_date + dt.timedelta(days=offset)
+        dates[day.strftime("%Y-%m-%d")] = times_for(day)
+    return JsonResponse({"dates": dates})
+
+
+@login_required
+def available_times_batch(request):
+    """
+    Return the bookable times for many dates of a listing in one response.
+
+    Dates are given either as a comma separated "dates" list or as a
+    start_date/end_date range. For each date the response lists the
+    half-hour "times" and the "overnight" end times available on the
+    following day, plus the times common to every requested date so a
+    recurring booking can be offered only what all of its dates allow.
+    """
+    listing_id = request.GET.get("listing_id")
+    dates_str = request.GET.get("dates")
+    start_date_str = request.GET.get("start_date")
+    end_date_str = request.GET.get("end_date")
+    empty = {"dates": {}, "times": [], "overnight": []}
+    try:
+        listing_id = int(listing_id)
+        if dates_str:
+            days = sorted(
+                {
+                    dt.datetime.strptime(value.strip(), "%Y-%m-%d").date()
+                    for value in dates_str.split(",")
+                    if value.strip()
+                }
+            )
+        else:
+            start_date = dt.datetime.strptime(start_date_str, "%Y-%m-%d").date()
+            end_date = dt.datetime.strptime(end_date_str, "%Y-%m-%d").date()
+            # Clamp the range before building it
+            span = min((end_date - start_date).days + 1, MAX_AVAILABILITY_RANGE_DAYS)
+            days = [start_date + dt.timedelta(days=offset) for offset in range(span)]
+    except (TypeError, ValueError):
+        return JsonResponse(empty)
+    days = days[:MAX_AVAILABILITY_RANGE_DAYS]
+    if not days:
+        return JsonResponse(empty)
+
+    grid = get_availability_grid(listing_id)
+    if grid is None:
+        raise Http404("No Listing matches the given query.")
+
+    today = dt.date.today()
+    now = dt.datetime.now()
+    next_index = (now.hour * 60 + now.minute) // 30 + 1
+
+    dates = {}
+    common_times = FULL_DAY_MASK
+    common_overnight = FULL_DAY_MASK
+    for day in days:
+        times_mask = day_availability_mask(grid, day)
+        if day == today:
+            times_mask &= ~((1 << next_index) - 1)
+        overnight_mask = overnight_continuation_mask(grid, day)
+        common_times &= times_mask
+        common_overnight &= overnight_mask
+        dates[day.strftime("%Y-%m-%d")] = {
+            "times": mask_to_times(times_mask),
+            "overnight": mask_to_times(overnight_mask),
+        }
+
+    return JsonResponse(
+        {
+            "dates": dates,
+            "times": mask_to_times(common_times),
+            "overnight": mask_to_times(common_overnight),
+        }
     )
-    return JsonResponse({"times": times})
 
 
 @login_required
@@ -559,57 +623,49 @@ def review_booking(request, booking_id):
 
 @login_required
 def my_bookings(request):
-    # Get all bookings for current user
-    all_bookings = Booking.objects.filter(user=request.user)
-
-    # Create separate lists for different priorities
-    approved_unreviewed = []
-    other_bookings = []
-    approved_reviewed = []
+    # Priority order: approved bookings that haven't been reviewed, then other
+    # bookings (pending/declined), then approved bookings that have been reviewed.
+    # Approved bookings sort by last update, the others by creation date.
+    priority = Case(
+        When(status="APPROVED", review__isnull=True, then=Value(0)),
+        When(status="APPROVED", then=Value(2)),
+        default=Value(1),
+        output_field=IntegerField(),
+    )
+    sort_time = Case(
+        When(status="APPROVED", then=F("updated_at")),
+        default=F("created_at"),
+    )
+    all_bookings = (
+        Booking.objects.filter(user=request.user)
+        .select_related("listing", "listing__user", "review")
+        .prefetch_related(
+            Prefetch(
+                "slots",
+                queryset=BookingSlot.objects.order_by("start_date", "start_time"),
+            ),
+            "listing__reviews",
+        )
+        .annotate(priority=priority, sort_time=sort_time)
+        .order_by("priority", "-sort_time", "-pk")
+    )
 
-    # Sort bookings into categories
-    for booking in all_bookings:
-        # Check if booking has been reviewed
-        has_review = hasattr(booking, "review")
+    paginator = Paginator(all_bookings, 10)
+    page_obj = paginator.get_page(request.GET.get("page", 1))
 
-        if booking.status == "APPROVED":
-            if has_review:
-                # Lowest priority: Approved bookings that have been reviewed
-                approved_reviewed.append(booking)
-            else:
-                # Highest priority: Approved bookings that haven't been reviewed
-                approved_unreviewed.append(booking)
-        else:
-            # Medium priority: Other bookings (pending/declined)
-            other_bookings.append(booking)
-
-    # Sort each category
-    approved_unreviewed.sort(key=lambda x: x.updated_at, reverse=True)
-    other_bookings.sort(key=lambda x: x.created_at, reverse=True)
-    approved_reviewed.sort(key=lambda x: x.updated_at, reverse=True)
-
-    # Combine all lists in priority order
-    sorted_bookings = approved_unreviewed + other_bookings + approved_reviewed
-
-    # Process booking slots
-    for booking in sorted_bookings:
-        # Get all slots for this booking
-        slots = booking.slots.all().order_by("start_date", "start_time")
-
-        # Format the slots information for display
-        slots_info = []
-        for slot in slots:
-            slot_info = {
+    # Format the (already ordered) slots information for display
+    for booking in page_obj:
+        booking.slots_info = [
+            {
                 "date": slot.start_date,
                 "start_time": slot.start_time,
                 "end_time": slot.end_time,
             }
-            slots_info.append(slot_info)
-
-        # Add slots_info attribute to the booking object
-        booking.slots_info = slots_info
+            for slot in booking.slots.all()
+        ]
+    Booking.evaluate_time_flags(page_obj.object_list)
 
-    return render(request, "booking/my_bookings.html", {"bookings": sorted_bookings})
+    return render(request, "booking/my_bookings.html", {"bookings": page_obj})
 
 
 def notify_owner_booking_created(booking):
@@ -19,13 +19,38 @@ class ListingAdmin(admin.ModelAdmin):
         "created_at",
         "rating_display",
     ]
-    list_filter = ["parking_spot_size", "has_ev_charger", "charger_level", "created_at"]
+    list_filter = [
+        "borough",
+        "parking_spot_size",
+        "has_ev_charger",
+        "charger_level",
+        "created_at",
+    ]
     search_fields = ["title", "description", "location", "user__username"]
-    readonly_fields = ["created_at", "updated_at", "avg_rating", "rating_count"]
+    readonly_fields = [
+        "created_at",
+        "updated_at",
+        "avg_rating",
+        "rating_count",
+        "community_district",
+        "borough",
+    ]
     inlines = [ListingSlotInline]
 
     fieldsets = (
-        ("Basic Information", {"fields": ("user", "title", "description", "location")}),
+        (
+            "Basic Information",
+            {
+                "fields": (
+                    "user",
+                    "title",
+                    "description",
+                    "location",
+                    "borough",
+                    "community_district",
+                )
+            },
+        ),
         ("Pricing", {"fields": ("rent_per_hour",)}),
         (
             "Parking Features",
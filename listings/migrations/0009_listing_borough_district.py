@@ -0,0 +1,97 @@
+# Generated by Django 4.2.19 on 2026-10-19 12:28
+
+import json
+import os
+
+import shapely
+from django.conf import settings
+from django.db import migrations, models
+from shapely.geometry import shape
+
+# The district lookup as it stood when this migration was written, so that
+# later changes to the app code cannot change what the backfill does.
+GEOJSON_PATH = os.path.join(
+    settings.BASE_DIR, "data", "community-districts-polygon.geojson"
+)
+BOROUGHS = {
+    1: "Manhattan",
+    2: "Bronx",
+    3: "Brooklyn",
+    4: "Queens",
+    5: "Staten Island",
+}
+
+
+def parse_coordinates(location):
+    """Return the (latitude, longitude) of a "name [lat,lng]" location, or None."""
+    try:
+        coords = location.split("[")[1].strip("]").split(",")
+        return float(coords[0]), float(coords[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def tag_existing_listings(apps, schema_editor):
+    Listing = apps.get_model("listings", "Listing")
+    listings = list(Listing.objects.only("pk", "location"))
+    if not listings:
+        return
+
+    with open(GEOJSON_PATH, "r") as file:
+        features = json.load(file)["features"]
+    codes = [feature["properties"].get("communityDistrict") for feature in features]
+    polygons = [shape(feature["geometry"]) for feature in features]
+    shapely.prepare(polygons)
+
+    for listing in listings:
+        coordinates = parse_coordinates(listing.location)
+        district = None
+        if coordinates is not None:
+            latitude, longitude = coordinates
+            district = next(
+                (
+                    code
+                    for code, polygon in zip(codes, polygons)
+                    if shapely.contains_xy(polygon, longitude, latitude)
+                ),
+                None,
+            )
+        listing.community_district = district
+        listing.borough = "" if district is None else BOROUGHS.get(district // 100, "")
+    Listing.objects.bulk_update(
+        listings, ["community_district", "borough"], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("listings", "0008_bookmarkedlisting"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="listing",
+            name="borough",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("Manhattan", "Manhattan"),
+                    ("Brooklyn", "Brooklyn"),
+                    ("Queens", "Queens"),
+                    ("Bronx", "Bronx"),
+                    ("Staten Island", "Staten Island"),
+                ],
+                db_index=True,
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="listing",
+            name="community_district",
+            field=models.PositiveSmallIntegerField(
+                blank=True, db_index=True, null=True
+            ),
+        ),
+        migrations.RunPython(tag_existing_listings, migrations.RunPython.noop),
+    ]
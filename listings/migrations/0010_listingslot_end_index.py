@@ -0,0 +1,20 @@
+# Generated by Django 4.2.19 on 2026-10-19 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("listings", "0009_listing_borough_district"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="listingslot",
+            index=models.Index(
+                fields=["listing", "end_date", "end_time"],
+                name="listingslot_listing_end_idx",
+            ),
+        ),
+    ]
@@ -8,7 +8,7 @@ from django.utils import timezone
 # extract coordinates from location string
 from .utils import extract_coordinates
 
-from .utils import simplify_location
+from .utils import locate_district, simplify_location
 
 EV_CHARGER_LEVELS = [
     ("L1", "Level 1 (120V)"),
@@ -25,6 +25,14 @@ EV_CONNECTOR_TYPES = [
     ("OTHER", "Other"),
 ]
 
+BOROUGH_CHOICES = [
+    ("Manhattan", "Manhattan"),
+    ("Brooklyn", "Brooklyn"),
+    ("Queens", "Queens"),
+    ("Bronx", "Bronx"),
+    ("Staten Island", "Staten Island"),
+]
+
 PARKING_SPOT_SIZES = [
     ("STANDARD", "Standard Size"),
     ("COMPACT", "Compact"),
@@ -41,6 +49,25 @@ class Listing(models.Model):
     description = models.TextField(max_length=500)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Derived from the coordinates in location whenever the listing is saved
+    community_district = models.PositiveSmallIntegerField(
+        null=True, blank=True, db_index=True
+    )
+    borough = models.CharField(
+        max_length=20, choices=BOROUGH_CHOICES, blank=True, db_index=True
+    )
+
+    def save(self, *args, **kwargs):
+        """Tag the listing with its community district and borough."""
+        self.community_district, self.borough = locate_district(self.location)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "location" in update_fields:
+            kwargs["update_fields"] = {
+                *update_fields,
+                "community_district",
+                "borough",
+            }
+        super().save(*args, **kwargs)
 
     @property
     def location_name(self):
@@ -59,7 +86,12 @@ class Listing(models.Model):
 
     @property
     def avg_rating(self):
-        """Returns the average rating for this listing."""
+        """
+        Returns the average rating for this listing. Uses the review_average
+        annotation when the listing was loaded with one.
+        """
+        if hasattr(self, "review_average"):
+            return self.review_average
         reviews = self.reviews.all()
         if reviews:
             return sum(review.rating for review in reviews) / reviews.count()
@@ -67,7 +99,12 @@ class Listing(models.Model):
 
     @property
     def rating_count(self):
-        """Returns the total number of reviews for this listing."""
+        """
+        Returns the total number of reviews for this listing. Uses the
+        review_count annotation when the listing was loaded with one.
+        """
+        if hasattr(self, "review_count"):
+            return self.review_count
         return self.reviews.count()
 
     def __str__(self):
@@ -266,6 +303,14 @@ class ListingSlot(models.Model):
     end_date = models.DateField()
     end_time = models.TimeField()
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["listing", "end_date", "end_time"],
+                name="listingslot_listing_end_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.listing.title} slot: {self.start_date} {self.start_time} - {self.end_date} {self.end_time}"
 
@@ -24,6 +24,29 @@ class ListingModelTests(TestCase):
         # location_name should be simplified using the utility.
         self.assertEqual(listing.location_name, simplify_location(location))
 
+    def test_district_and_borough_assigned_on_save(self):
+        listing = Listing.objects.create(
+            user=self.user,
+            title="Test Listing",
+            location="Times Square [40.7580, -73.9855]",
+            rent_per_hour="10.00",
+            description="Test description",
+        )
+        self.assertEqual(listing.community_district, 105)
+        self.assertEqual(listing.borough, "Manhattan")
+
+        # Moving the listing re-tags it
+        listing.location = "Barclays Center [40.6826, -73.9754]"
+        listing.save(update_fields=["location"])
+        listing.refresh_from_db()
+        self.assertEqual(listing.borough, "Brooklyn")
+
+        # Locations without coordinates or outside NYC are left untagged
+        listing.location = "Upper Bay [40.66, -74.05]"
+        listing.save()
+        self.assertIsNone(listing.community_district)
+        self.assertEqual(listing.borough, "")
+
     def test_avg_rating_and_rating_count(self):
         listing = Listing.objects.create(
             user=self.user,
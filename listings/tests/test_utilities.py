@@ -3,12 +3,13 @@ from datetime import timedelta, time
 import datetime as dt  # Use alias to avoid conflict
 from datetime import datetime  # Keep this for class access
 
+from asgiref.sync import sync_to_async
 from django.test import TestCase, RequestFactory
 from django.contrib.auth.models import User
 from django.utils import timezone
 
 from listings.models import Listing, ListingSlot
-from listings.utils import filter_listings
+from listings.utils import afilter_listings, filter_listings
 
 
 class SimplifyLocationTests(TestCase):
@@ -71,6 +72,15 @@ class SimplifyLocationTests(TestCase):
         expected = "456 Elm St, Queens, Queens"
         self.assertEqual(simplify_location(input_str), expected)
 
+    def test_results_are_memoized(self):
+        """Repeated lookups of the same string are served from the cache."""
+        input_str = "789 Oak Ave, Apartment 2, Bronx [40.85, -73.87]"
+        simplify_location.cache_clear()
+        first = simplify_location(input_str)
+        self.assertEqual(simplify_location(input_str), first)
+        self.assertEqual(simplify_location.cache_info().hits, 1)
+        self.assertEqual(simplify_location.cache_info().misses, 1)
+
 
 class RecurringListingSlotsTests(TestCase):
     """Tests for the generate_recurring_listing_slots utility function"""
@@ -408,6 +418,38 @@ class FilterListingsTestCase(TestCase):
         )
         self.assertTrue(any("must be positive" in error for error in errors))
 
+    def test_borough_filter(self):
+        """Test filtering by the borough tagged at save time"""
+        request = self.create_mock_request({"borough": "Brooklyn"})
+        filtered_listings, errors, warnings = filter_listings(
+            Listing.objects.all(), request
+        )
+        self.assertEqual(list(filtered_listings), [self.listing2])
+
+        request = self.create_mock_request({"borough": "Manhattan"})
+        filtered_listings, errors, warnings = filter_listings(
+            Listing.objects.all(), request
+        )
+        # listing4 sits on the Brooklyn Bridge itself, outside every district
+        self.assertEqual(set(filtered_listings), {self.listing1, self.listing3})
+
+    def test_district_filter(self):
+        """Test filtering by the community district tagged at save time"""
+        request = self.create_mock_request(
+            {"district": str(self.listing2.community_district)}
+        )
+        filtered_listings, errors, warnings = filter_listings(
+            Listing.objects.all(), request
+        )
+        self.assertEqual(list(filtered_listings), [self.listing2])
+
+        # A malformed district is ignored
+        request = self.create_mock_request({"district": "abc"})
+        filtered_listings, errors, warnings = filter_listings(
+            Listing.objects.all(), request
+        )
+        self.assertEqual(len(filtered_listings), 4)
+
     def test_single_date_filter(self):
         """Test filtering by single date"""
         today = timezone.now().date().strftime("%Y-%m-%d")
@@ -642,6 +684,21 @@ class FilterListingsTestCase(TestCase):
             len(filtered_listings), 1
         )  # Only listing 1 should be within 100m
 
+    async def test_async_filter_matches_sync_filter(self):
+        """afilter_listings returns what filter_listings does"""
+        today = timezone.now().date().strftime("%Y-%m-%d")
+        for params in [
+            {"lat": "40.7812", "lng": "-73.9665", "radius": "1"},
+            {"filter_type": "single", "start_date": today, "max_price": "15"},
+            {"radius": "1"},
+        ]:
+            request = self.create_mock_request(params)
+            expected = await sync_to_async(filter_listings)(
+                Listing.objects.all(), request
+            )
+            result = await afilter_listings(Listing.objects.all(), request)
+            self.assertEqual(result, expected)
+
     def test_multiple_filters(self):
         """Test applying multiple filters together"""
         today = timezone.now().date().strftime("%Y-%m-%d")
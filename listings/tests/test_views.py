@@ -6,6 +6,7 @@ from unittest.mock import patch
 from django.contrib.auth.models import User
 from django.test import Client, TestCase
 from django.urls import reverse
+from django.utils import timezone
 
 from booking.models import Booking, BookingSlot
 from listings.models import Listing, ListingSlot, BookmarkedListing
@@ -1116,6 +1117,59 @@ class ManageListingsTest(TestCase):
             self.assertTrue(hasattr(listing, "pending_bookings"))
             self.assertTrue(hasattr(listing, "approved_bookings"))
 
+    def test_manage_listings_earnings_and_priority(self):
+        today = timezone.now()
+        first_day_current_month = today.date().replace(day=1)
+        last_month = first_day_current_month - timedelta(days=1)
+        Booking.objects.create(
+            user=self.owner,
+            listing=self.listing2,
+            email="b@example.com",
+            total_price=20,
+            status="APPROVED",
+        )
+        old_booking = Booking.objects.create(
+            user=self.owner,
+            listing=self.listing2,
+            email="b@example.com",
+            total_price=5,
+            status="APPROVED",
+        )
+        Booking.objects.filter(pk=old_booking.pk).update(
+            created_at=today.replace(
+                year=last_month.year, month=last_month.month, day=last_month.day
+            )
+        )
+        Booking.objects.create(
+            user=self.owner,
+            listing=self.listing1,
+            email="a@example.com",
+            total_price=100,
+            status="DECLINED",
+        )
+
+        response = self.client.get(reverse("manage_listings"))
+        listings = response.context["listings"]
+        # Listings with pending bookings come first
+        self.assertEqual(
+            [listing.pk for listing in listings],
+            [
+                self.listing1.pk,
+                self.listing2.pk,
+            ],
+        )
+        self.assertEqual(listings[0].total_earnings, 0)
+        self.assertEqual(listings[1].total_earnings, 25)
+        self.assertEqual(listings[1].current_month_earnings, 20)
+        self.assertEqual(listings[1].last_month_earnings, 5)
+        self.assertEqual(len(listings[0].pending_bookings), 1)
+        self.assertEqual(len(listings[1].approved_bookings), 3)
+
+        summary = response.context["earnings_summary"]
+        self.assertEqual(summary["total"], 25)
+        self.assertEqual(summary["current_month"], 20)
+        self.assertEqual(summary["last_month"], 5)
+
 
 class ListingOwnerBookingTest(TestCase):
     def setUp(self):
@@ -1,7 +1,14 @@
 import math
 import datetime as dt
 from datetime import datetime, time, timedelta
-from django.db.models import Q
+from functools import lru_cache
+from asgiref.sync import sync_to_async
+from django.db.models import Q, QuerySet
+
+from accounts.utilities import borough_for_district, find_nyc_district
+
+# Number of location strings whose display forms are memoized per process
+LOCATION_CACHE_SIZE = 4096
 
 
 def is_booking_slot_covered(booking_slot, intervals):
@@ -35,12 +42,15 @@ def is_booking_covered_by_intervals(booking, intervals):
     return True
 
 
+@lru_cache(maxsize=LOCATION_CACHE_SIZE)
 def simplify_location(location_string):
     """
     Simplifies a location string.
     Example: "Tandon School of Engineering, Johnson Street, Downtown Brooklyn, Brooklyn..."
     becomes "Tandon School of Engineering, Brooklyn"
 
+    The result only depends on the string, so it is memoized.
+
     Args:
         location_string (str): Full location string that may include coordinates
 
@@ -122,6 +132,22 @@ def extract_coordinates(location_string):
         raise ValueError(f"Could not extract coordinates from location string: {e}")
 
 
+def locate_district(location_string):
+    """
+    Look up the NYC community district and borough of a location string.
+
+    Returns:
+        tuple: (district code, borough name), or (None, "") when the location
+        has no coordinates or lies outside NYC
+    """
+    try:
+        latitude, longitude = extract_coordinates(location_string)
+    except ValueError:
+        return None, ""
+    district = find_nyc_district(latitude, longitude)
+    return district, borough_for_district(district)
+
+
 def has_active_filters(request):
     """
     Check if any filters are actively applied (have non-empty values)
@@ -135,6 +161,8 @@ def has_active_filters(request):
     # Check non-recurring filters first
     non_recurring_filters = [
         "max_price",
+        "borough",
+        "district",
         "has_ev_charger",
         "charger_level",
         "connector_type",
@@ -201,11 +229,45 @@ def filter_listings(all_listings, request):
     Args:
         all_listings: Initial queryset of listings
         request: The HTTP request containing filter parameters
-        current_datetime: Current datetime for reference
 
     Returns:
         tuple: (filtered_listings, error_messages, warning_messages)
     """
+    all_listings, error_messages, warning_messages = narrow_listings(
+        all_listings, request
+    )
+    if all_listings is None:
+        return [], error_messages, warning_messages
+    processed_listings = locate_listings(all_listings, request, error_messages)
+    return processed_listings, error_messages, warning_messages
+
+
+async def afilter_listings(all_listings, request):
+    """
+    Async version of filter_listings. When only queryset filters apply the
+    listings are loaded with the async ORM; the date and time filters check
+    each listing's availability with sync helpers, so they run in a thread.
+    """
+    all_listings, error_messages, warning_messages = await sync_to_async(
+        narrow_listings
+    )(all_listings, request)
+    if all_listings is None:
+        return [], error_messages, warning_messages
+    if isinstance(all_listings, QuerySet):
+        all_listings = [listing async for listing in all_listings]
+    processed_listings = locate_listings(all_listings, request, error_messages)
+    return processed_listings, error_messages, warning_messages
+
+
+def narrow_listings(all_listings, request):
+    """
+    Apply the price, borough, district, date/time, EV charger and spot size
+    filters.
+
+    Returns (listings, error_messages, warning_messages) where listings is
+    still a queryset unless a date or time filter was applied, or None if
+    the search parameters were rejected.
+    """
     error_messages = []
     warning_messages = []
 
@@ -221,6 +283,17 @@ def filter_listings(all_listings, request):
         except ValueError:
             pass
 
+    # Apply borough and district filters (stored on the listing at save time)
+    borough = request.GET.get("borough")
+    if borough:
+        all_listings = all_listings.filter(borough=borough)
+    district = request.GET.get("district")
+    if district:
+        try:
+            all_listings = all_listings.filter(community_district=int(district))
+        except ValueError:
+            pass
+
     filter_type = request.GET.get("filter_type", "single")
 
     # Single date/time filter
@@ -263,7 +336,7 @@ def filter_listings(all_listings, request):
                 end_date_obj = parse_date_safely(end_date)
                 if start_date_obj > end_date_obj:
                     error_messages.append("Start date cannot be after end date.")
-                    return [], error_messages, warning_messages
+                    return None, error_messages, warning_messages
             except ValueError:
                 error_messages.append("Invalid date format.")
 
@@ -286,7 +359,7 @@ def filter_listings(all_listings, request):
 
                 if same_day_or_time_only and start_time_obj >= end_time_obj:
                     error_messages.append("Start time must be before end time.")
-                    return [], error_messages, warning_messages
+                    return None, error_messages, warning_messages
             except ValueError:
                 error_messages.append("Invalid time format.")
 
@@ -313,7 +386,7 @@ def filter_listings(all_listings, request):
 
         if invalid_combo:
             error_messages.append(error_message)
-            return [], error_messages, warning_messages
+            return None, error_messages, warning_messages
 
         # Handle single-field cases first
         if any([start_date, end_date, start_time, end_time]):
@@ -735,7 +808,15 @@ def filter_listings(all_listings, request):
             parking_spot_size=request.GET["parking_spot_size"]
         )
 
-    # Apply location-based filtering
+    return all_listings, error_messages, warning_messages
+
+
+def locate_listings(all_listings, request, error_messages):
+    """
+    Apply the location filter: set each listing's distance from the searched
+    point, drop the ones outside the radius and sort the rest by distance.
+    Problems with the location parameters are added to error_messages.
+    """
     processed_listings = []
 
     location = request.GET.get("location")
@@ -786,7 +867,7 @@ def filter_listings(all_listings, request):
             key=lambda x: x.distance if x.distance is not None else float("inf")
         )
 
-    return processed_listings, error_messages, warning_messages
+    return processed_listings
 
 
 def generate_recurring_listing_slots(
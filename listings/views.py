@@ -3,13 +3,25 @@ from datetime import datetime, time, timedelta
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
+from asgiref.sync import sync_to_async
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.paginator import Paginator
 from django.db import models
 from django.forms import inlineformset_factory
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
-from django.db.models import Sum
+from django.db.models import (
+    Avg,
+    Count,
+    Exists,
+    FloatField,
+    OuterRef,
+    Prefetch,
+    Q,
+    Subquery,
+    Sum,
+)
+from django.db.models.functions import Cast, Coalesce
 
 # Add this new function for API support
 from django.http import JsonResponse
@@ -18,6 +30,10 @@ from django.template.loader import render_to_string
 # Add this import at the top of your file, with your other imports
 from django.urls import reverse
 
+from accounts.utilities import nyc_district_choices
+from booking.models import Booking
+from ParkEasy.decorators import is_authenticated
+
 from .forms import (
     ListingForm,
     ListingSlotForm,
@@ -26,15 +42,17 @@ from .forms import (
     validate_non_overlapping_slots,
 )
 from .models import (
+    BOROUGH_CHOICES,
     EV_CHARGER_LEVELS,
     EV_CONNECTOR_TYPES,
     PARKING_SPOT_SIZES,
     Listing,
     ListingSlot,
     BookmarkedListing,
+    Review,
 )
 from .utils import (
-    filter_listings,
+    afilter_listings,
     has_active_filters,
     generate_recurring_listing_slots,
 )
@@ -53,6 +71,38 @@ HALF_HOUR_CHOICES = [
 ]
 
 
+def with_card_data(listings):
+    """
+    Load what the listing cards show along with the listings: the host, and
+    the review count and average rating that Listing.rating_count and
+    Listing.avg_rating read from the annotations.
+    """
+    reviews = Review.objects.filter(listing=OuterRef("pk")).order_by().values("listing")
+    return listings.select_related("user").annotate(
+        review_count=Coalesce(
+            Subquery(reviews.annotate(count=Count("pk")).values("count")), 0
+        ),
+        review_average=Subquery(
+            reviews.annotate(average=Avg(Cast("rating", FloatField()))).values(
+                "average"
+            )
+        ),
+    )
+
+
+def has_active_slot(current_datetime):
+    """Exists() expression: the listing has a slot that has not ended yet."""
+    return Exists(
+        ListingSlot.objects.filter(listing=OuterRef("pk")).filter(
+            Q(end_date__gt=current_datetime.date())
+            | Q(
+                end_date=current_datetime.date(),
+                end_time__gt=current_datetime.time(),
+            )
+        )
+    )
+
+
 def merge_listing_slots(listing):
     """
     Merge continuous or overlapping availability slots for the given listing.
@@ -410,50 +460,50 @@ def edit_listing(request, listing_id):
     )
 
 
-def view_listings(request):
+async def view_listings(request):
+    """
+    Search listings. With ajax=1 only the next page of listing cards is
+    rendered, for infinite scrolling.
+    """
     current_datetime = datetime.now()
 
-    # This query returns listings with at least one slot that has not yet ended.
-    all_listings = Listing.objects.filter(
-        models.Q(slots__end_date__gt=current_datetime.date())
-        | models.Q(
-            slots__end_date=current_datetime.date(),
-            slots__end_time__gt=current_datetime.time(),
-        )
-    ).distinct()
+    # This query returns listings with at least one slot that has not yet ended,
+    # along with their availability bounds.
+    slots = ListingSlot.objects.filter(listing=OuterRef("pk"))
+    first_slot = slots.order_by("start_date", "start_time")
+    last_slot = slots.order_by("-end_date", "-end_time")
+    all_listings = with_card_data(
+        Listing.objects.filter(
+            models.Q(slots__end_date__gt=current_datetime.date())
+            | models.Q(
+                slots__end_date=current_datetime.date(),
+                slots__end_time__gt=current_datetime.time(),
+            )
+        ).distinct()
+    ).annotate(
+        available_from=Subquery(first_slot.values("start_date")[:1]),
+        available_time_from=Subquery(first_slot.values("start_time")[:1]),
+        available_until=Subquery(last_slot.values("end_date")[:1]),
+        available_time_until=Subquery(last_slot.values("end_time")[:1]),
+    )
 
     error_messages = []
     warning_messages = []
     success_messages = []
 
     # Get success message from session if it exists
-    success_message = request.session.pop("success_message", None)
+    success_message = await sync_to_async(request.session.pop)("success_message", None)
     if success_message:
         success_messages.append(success_message)
 
-    processed_listings, filter_errors, filter_warnings = filter_listings(
+    processed_listings, filter_errors, filter_warnings = await afilter_listings(
         all_listings, request
     )
     error_messages.extend(filter_errors)
     warning_messages.extend(filter_warnings)
 
-    # Process the listings before pagination
+    # Explicitly mark listings as available in the main listings view
     for listing in processed_listings:
-        # Set availability data
-        try:
-            earliest_slot = listing.slots.earliest("start_date", "start_time")
-            listing.available_from = earliest_slot.start_date
-            listing.available_time_from = earliest_slot.start_time
-            latest_slot = listing.slots.latest("end_date", "end_time")
-            listing.available_until = latest_slot.end_date
-            listing.available_time_until = latest_slot.end_time
-        except listing.slots.model.DoesNotExist:
-            listing.available_from = None
-            listing.available_time_from = None
-            listing.available_until = None
-            listing.available_time_until = None
-
-        # Explicitly mark listings as available in the main listings view
         listing.user_profile_available = True
 
     # Continue with pagination
@@ -463,19 +513,22 @@ def view_listings(request):
 
     # Add this code to get bookmarked listings
     bookmarked_listings = []
-    if request.user.is_authenticated:
+    if await is_authenticated(request):
         # Get IDs of listings bookmarked by the user
-        bookmarked_listings = list(
-            BookmarkedListing.objects.filter(user=request.user).values_list(
-                "listing__id", flat=True
-            )
-        )
+        bookmarked_listings = [
+            listing_id
+            async for listing_id in BookmarkedListing.objects.filter(
+                user=request.user
+            ).values_list("listing__id", flat=True)
+        ]
 
     context = {
         "listings": page_obj,
         "half_hour_choices": HALF_HOUR_CHOICES,
         "filter_type": request.GET.get("filter_type", "single"),
         "max_price": request.GET.get("max_price", ""),
+        "borough": request.GET.get("borough", ""),
+        "district": request.GET.get("district", ""),
         "search_lat": request.GET.get("lat"),
         "search_lng": request.GET.get("lng"),
         "radius": request.GET.get("radius"),
@@ -498,26 +551,33 @@ def view_listings(request):
         "charger_level_choices": EV_CHARGER_LEVELS,
         "connector_type_choices": EV_CONNECTOR_TYPES,
         "parking_spot_sizes": PARKING_SPOT_SIZES,
+        "borough_choices": BOROUGH_CHOICES,
+        "district_choices": nyc_district_choices(),
         "has_active_filters": has_active_filters(request),
         "is_public_view": False,
         "bookmarked_listings": bookmarked_listings,
     }
 
+    # Context processors and templates may still query the database
     if request.GET.get("ajax") == "1":
-        return render(request, "listings/partials/listing_cards.html", context)
-    return render(request, "listings/view_listings.html", context)
+        template_name = "listings/partials/listing_cards.html"
+    else:
+        template_name = "listings/view_listings.html"
+    return await sync_to_async(render)(request, template_name, context)
 
 
-def map_view_listings(request):
+async def map_view_listings(request):
     current_datetime = datetime.now()
-    all_listings = Listing.objects.filter(
-        models.Q(slots__end_date__gt=current_datetime.date())
-        | models.Q(
-            slots__end_date=current_datetime.date(),
-            slots__end_time__gt=current_datetime.time(),
-        )
-    ).distinct()
-    processed_listings, filter_errors, filter_warnings = filter_listings(
+    all_listings = with_card_data(
+        Listing.objects.filter(
+            models.Q(slots__end_date__gt=current_datetime.date())
+            | models.Q(
+                slots__end_date=current_datetime.date(),
+                slots__end_time__gt=current_datetime.time(),
+            )
+        ).distinct()
+    )
+    processed_listings, filter_errors, filter_warnings = await afilter_listings(
         all_listings, request
     )
 
@@ -555,52 +615,53 @@ def manage_listings(request):
     last_month = first_day_current_month - timedelta(days=1)
     first_day_last_month = last_month.replace(day=1)
 
-    # Fetch all listings owned by this user
-    listings = Listing.objects.filter(user=request.user)
-
-    # Initialize earnings totals
-    total_earnings = 0
-    current_month_earnings = 0
-    last_month_earnings = 0
-
-    # Compute per-listing stats and accumulate earnings
-    for listing in listings:
-        listing.pending_bookings = listing.booking_set.filter(status="PENDING")
-        listing.approved_bookings = listing.booking_set.filter(status="APPROVED")
-
-        # Total earnings to date
-        earned = (
-            listing.approved_bookings.aggregate(Sum("total_price"))["total_price__sum"]
-            or 0
-        )
-        listing.total_earnings = earned
-        total_earnings += earned
-
-        # Earnings this month
-        earned_current = (
-            listing.approved_bookings.filter(
-                created_at__gte=first_day_current_month
-            ).aggregate(Sum("total_price"))["total_price__sum"]
-            or 0
+    # Fetch all listings owned by this user in one query, with their earnings
+    # (conditional sums over approved bookings) and booking status flags.
+    # The bookings and slots shown on each card are prefetched.
+    approved = Q(booking__status="APPROVED")
+    listing_bookings = Booking.objects.filter(listing=OuterRef("pk"))
+    shown_bookings = Booking.objects.select_related("user").prefetch_related("slots")
+    listings = (
+        Listing.objects.filter(user=request.user)
+        .annotate(
+            total_earnings=Sum("booking__total_price", filter=approved, default=0),
+            current_month_earnings=Sum(
+                "booking__total_price",
+                filter=approved & Q(booking__created_at__gte=first_day_current_month),
+                default=0,
+            ),
+            last_month_earnings=Sum(
+                "booking__total_price",
+                filter=approved
+                & Q(
+                    booking__created_at__gte=first_day_last_month,
+                    booking__created_at__lt=first_day_current_month,
+                ),
+                default=0,
+            ),
+            has_pending_bookings=Exists(listing_bookings.filter(status="PENDING")),
+            has_approved_bookings=Exists(listing_bookings.filter(status="APPROVED")),
         )
-        listing.current_month_earnings = earned_current
-        current_month_earnings += earned_current
-
-        # Earnings last month
-        earned_last = (
-            listing.approved_bookings.filter(
-                created_at__gte=first_day_last_month,
-                created_at__lt=first_day_current_month,
-            ).aggregate(Sum("total_price"))["total_price__sum"]
-            or 0
+        .prefetch_related(
+            "slots",
+            Prefetch(
+                "booking_set",
+                queryset=shown_bookings.filter(status="PENDING"),
+                to_attr="pending_bookings",
+            ),
+            Prefetch(
+                "booking_set",
+                queryset=shown_bookings.filter(status="APPROVED"),
+                to_attr="approved_bookings",
+            ),
         )
-        listing.last_month_earnings = earned_last
-        last_month_earnings += earned_last
+    )
 
+    # Summary totals from the same rows
     earnings_summary = {
-        "total": total_earnings,
-        "current_month": current_month_earnings,
-        "last_month": last_month_earnings,
+        "total": sum(listing.total_earnings for listing in listings),
+        "current_month": sum(listing.current_month_earnings for listing in listings),
+        "last_month": sum(listing.last_month_earnings for listing in listings),
         "current_month_name": today.strftime("%B"),
         "last_month_name": last_month.strftime("%B"),
     }
@@ -611,9 +672,9 @@ def manage_listings(request):
     other_listings = []
 
     for listing in listings:
-        if listing.pending_bookings.exists():
+        if listing.has_pending_bookings:
             listings_with_pending.append(listing)
-        elif listing.approved_bookings.exists():
+        elif listing.has_approved_bookings:
             listings_with_active.append(listing)
         else:
             other_listings.append(listing)
@@ -693,24 +754,17 @@ def user_listings(request, username):
     # Continue with the existing code for verified hosts
     current_datetime = datetime.now()
 
-    # Get all listings from this user
-    listings = Listing.objects.filter(user=host).distinct()
+    # Get all listings from this user, flagged with whether any slot is left
+    listings = with_card_data(Listing.objects.filter(user=host)).annotate(
+        user_profile_available=has_active_slot(current_datetime)
+    )
 
     # Create two separate lists - available and unavailable
     available_listings = []
     unavailable_listings = []
 
     for listing in listings:
-        is_available = listing.slots.filter(
-            models.Q(end_date__gt=current_datetime.date())
-            | models.Q(
-                end_date=current_datetime.date(), end_time__gt=current_datetime.time()
-            )
-        ).exists()
-
-        listing.user_profile_available = is_available
-
-        if is_available:
+        if listing.user_profile_available:
             available_listings.append(listing)
         else:
             unavailable_listings.append(listing)
@@ -820,28 +874,21 @@ def bookmarked_listings(request):
     # Get current datetime for availability check
     current_datetime = datetime.now()
 
-    # Get all bookmarked listings
-    bookmarks = BookmarkedListing.objects.filter(user=request.user)
-    all_listings = [bookmark.listing for bookmark in bookmarks]
+    # Get all bookmarked listings, flagged with whether any slot is left
+    # (user_profile_available is the property the template checks)
+    all_listings = list(
+        with_card_data(Listing.objects.filter(bookmarked_by__user=request.user))
+        .annotate(user_profile_available=has_active_slot(current_datetime))
+        .order_by("-bookmarked_by__created_at")
+    )
 
     # Create two separate lists - available and unavailable
     available_listings = []
     unavailable_listings = []
 
     for listing in all_listings:
-        # Check if listing has any future availability slots
-        is_available = listing.slots.filter(
-            models.Q(end_date__gt=current_datetime.date())
-            | models.Q(
-                end_date=current_datetime.date(), end_time__gt=current_datetime.time()
-            )
-        ).exists()
-
-        # Set property that template checks for availability
-        listing.user_profile_available = is_available
-
         # Sort listings into appropriate lists
-        if is_available:
+        if listing.user_profile_available:
             available_listings.append(listing)
         else:
             unavailable_listings.append(listing)
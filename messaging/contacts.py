@@ -0,0 +1,34 @@
+"""
+Cached lookups of who a user may message.
+
+Regular users can message the users they have a booking with, either way
+round. Those pairs are kept in the Contact table by the Booking receivers in
+messaging.models; the contact ids of a user are cached here and dropped
+whenever one of their contacts is added or removed.
+"""
+
+from django.core.cache import cache
+
+CONTACTS_TIMEOUT = 60 * 60
+
+
+def contacts_key(user_id):
+    return f"contacts:{user_id}"
+
+
+def contact_ids(user_id):
+    """Return the set of ids of the users the given user may message."""
+    ids = cache.get(contacts_key(user_id))
+    if ids is None:
+        # Imported here because messaging.models imports this module
+        from .models import Contact
+
+        ids = set(
+            Contact.objects.filter(user_id=user_id).values_list("contact_id", flat=True)
+        )
+        cache.set(contacts_key(user_id), ids, CONTACTS_TIMEOUT)
+    return ids
+
+
+def invalidate_contacts(*user_ids):
+    cache.delete_many([contacts_key(user_id) for user_id in user_ids])
@@ -1,12 +1,18 @@
-from .models import Message
+from accounts.context_processors import LazyCount
+from accounts.counters import get_counts
 
 
 def unread_messages_count(request):
     """
     Returns a dictionary with the count of unread messages for the logged-in user.
-    This will be injected into every template (via settings).
+    Settings now use accounts.context_processors.unread_counters, which
+    includes this value; this processor reads the same cached counter, lazily.
     """
     if request.user.is_authenticated:
-        count = Message.objects.filter(recipient=request.user, read=False).count()
-        return {"unread_count": count}
+        user_id = request.user.pk
+        return {
+            "unread_count": LazyCount(
+                lambda: get_counts(["messages"], user_id)["messages"]
+            )
+        }
     return {"unread_count": 0}
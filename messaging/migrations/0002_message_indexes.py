@@ -0,0 +1,33 @@
+# Generated by Django 4.2.19 on 2026-10-19 12:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("messaging", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["recipient", "-created_at"], name="message_inbox_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["sender", "-created_at"], name="message_sent_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                condition=models.Q(("read", False)),
+                fields=["recipient"],
+                name="message_unread_idx",
+            ),
+        ),
+    ]
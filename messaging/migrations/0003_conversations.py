@@ -0,0 +1,168 @@
+# Generated by Django 4.2.19 on 2026-10-19 12:51
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def thread_existing_messages(apps, schema_editor):
+    Conversation = apps.get_model("messaging", "Conversation")
+    ConversationParticipant = apps.get_model("messaging", "ConversationParticipant")
+    Message = apps.get_model("messaging", "Message")
+
+    pairs = {
+        tuple(sorted(pair))
+        for pair in Message.objects.values_list("sender_id", "recipient_id").distinct()
+    }
+    for user_one_id, user_two_id in pairs:
+        messages = Message.objects.filter(
+            models.Q(sender_id=user_one_id, recipient_id=user_two_id)
+            | models.Q(sender_id=user_two_id, recipient_id=user_one_id)
+        )
+        last_message = messages.order_by("-created_at", "-pk").first()
+        conversation = Conversation.objects.create(
+            user_one_id=user_one_id,
+            user_two_id=user_two_id,
+            last_message=last_message,
+            last_message_at=last_message.created_at,
+        )
+        messages.update(conversation=conversation)
+        ConversationParticipant.objects.bulk_create(
+            [
+                ConversationParticipant(
+                    conversation=conversation,
+                    user_id=user_id,
+                    last_message_at=last_message.created_at,
+                    unread_count=messages.filter(
+                        recipient_id=user_id, read=False
+                    ).count(),
+                )
+                for user_id in {user_one_id, user_two_id}
+            ]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("messaging", "0002_message_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Conversation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("last_message_at", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ConversationParticipant",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("unread_count", models.PositiveIntegerField(default=0)),
+                ("last_message_at", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="conversationparticipant",
+            name="conversation",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="participants",
+                to="messaging.conversation",
+            ),
+        ),
+        migrations.AddField(
+            model_name="conversationparticipant",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="conversations",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="conversation",
+            name="last_message",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="messaging.message",
+            ),
+        ),
+        migrations.AddField(
+            model_name="conversation",
+            name="user_one",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="conversation",
+            name="user_two",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="message",
+            name="conversation",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="messages",
+                to="messaging.conversation",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="conversationparticipant",
+            index=models.Index(
+                fields=["user", "-last_message_at"], name="conversation_inbox_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="conversationparticipant",
+            constraint=models.UniqueConstraint(
+                fields=("conversation", "user"), name="conversation_participant_unique"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="conversation",
+            constraint=models.UniqueConstraint(
+                fields=("user_one", "user_two"), name="conversation_pair_unique"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["conversation", "-created_at"], name="message_thread_idx"
+            ),
+        ),
+        migrations.RunPython(thread_existing_messages, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.19 on 2026-10-19 12:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def add_booking_contacts(apps, schema_editor):
+    Booking = apps.get_model("booking", "Booking")
+    Contact = apps.get_model("messaging", "Contact")
+    pairs = set(
+        Booking.objects.exclude(user_id=models.F("listing__user_id"))
+        .values_list("user_id", "listing__user_id")
+        .distinct()
+    )
+    pairs |= {(owner_id, renter_id) for renter_id, owner_id in pairs}
+    Contact.objects.bulk_create(
+        [
+            Contact(user_id=user_id, contact_id=contact_id)
+            for user_id, contact_id in pairs
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("booking", "0005_booking_status_indexes"),
+        ("messaging", "0003_conversations"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Contact",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "contact",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="contacts",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="contact",
+            constraint=models.UniqueConstraint(
+                fields=("user", "contact"), name="contact_pair_unique"
+            ),
+        ),
+        migrations.RunPython(add_booking_contacts, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,162 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.counters import (
+    VERIFICATION_MESSAGE_SUBJECT,
+    increment_count,
+    reset_counts,
+)
+from accounts.live import publish, user_channel
+from booking.models import Booking
+from listings.models import Listing
+
+from .contacts import invalidate_contacts
+
+
+class Conversation(models.Model):
+    """
+    The thread of messages between two users, whichever way they were sent.
+    user_one is always the user with the lower id so each pair has exactly
+    one conversation. The latest message is kept here by the Message
+    receivers so the inbox never has to scan the messages themselves.
+    """
+
+    user_one = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="+", db_index=False
+    )
+    user_two = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    last_message = models.ForeignKey(
+        "Message",
+        on_delete=models.SET_NULL,
+        related_name="+",
+        null=True,
+        blank=True,
+    )
+    last_message_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user_one", "user_two"], name="conversation_pair_unique"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Conversation between {self.user_one} and {self.user_two}"
+
+    @classmethod
+    def between(cls, user_a_id, user_b_id):
+        """Return the conversation between two users, creating it if needed."""
+        user_one_id, user_two_id = sorted((user_a_id, user_b_id))
+        conversation, created = cls.objects.get_or_create(
+            user_one_id=user_one_id, user_two_id=user_two_id
+        )
+        if created:
+            ConversationParticipant.objects.bulk_create(
+                [
+                    ConversationParticipant(conversation=conversation, user_id=user_id)
+                    for user_id in {user_one_id, user_two_id}
+                ]
+            )
+        return conversation
+
+    def other_user(self, user_id):
+        """Return the participant who is not the user with the given id."""
+        return self.user_two if user_id == self.user_one_id else self.user_one
+
+    def refresh(self):
+        """
+        Recompute the latest message and every participant's unread count
+        from the messages, after changes the receivers cannot follow
+        incrementally (deletions, bulk updates).
+        """
+        last_message = self.messages.order_by("-created_at", "-pk").first()
+        self.last_message = last_message
+        self.last_message_at = last_message.created_at if last_message else None
+        self.save(update_fields=["last_message", "last_message_at"])
+        self.participants.update(
+            last_message_at=self.last_message_at,
+            unread_count=unread_count_subquery(),
+        )
+
+
+class ConversationParticipant(models.Model):
+    """
+    One user's side of a conversation: how many of its messages they have
+    not read yet, and a copy of the conversation's last_message_at so the
+    inbox is a single index range scan on (user, -last_message_at).
+    """
+
+    conversation = models.ForeignKey(
+        Conversation, on_delete=models.CASCADE, related_name="participants"
+    )
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="conversations"
+    )
+    unread_count = models.PositiveIntegerField(default=0)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["conversation", "user"], name="conversation_participant_unique"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-last_message_at"],
+                name="conversation_inbox_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} in {self.conversation}"
+
+    @property
+    def other_user(self):
+        return self.conversation.other_user(self.user_id)
+
+
+def unread_count_subquery():
+    """
+    The number of unread messages sent to a ConversationParticipant's user
+    in its conversation, for use in participant updates and annotations.
+    """
+    return Coalesce(
+        Subquery(
+            Message.objects.filter(
+                conversation=OuterRef("conversation"),
+                recipient=OuterRef("user"),
+                read=False,
+            )
+            .order_by()
+            .values("conversation")
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+def refresh_unread_counts(user):
+    """Recompute the unread counts of all the given user's conversations."""
+    ConversationParticipant.objects.filter(user=user).update(
+        unread_count=unread_count_subquery()
+    )
 
 
 class Message(models.Model):
+    conversation = models.ForeignKey(
+        Conversation,
+        on_delete=models.CASCADE,
+        related_name="messages",
+        null=True,
+        blank=True,
+    )
     sender = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="sent_messages"
     )
@@ -14,5 +168,151 @@ class Message(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     read = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["recipient", "-created_at"], name="message_inbox_idx"),
+            models.Index(fields=["sender", "-created_at"], name="message_sent_idx"),
+            # Unread badge count
+            models.Index(
+                fields=["recipient"],
+                condition=models.Q(read=False),
+                name="message_unread_idx",
+            ),
+            models.Index(
+                fields=["conversation", "-created_at"], name="message_thread_idx"
+            ),
+        ]
+
     def __str__(self):
         return f"Message from {self.sender.username} to {self.recipient.username}"
+
+    def save(self, *args, **kwargs):
+        """File the message in the conversation between sender and recipient."""
+        if self.conversation_id is None:
+            self.conversation = Conversation.between(self.sender_id, self.recipient_id)
+        super().save(*args, **kwargs)
+
+
+class Contact(models.Model):
+    """
+    A user the given user may message because one of them has booked the
+    other's listing. Each pair is stored in both directions.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="contacts")
+    contact = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "contact"], name="contact_pair_unique"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} can message {self.contact}"
+
+
+@receiver(post_save, sender=Message)
+def update_message_counters(sender, instance, created, **kwargs):
+    if created:
+        if not instance.read:
+            increment_count("messages", instance.recipient_id)
+            if instance.subject == VERIFICATION_MESSAGE_SUBJECT:
+                increment_count("verification_messages", instance.recipient_id)
+    else:
+        reset_counts(["messages", "verification_messages"], instance.recipient_id)
+
+
+@receiver(post_save, sender=Message)
+def update_conversation_summary(sender, instance, created, **kwargs):
+    participants = ConversationParticipant.objects.filter(
+        conversation_id=instance.conversation_id
+    )
+    if not created:
+        # The read flag may have changed
+        participants.filter(user_id=instance.recipient_id).update(
+            unread_count=unread_count_subquery()
+        )
+        return
+    Conversation.objects.filter(pk=instance.conversation_id).update(
+        last_message=instance, last_message_at=instance.created_at
+    )
+    participants.update(last_message_at=instance.created_at)
+    if not instance.read:
+        participants.filter(user_id=instance.recipient_id).update(
+            unread_count=F("unread_count") + 1
+        )
+
+
+@receiver(post_save, sender=Message)
+def publish_new_message(sender, instance, created, **kwargs):
+    if created:
+        publish(
+            user_channel(instance.recipient_id),
+            "message",
+            subject=instance.subject or "",
+            sender=instance.sender.username,
+            conversation_id=instance.conversation_id,
+            created_at=instance.created_at.isoformat(),
+        )
+
+
+@receiver(post_delete, sender=Message)
+def reset_message_counters(sender, instance, **kwargs):
+    reset_counts(["messages", "verification_messages"], instance.recipient_id)
+
+
+@receiver(post_delete, sender=Message)
+def refresh_conversation_summary(sender, instance, **kwargs):
+    conversation = Conversation.objects.filter(pk=instance.conversation_id).first()
+    if conversation is not None:
+        conversation.refresh()
+
+
+@receiver(post_save, sender=User)
+def reset_new_user_contacts(sender, instance, created, **kwargs):
+    # A new user starts without contacts even if their id was used before
+    if created:
+        invalidate_contacts(instance.pk)
+
+
+@receiver(post_save, sender=Booking)
+def add_booking_contacts(sender, instance, created, **kwargs):
+    if not created:
+        return
+    renter_id, owner_id = instance.user_id, instance.listing.user_id
+    if renter_id == owner_id:
+        return
+    Contact.objects.bulk_create(
+        [
+            Contact(user_id=renter_id, contact_id=owner_id),
+            Contact(user_id=owner_id, contact_id=renter_id),
+        ],
+        ignore_conflicts=True,
+    )
+    invalidate_contacts(renter_id, owner_id)
+
+
+@receiver(post_delete, sender=Booking)
+def remove_booking_contacts(sender, instance, **kwargs):
+    # Users stay contacts while any booking links them, either way round
+    renter_id = instance.user_id
+    owner_id = (
+        Listing.objects.filter(pk=instance.listing_id)
+        .values_list("user_id", flat=True)
+        .first()
+    )
+    if owner_id is None or renter_id == owner_id:
+        return
+    linked = Booking.objects.filter(
+        Q(user_id=renter_id, listing__user_id=owner_id)
+        | Q(user_id=owner_id, listing__user_id=renter_id)
+    ).exists()
+    if not linked:
+        Contact.objects.filter(
+            Q(user_id=renter_id, contact_id=owner_id)
+            | Q(user_id=owner_id, contact_id=renter_id)
+        ).delete()
+        invalidate_contacts(renter_id, owner_id)
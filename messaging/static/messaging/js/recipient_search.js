@@ -0,0 +1,49 @@
+document.addEventListener('DOMContentLoaded', function() {
+  // Admins pick the recipient by username instead of from a list of every user
+  const searchInput = document.getElementById('recipientSearch');
+  const results = document.getElementById('recipientResults');
+  const recipientField = document.getElementById('id_recipient');
+
+  if (!searchInput || !results || !recipientField) {
+    return;
+  }
+
+  let timer = null;
+
+  function clearResults() {
+    results.innerHTML = '';
+  }
+
+  function showResults(users) {
+    clearResults();
+    users.forEach(function(user) {
+      const item = document.createElement('button');
+      item.type = 'button';
+      item.className = 'list-group-item list-group-item-action';
+      item.textContent = user.username;
+      item.addEventListener('click', function() {
+        recipientField.value = user.id;
+        searchInput.value = user.username;
+        clearResults();
+      });
+      results.appendChild(item);
+    });
+  }
+
+  searchInput.addEventListener('input', function() {
+    // A typed name only counts once it is picked from the results
+    recipientField.value = '';
+    clearTimeout(timer);
+    const query = searchInput.value.trim();
+    if (!query) {
+      clearResults();
+      return;
+    }
+    timer = setTimeout(function() {
+      fetch(searchInput.dataset.url + '?q=' + encodeURIComponent(query))
+        .then(response => response.json())
+        .then(data => showResults(data.results))
+        .catch(error => console.error('Error searching users:', error));
+    }, 200);
+  });
+});
@@ -1,3 +1,4 @@
+from django.core.cache import cache
 from django.test import TestCase, RequestFactory
 from django.contrib.auth.models import User, AnonymousUser
 from messaging.models import Message
@@ -7,6 +8,7 @@ from messaging.context_processors import unread_messages_count
 class UnreadMessagesCountTest(TestCase):
     def setUp(self):
         """Set up test data and request factory"""
+        cache.clear()
         self.factory = RequestFactory()
 
         # Create users
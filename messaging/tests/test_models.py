@@ -1,6 +1,11 @@
 from django.test import TestCase
 from django.contrib.auth.models import User
-from messaging.models import Message
+from django.core.cache import cache
+
+from booking.models import Booking
+from listings.models import Listing
+from messaging.contacts import contact_ids
+from messaging.models import Contact, Conversation, ConversationParticipant, Message
 
 
 class MessageModelTest(TestCase):
@@ -130,3 +135,119 @@ class MessageModelTest(TestCase):
         # The second message should come first
         self.assertEqual(messages[0], message2)
         self.assertEqual(messages[1], message1)
+
+
+class ConversationModelTest(TestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(username="user1", password="password123")
+        self.user2 = User.objects.create_user(username="user2", password="password123")
+
+    def participant(self, user):
+        return ConversationParticipant.objects.get(user=user)
+
+    def test_messages_both_ways_share_a_conversation(self):
+        """Each pair of users has one conversation, whoever sent first"""
+        first = Message.objects.create(
+            sender=self.user2, recipient=self.user1, body="Hi"
+        )
+        reply = Message.objects.create(
+            sender=self.user1, recipient=self.user2, body="Hello"
+        )
+
+        self.assertEqual(first.conversation, reply.conversation)
+        self.assertEqual(Conversation.objects.count(), 1)
+        self.assertEqual(first.conversation.user_one, self.user1)
+        self.assertEqual(ConversationParticipant.objects.count(), 2)
+
+    def test_summary_follows_new_messages(self):
+        """The latest message and unread counts are kept up to date"""
+        Message.objects.create(sender=self.user1, recipient=self.user2, body="One")
+        latest = Message.objects.create(
+            sender=self.user1, recipient=self.user2, body="Two"
+        )
+
+        conversation = Conversation.objects.get()
+        self.assertEqual(conversation.last_message, latest)
+        self.assertEqual(conversation.last_message_at, latest.created_at)
+        self.assertEqual(self.participant(self.user2).unread_count, 2)
+        self.assertEqual(self.participant(self.user1).unread_count, 0)
+        self.assertEqual(
+            self.participant(self.user1).last_message_at, latest.created_at
+        )
+
+    def test_reading_a_message_updates_unread_count(self):
+        message = Message.objects.create(
+            sender=self.user1, recipient=self.user2, body="One"
+        )
+        message.read = True
+        message.save()
+        self.assertEqual(self.participant(self.user2).unread_count, 0)
+
+    def test_deleting_the_latest_message(self):
+        """Deleting messages falls back to the previous one"""
+        first = Message.objects.create(
+            sender=self.user1, recipient=self.user2, body="One"
+        )
+        latest = Message.objects.create(
+            sender=self.user2, recipient=self.user1, body="Two"
+        )
+
+        latest.delete()
+        conversation = Conversation.objects.get()
+        self.assertEqual(conversation.last_message, first)
+        self.assertEqual(self.participant(self.user1).unread_count, 0)
+        self.assertEqual(self.participant(self.user2).unread_count, 1)
+
+        first.delete()
+        conversation.refresh_from_db()
+        self.assertIsNone(conversation.last_message)
+        self.assertIsNone(self.participant(self.user1).last_message_at)
+
+
+class ContactModelTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="owner", password="password123")
+        self.renter = User.objects.create_user(
+            username="renter", password="password123"
+        )
+        self.listing = Listing.objects.create(
+            user=self.owner,
+            title="Spot",
+            location="123 Test St",
+            rent_per_hour=10,
+            description="Spot",
+        )
+
+    def book(self):
+        return Booking.objects.create(
+            user=self.renter, listing=self.listing, email="renter@example.com"
+        )
+
+    def test_booking_makes_users_contacts(self):
+        """A booking lets renter and owner message each other"""
+        self.assertEqual(contact_ids(self.renter.pk), set())
+
+        self.book()
+        self.book()
+
+        self.assertEqual(Contact.objects.count(), 2)
+        self.assertEqual(contact_ids(self.renter.pk), {self.owner.pk})
+        self.assertEqual(contact_ids(self.owner.pk), {self.renter.pk})
+
+    def test_contacts_are_cached(self):
+        self.book()
+        contact_ids(self.renter.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(contact_ids(self.renter.pk), {self.owner.pk})
+
+    def test_deleting_last_booking_removes_contacts(self):
+        first = self.book()
+        second = self.book()
+
+        first.delete()
+        self.assertEqual(contact_ids(self.renter.pk), {self.owner.pk})
+
+        second.delete()
+        self.assertEqual(contact_ids(self.renter.pk), set())
+        self.assertFalse(Contact.objects.exists())
@@ -43,9 +43,74 @@ class MessagingViewsTest(TestCase):
 
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, "messaging/inbox.html")
-        self.assertIn("messages_inbox", response.context)
-        self.assertEqual(len(response.context["messages_inbox"]), 1)
-        self.assertEqual(response.context["messages_inbox"][0], self.message2)
+        self.assertIn("conversations", response.context)
+        # Both messages between the two users are one conversation
+        self.assertEqual(len(response.context["conversations"]), 1)
+        participant = response.context["conversations"][0]
+        self.assertEqual(participant.other_user, self.user2)
+        self.assertEqual(participant.conversation.last_message, self.message2)
+        self.assertEqual(participant.unread_count, 1)
+
+    def test_inbox_view_paginated(self):
+        """The inbox is paged by latest activity, following the "before" cursor"""
+        for i in range(30):
+            sender = User.objects.create_user(username=f"bulk{i}", password="pass")
+            Message.objects.create(
+                sender=sender, recipient=self.user1, subject=f"Bulk {i}", body="Hi"
+            )
+        self.client.login(username="testuser1", password="testpassword1")
+
+        response = self.client.get(reverse("inbox"))
+        first_page = response.context["conversations"]
+        self.assertEqual(len(first_page), 25)
+        self.assertEqual(first_page[0].other_user.username, "bulk29")
+        self.assertTrue(first_page.has_next())
+
+        response = self.client.get(reverse("inbox"), {"before": first_page.next_cursor})
+        second_page = response.context["conversations"]
+        self.assertEqual(
+            [participant.other_user.username for participant in second_page],
+            ["bulk4", "bulk3", "bulk2", "bulk1", "bulk0", "testuser2"],
+        )
+        self.assertFalse(second_page.has_next())
+
+    def test_inbox_view_shows_snippet_only(self):
+        """The list loads the start of the latest body, not the whole body"""
+        self.message2.body = "x" * 500
+        self.message2.save()
+        self.client.login(username="testuser1", password="testpassword1")
+
+        response = self.client.get(reverse("inbox"))
+        participant = response.context["conversations"][0]
+        last_message = participant.conversation.last_message
+        self.assertIn("body", last_message.get_deferred_fields())
+        self.assertEqual(participant.snippet, "x" * 100)
+        self.assertTrue(participant.truncated)
+        self.assertNotContains(response, "x" * 101)
+
+    def test_conversation_detail(self):
+        """A conversation lists the messages sent both ways"""
+        conversation = self.message1.conversation
+        self.client.login(username="testuser1", password="testpassword1")
+        response = self.client.get(
+            reverse("conversation_detail", args=[conversation.pk])
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "messaging/conversation_detail.html")
+        self.assertEqual(response.context["other_user"], self.user2)
+        self.assertEqual(
+            list(response.context["thread"]), [self.message2, self.message1]
+        )
+
+    def test_conversation_detail_unauthorized(self):
+        """Users outside a conversation cannot view it"""
+        conversation = self.message1.conversation
+        self.client.login(username="testuser3", password="testpassword3")
+        response = self.client.get(
+            reverse("conversation_detail", args=[conversation.pk])
+        )
+        self.assertEqual(response.status_code, 403)
 
     def test_inbox_view_unauthenticated(self):
         """Test inbox access for unauthenticated users"""
@@ -395,6 +460,32 @@ class ComposeMessagingTests(TestCase):
             ).exists()
         )
 
+    def test_admin_compose_does_not_list_users(self):
+        """Admins search for the recipient instead of getting every user"""
+        self.client.login(username="admin", password="adminpass")
+        response = self.client.get(reverse("compose_message"))
+
+        self.assertTrue(response.context["recipient_search"])
+        self.assertIsInstance(
+            response.context["form"].fields["recipient"].widget, forms.HiddenInput
+        )
+        self.assertNotContains(response, "stranger")
+
+    def test_recipient_search(self):
+        """Admins can look users up by username prefix"""
+        self.client.login(username="admin", password="adminpass")
+        response = self.client.get(reverse("recipient_search"), {"q": "REN"})
+
+        self.assertEqual(
+            response.json(),
+            {"results": [{"id": self.renter.id, "username": "renter"}]},
+        )
+
+    def test_recipient_search_non_admin_forbidden(self):
+        self.client.login(username="renter", password="renterpass")
+        response = self.client.get(reverse("recipient_search"), {"q": "s"})
+        self.assertEqual(response.status_code, 403)
+
     def test_reply_to_admin_message(self):
         """Test replying to an admin message"""
         # Create an admin message
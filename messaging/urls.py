@@ -4,6 +4,11 @@ from . import views
 urlpatterns = [
     path("inbox/", views.inbox, name="inbox"),
     path("sent/", views.sent_messages, name="sent_messages"),
+    path(
+        "conversations/<int:conversation_id>/",
+        views.conversation_detail,
+        name="conversation_detail",
+    ),
     path("compose/", views.compose_message, name="compose_message"),
     path(
         "compose/admin/",
@@ -11,6 +16,7 @@ urlpatterns = [
         {"admin_message": True},
         name="compose_admin_message",
     ),
+    path("recipients/", views.recipient_search, name="recipient_search"),
     path("<int:message_id>/", views.message_detail, name="message_detail"),
     path(
         "compose/<int:recipient_id>/", views.compose_message, name="compose_message_to"
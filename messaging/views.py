@@ -1,19 +1,64 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseForbidden
-from .models import Message
+from django.http import HttpResponseForbidden, JsonResponse
+from .contacts import contact_ids
+from .models import Conversation, ConversationParticipant, Message
 from .forms import MessageForm
 from django.contrib.auth import get_user_model
 from django import forms
+from django.db.models.functions import Length, Substr
+from django.db.models.lookups import GreaterThan
+
+from ParkEasy.pagination import keyset_page
 
 
 User = get_user_model()
 
+# Messages per page in the inbox and sent lists
+MESSAGES_PER_PAGE = 25
+# Characters of the body shown under the subject in message lists
+SNIPPET_LENGTH = 100
+
+
+def with_snippet(messages):
+    """
+    Load the start of each message's body as "snippet" instead of the whole
+    body, which only message_detail shows. "truncated" tells whether the
+    body is longer than the snippet.
+    """
+    return messages.defer("body").annotate(
+        snippet=Substr("body", 1, SNIPPET_LENGTH),
+        truncated=GreaterThan(Length("body"), SNIPPET_LENGTH),
+    )
+
 
 @login_required
 def inbox(request):
-    messages_inbox = Message.objects.filter(recipient=request.user).order_by(
-        "-created_at"
+    """
+    List the user's conversations, most recently active first. Each row is
+    read from the user's ConversationParticipant summary with the latest
+    message joined in, so the page is one indexed query however many
+    messages there are.
+    """
+    conversations = keyset_page(
+        ConversationParticipant.objects.filter(
+            user=request.user, last_message_at__isnull=False
+        )
+        .select_related(
+            "conversation__user_one",
+            "conversation__user_two",
+            "conversation__last_message__sender",
+        )
+        .defer("conversation__last_message__body")
+        .annotate(
+            snippet=Substr("conversation__last_message__body", 1, SNIPPET_LENGTH),
+            truncated=GreaterThan(
+                Length("conversation__last_message__body"), SNIPPET_LENGTH
+            ),
+        ),
+        request.GET.get("before"),
+        MESSAGES_PER_PAGE,
+        field="last_message_at",
     )
 
     # Get session messages if any
@@ -21,22 +66,61 @@ def inbox(request):
     error_message = request.session.pop("error_message", None)
 
     context = {
-        "messages_inbox": messages_inbox,
+        "conversations": conversations,
         "success_message": success_message,
         "error_message": error_message,
     }
     return render(request, "messaging/inbox.html", context)
 
 
+@login_required
+def conversation_detail(request, conversation_id):
+    """List the messages of one conversation, newest first."""
+    conversation = get_object_or_404(
+        Conversation.objects.select_related("user_one", "user_two"),
+        pk=conversation_id,
+    )
+
+    # Only allow the participants or an admin to view
+    if (
+        request.user.pk not in (conversation.user_one_id, conversation.user_two_id)
+        and not request.user.is_staff
+    ):
+        return HttpResponseForbidden("You are not allowed to view this conversation.")
+
+    thread = keyset_page(
+        with_snippet(conversation.messages.all()),
+        request.GET.get("before"),
+        MESSAGES_PER_PAGE,
+    )
+    # Both users are already loaded with the conversation
+    users = {
+        conversation.user_one_id: conversation.user_one,
+        conversation.user_two_id: conversation.user_two,
+    }
+    for message in thread:
+        message.sender = users[message.sender_id]
+        message.recipient = users[message.recipient_id]
+
+    context = {
+        "conversation": conversation,
+        "other_user": conversation.other_user(request.user.pk),
+        "thread": thread,
+    }
+    return render(request, "messaging/conversation_detail.html", context)
+
+
 @login_required
 def sent_messages(request):
     # Get all sent messages except verification requests
-    messages_sent = (
-        Message.objects.filter(sender=request.user)
+    messages_sent = keyset_page(
+        with_snippet(Message.objects.filter(sender=request.user))
         .exclude(
             subject="Verification Request"  # Hide verification requests from users
         )
-        .order_by("-created_at")
+        .select_related("recipient"),
+        request.GET.get("before"),
+        MESSAGES_PER_PAGE,
     )
 
     context = {"messages_sent": messages_sent}
@@ -58,22 +142,16 @@ def compose_message(request, recipient_id=None, admin_message=False):
 
     # Determine available recipients
     if is_admin:
-        # Admins can message anyone
+        # Admins can message anyone; they pick the recipient with the search
+        # box rather than from a list of every user
         available_recipients = User.objects.all().exclude(id=request.user.id)
     elif not admin_message:
         # Regular users can only message people they've had booking interactions with
-        booked_owners = User.objects.filter(
-            listing__booking__user=request.user
-        ).distinct()
-        booking_users = User.objects.filter(
-            booking__listing__user=request.user
-        ).distinct()
-        available_recipients = (
-            (booked_owners | booking_users).exclude(id=request.user.id).distinct()
-        )
+        allowed_ids = contact_ids(request.user.pk)
+        available_recipients = User.objects.filter(pk__in=allowed_ids)
 
         # If no recipients available and no specific recipient_id provided, redirect
-        if not available_recipients.exists() and not recipient_id:
+        if not allowed_ids and not recipient_id:
             request.session["error_message"] = (
                 "You don't have any users to message yet. You need to either book "
                 "a listing or have someone book your listing first."
@@ -89,8 +167,8 @@ def compose_message(request, recipient_id=None, admin_message=False):
         initial_data = {"subject": "Support Request: ", "recipient": admin.id}
     elif recipient_id:
         recipient = get_object_or_404(User, pk=recipient_id)
-        # Check if recipient is in available_recipients or is an admin
-        if recipient in available_recipients or recipient.is_staff:
+        # Check if recipient is an allowed contact or is an admin
+        if is_admin or recipient.pk in allowed_ids or recipient.is_staff:
             initial_data = {"recipient": recipient}
         else:
             request.session["error_message"] = (
@@ -132,21 +210,48 @@ def compose_message(request, recipient_id=None, admin_message=False):
             # Set the queryset for GET requests in regular messages
             form.fields["recipient"].queryset = available_recipients
 
-    # For admin messages, hide the recipient field
-    if admin_message:
+    # For admin messages, hide the recipient field; admins search for the
+    # recipient and the chosen id is posted in the hidden field
+    if admin_message or is_admin:
         form.fields["recipient"].widget = forms.HiddenInput()
 
     context = {
         "form": form,
         "is_admin_message": admin_message,
+        "recipient_search": is_admin and not admin_message,
+        "initial_recipient": initial_data.get("recipient"),
         "available_recipients": available_recipients if not admin_message else None,
     }
     return render(request, "messaging/compose_message.html", context)
 
 
+# Users returned per recipient search
+RECIPIENT_SEARCH_LIMIT = 10
+
+
+@login_required
+def recipient_search(request):
+    """JSON autocomplete of users by username prefix, for admins composing."""
+    if not request.user.is_staff:
+        return HttpResponseForbidden("You are not allowed to search users.")
+
+    query = request.GET.get("q", "").strip()
+    results = []
+    if query:
+        results = list(
+            User.objects.filter(username__istartswith=query)
+            .exclude(pk=request.user.pk)
+            .order_by("username")
+            .values("id", "username")[:RECIPIENT_SEARCH_LIMIT]
+        )
+    return JsonResponse({"results": results})
+
+
 @login_required
 def message_detail(request, message_id):
-    message = get_object_or_404(Message, pk=message_id)
+    message = get_object_or_404(
+        Message.objects.select_related("sender", "recipient"), pk=message_id
+    )
 
     # Only allow sender, recipient or admin to view
     if (
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Report
+from .models import Report, ReportTarget
 
 
 class ReportAdmin(admin.ModelAdmin):
@@ -44,4 +44,26 @@ class ReportAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
 
 
+class ReportTargetAdmin(admin.ModelAdmin):
+    list_display = [
+        "id",
+        "content_type",
+        "object_id",
+        "report_count",
+        "severity",
+        "latest_report_at",
+    ]
+    list_filter = ["severity", "content_type"]
+    # Kept up to date from the reports
+    readonly_fields = [
+        "content_type",
+        "object_id",
+        "report_count",
+        "severity",
+        "latest_report_at",
+        "admins_notified_at",
+    ]
+
+
 admin.site.register(Report, ReportAdmin)
+admin.site.register(ReportTarget, ReportTargetAdmin)
@@ -0,0 +1,122 @@
+# Generated by Django 4.2.19 on 2026-10-19 13:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# reports.models.REPORT_SEVERITY when this migration was written
+REPORT_SEVERITY = {
+    "FRAUD": 3,
+    "INAPPROPRIATE": 2,
+    "MISLEADING": 1,
+    "SPAM": 1,
+    "OTHER": 0,
+}
+
+
+def group_existing_reports(apps, schema_editor):
+    Report = apps.get_model("reports", "Report")
+    ReportTarget = apps.get_model("reports", "ReportTarget")
+
+    severity = models.Case(
+        *[
+            models.When(report_type=report_type, then=models.Value(value))
+            for report_type, value in REPORT_SEVERITY.items()
+        ],
+        default=models.Value(0),
+        output_field=models.PositiveSmallIntegerField(),
+    )
+    is_open = models.Q(status__in=["PENDING", "REVIEWING"])
+    summaries = (
+        Report.objects.order_by()
+        .values("content_type_id", "object_id")
+        .annotate(
+            report_count=models.Count("pk", filter=is_open),
+            severity=models.Max(severity, filter=is_open),
+            latest_report_at=models.Max("created_at"),
+        )
+    )
+    for summary in summaries:
+        target = ReportTarget.objects.create(
+            content_type_id=summary["content_type_id"],
+            object_id=summary["object_id"],
+            report_count=summary["report_count"],
+            severity=summary["severity"] or 0,
+            latest_report_at=summary["latest_report_at"],
+        )
+        Report.objects.filter(
+            content_type_id=target.content_type_id, object_id=target.object_id
+        ).update(target=target)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("reports", "0002_report_status_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReportTarget",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("object_id", models.PositiveIntegerField()),
+                ("report_count", models.PositiveIntegerField(default=0)),
+                (
+                    "severity",
+                    models.PositiveSmallIntegerField(
+                        choices=[
+                            (0, "Low"),
+                            (1, "Medium"),
+                            (2, "High"),
+                            (3, "Critical"),
+                        ],
+                        default=0,
+                    ),
+                ),
+                ("latest_report_at", models.DateTimeField(blank=True, null=True)),
+                ("admins_notified_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "content_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="contenttypes.contenttype",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="report",
+            name="target",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="reports",
+                to="reports.reporttarget",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reporttarget",
+            index=models.Index(
+                condition=models.Q(("report_count__gt", 0)),
+                fields=["-severity", "-report_count", "-latest_report_at"],
+                name="report_target_queue_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="reporttarget",
+            constraint=models.UniqueConstraint(
+                fields=("content_type", "object_id"), name="report_target_unique"
+            ),
+        ),
+        migrations.RunPython(group_existing_reports, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,128 @@
+import datetime as dt
+
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.db.models import Case, Count, Max, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from accounts.counters import reset_counts
 
 User = get_user_model()
 
+# Reports in these statuses still need a moderator
+OPEN_STATUSES = ("PENDING", "REVIEWING")
+
+SEVERITY_LEVELS = (
+    (0, "Low"),
+    (1, "Medium"),
+    (2, "High"),
+    (3, "Critical"),
+)
+
+# Severity of each report type; a target is as severe as its worst open report
+REPORT_SEVERITY = {
+    "FRAUD": 3,
+    "INAPPROPRIATE": 2,
+    "MISLEADING": 1,
+    "SPAM": 1,
+    "OTHER": 0,
+}
+
+# Admins hear about new reports on a target at most this often
+ADMIN_NOTIFICATION_INTERVAL = dt.timedelta(hours=1)
+
+
+def severity_expression():
+    """The severity of a report's type, as a database expression."""
+    return Case(
+        *[
+            When(report_type=report_type, then=Value(severity))
+            for report_type, severity in REPORT_SEVERITY.items()
+        ],
+        default=Value(0),
+        output_field=models.PositiveSmallIntegerField(),
+    )
+
+
+class ReportTarget(models.Model):
+    """
+    Everything reported about one object. The number of open reports, their
+    highest severity and the time of the latest report are kept up to date
+    by the Report receivers, so the moderation queue is read off an index
+    instead of grouping the reports.
+    """
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    reported_object = GenericForeignKey("content_type", "object_id")
+
+    report_count = models.PositiveIntegerField(default=0)
+    severity = models.PositiveSmallIntegerField(choices=SEVERITY_LEVELS, default=0)
+    latest_report_at = models.DateTimeField(null=True, blank=True)
+    admins_notified_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["content_type", "object_id"], name="report_target_unique"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["-severity", "-report_count", "-latest_report_at"],
+                name="report_target_queue_idx",
+                condition=Q(report_count__gt=0),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.content_type.model} #{self.object_id} ({self.report_count} open)"
+
+    @classmethod
+    def for_object(cls, content_type_id, object_id):
+        """Return the target of the given object, creating it if needed."""
+        target, _ = cls.objects.get_or_create(
+            content_type_id=content_type_id, object_id=object_id
+        )
+        return target
+
+    def refresh(self):
+        """Recompute the open report count, severity and latest report time."""
+        is_open = Q(status__in=OPEN_STATUSES)
+        summary = self.reports.aggregate(
+            report_count=Count("pk", filter=is_open),
+            severity=Max(severity_expression(), filter=is_open),
+            latest_report_at=Max("created_at"),
+        )
+        self.report_count = summary["report_count"]
+        self.severity = summary["severity"] or 0
+        self.latest_report_at = summary["latest_report_at"]
+        self.save(update_fields=["report_count", "severity", "latest_report_at"])
+
+    def claim_admin_notification(self, interval=ADMIN_NOTIFICATION_INTERVAL):
+        """
+        Return True if admins should be told about a new report on this
+        target, i.e. they have not been within the interval. Of several
+        reports arriving at once only one gets True.
+        """
+        now = timezone.now()
+        claimed = (
+            ReportTarget.objects.filter(pk=self.pk)
+            .filter(
+                Q(admins_notified_at__isnull=True)
+                | Q(admins_notified_at__lte=now - interval)
+            )
+            .update(admins_notified_at=now)
+        )
+        if claimed:
+            self.admins_notified_at = now
+        return bool(claimed)
+
 
 class Report(models.Model):
     REPORT_TYPES = (
@@ -25,6 +143,13 @@ class Report(models.Model):
     reporter = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="reports_filed"
     )
+    target = models.ForeignKey(
+        ReportTarget,
+        on_delete=models.CASCADE,
+        related_name="reports",
+        null=True,
+        blank=True,
+    )
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
     object_id = models.PositiveIntegerField()
     reported_object = GenericForeignKey("content_type", "object_id")
@@ -45,5 +170,58 @@ class Report(models.Model):
         related_name="resolved_reports",
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "-created_at"], name="report_status_idx"),
+        ]
+
     def __str__(self):
         return f"Report #{self.id} - {self.get_report_type_display()} - {self.status}"
+
+    def save(self, *args, **kwargs):
+        """File the report under the target it is about."""
+        if self.target_id is None:
+            self.target = ReportTarget.for_object(self.content_type_id, self.object_id)
+        super().save(*args, **kwargs)
+
+
+def refresh_report_targets(target_ids):
+    """
+    Recompute the summaries of the given targets in one UPDATE, after their
+    reports were changed with queryset.update(), which skips the receivers.
+    """
+    reports = Report.objects.filter(target=OuterRef("pk")).order_by().values("target")
+    open_reports = reports.filter(status__in=OPEN_STATUSES)
+    ReportTarget.objects.filter(pk__in=target_ids).update(
+        report_count=Coalesce(
+            Subquery(open_reports.annotate(count=Count("pk")).values("count")), 0
+        ),
+        severity=Coalesce(
+            Subquery(
+                open_reports.annotate(severity=Max(severity_expression())).values(
+                    "severity"
+                )
+            ),
+            0,
+        ),
+        latest_report_at=Subquery(
+            reports.annotate(latest=Max("created_at")).values("latest")
+        ),
+    )
+
+
+@receiver(post_save, sender=Report)
+@receiver(post_delete, sender=Report)
+def reset_report_counter(sender, instance, **kwargs):
+    reset_counts(["pending_reports"])
+
+
+@receiver(post_save, sender=Report)
+@receiver(post_delete, sender=Report)
+def refresh_report_target(sender, instance, **kwargs):
+    if Report.target.is_cached(instance):
+        target = instance.target
+    else:
+        target = ReportTarget.objects.filter(pk=instance.target_id).first()
+    if target is not None:
+        target.refresh()
@@ -1,7 +1,13 @@
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
-from reports.models import Report
+from django.utils import timezone
+from reports.models import (
+    ADMIN_NOTIFICATION_INTERVAL,
+    REPORT_SEVERITY,
+    Report,
+    ReportTarget,
+)
 
 User = get_user_model()
 
@@ -65,3 +71,60 @@ class ReportModelTest(TestCase):
             self.report.status = choice_key
             self.report.save()
             self.assertEqual(self.report.status, choice_key)
+
+
+class ReportTargetTest(TestCase):
+    def setUp(self):
+        self.reporters = [
+            User.objects.create_user(username=f"reporter{i}", password="password123")
+            for i in range(3)
+        ]
+        self.reported = User.objects.create_user(username="reported")
+        self.content_type = ContentType.objects.get_for_model(User)
+
+    def report(self, reporter, report_type="SPAM", **kwargs):
+        return Report.objects.create(
+            reporter=reporter,
+            content_type=self.content_type,
+            object_id=self.reported.id,
+            report_type=report_type,
+            description="Reported",
+            **kwargs,
+        )
+
+    def test_reports_share_one_target(self):
+        first = self.report(self.reporters[0])
+        second = self.report(self.reporters[1], "FRAUD")
+        self.assertEqual(first.target, second.target)
+        self.assertEqual(ReportTarget.objects.count(), 1)
+
+        target = ReportTarget.objects.get()
+        self.assertEqual(target.report_count, 2)
+        self.assertEqual(target.severity, REPORT_SEVERITY["FRAUD"])
+        self.assertEqual(target.latest_report_at, second.created_at)
+
+    def test_summary_follows_status_changes_and_deletions(self):
+        spam = self.report(self.reporters[0])
+        fraud = self.report(self.reporters[1], "FRAUD")
+
+        fraud.status = "DISMISSED"
+        fraud.save()
+        target = ReportTarget.objects.get()
+        self.assertEqual(target.report_count, 1)
+        self.assertEqual(target.severity, REPORT_SEVERITY["SPAM"])
+
+        spam.delete()
+        target.refresh_from_db()
+        self.assertEqual(target.report_count, 0)
+        self.assertEqual(target.severity, 0)
+        self.assertEqual(target.latest_report_at, fraud.created_at)
+
+    def test_admin_notification_claimed_once_per_interval(self):
+        target = self.report(self.reporters[0]).target
+        self.assertTrue(target.claim_admin_notification())
+        self.assertFalse(target.claim_admin_notification())
+
+        ReportTarget.objects.filter(pk=target.pk).update(
+            admins_notified_at=timezone.now() - ADMIN_NOTIFICATION_INTERVAL
+        )
+        self.assertTrue(target.claim_admin_notification())
@@ -1,8 +1,11 @@
+from django.db import connection
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.models import ContentType
-from reports.models import Report
+from reports.models import Report, ReportTarget
+from reports.views import REPORTS_PER_PAGE
 from messaging.models import Message
 from listings.models import Listing, Review
 from booking.models import Booking
@@ -156,6 +159,68 @@ class ReportItemViewTest(TestCase):
         ).first()
         self.assertIsNotNone(admin_notification)
 
+    def test_repeated_reports_are_aggregated(self):
+        """Reports of one listing share a target and admins are told once"""
+        url = reverse("report_item", args=["listing", self.listing.id])
+        data = {"report_type": "SPAM", "description": "Spam listing"}
+        for username in ("parker", "otheruser"):
+            self.client.login(username=username, password="testpass123")
+            self.client.post(url, data)
+
+        target = ReportTarget.objects.get()
+        self.assertEqual(target.report_count, 2)
+        self.assertEqual(target.reports.count(), 2)
+        self.assertEqual(
+            Notification.objects.filter(
+                recipient=self.admin_user, notification_type="ADMIN_ALERT"
+            ).count(),
+            1,
+        )
+
+        # Once the interval has passed the next report notifies again
+        ReportTarget.objects.update(admins_notified_at=None)
+        self.client.login(username="parkowner", password="testpass123")
+        self.client.post(url, data)
+        alert = Notification.objects.filter(
+            recipient=self.admin_user, notification_type="ADMIN_ALERT"
+        ).latest("pk")
+        self.assertIn("It has 3 open reports.", alert.content)
+
+    def test_admins_notified_with_one_insert(self):
+        """Every admin gets an alert, written with a single INSERT"""
+        for i in range(4):
+            User.objects.create_user(
+                username=f"admin{i}", password="adminpass", is_staff=True
+            )
+        self.client.login(username="parker", password="testpass123")
+        url = reverse("report_item", args=["listing", self.listing.id])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(url, {"report_type": "SPAM", "description": "Spam"})
+
+        inserts = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith('INSERT INTO "accounts_notification"')
+        ]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            Notification.objects.filter(notification_type="ADMIN_ALERT").count(), 5
+        )
+
+    def test_report_same_item_twice(self):
+        """A user's second open report of the same item is not stored"""
+        self.client.login(username="parker", password="testpass123")
+        url = reverse("report_item", args=["listing", self.listing.id])
+        data = {"report_type": "SPAM", "description": "Spam listing"}
+        self.client.post(url, data)
+        response = self.client.post(url, data)
+
+        self.assertRedirects(
+            response, reverse("view_listings"), fetch_redirect_response=False
+        )
+        self.assertEqual(Report.objects.count(), 1)
+        self.assertIn("already reported", self.client.session["success_message"])
+
     def test_report_nonexistent_object(self):
         """Test handling of reports for objects that don't exist"""
         self.client.login(username="parker", password="testpass123")
@@ -425,6 +490,18 @@ class AdminReportsViewTest(TestCase):
         self.assertEqual(response.context["current_status"], "ALL")
         self.assertEqual(len(response.context["reports"]), 4)
 
+    def test_admin_reports_unknown_status_counted_from_query(self):
+        """A status without a precomputed count is counted from the filter"""
+        self.client.login(username="admin", password="adminpass")
+
+        # An empty status applies no filter
+        response = self.client.get(f"{self.admin_reports_url}?status=")
+        self.assertEqual(len(response.context["reports"]), 4)
+        self.assertEqual(response.context["reports"].paginator.count, 4)
+
+        response = self.client.get(f"{self.admin_reports_url}?status=UNKNOWN")
+        self.assertEqual(response.context["reports"].paginator.count, 0)
+
     def test_admin_reports_view_filter_by_report_type(self):
         """Test filtering reports by report type"""
         self.client.login(username="admin", password="adminpass")
@@ -447,6 +524,206 @@ class AdminReportsViewTest(TestCase):
         self.assertEqual(response.context["status_counts"]["DISMISSED"], 1)
         self.assertEqual(response.context["status_counts"]["ALL"], 4)
 
+    def test_admin_reports_paginated_with_targets(self):
+        """Reports are paginated and show their targets, in a fixed number of queries"""
+        review = Review.objects.create(
+            booking=self.booking,
+            listing=self.listing,
+            user=self.regular_user,
+            rating=2,
+            comment="Too small",
+        )
+        review_content_type = ContentType.objects.get_for_model(Review)
+        Report.objects.bulk_create(
+            Report(
+                reporter=self.regular_user,
+                content_type=review_content_type,
+                object_id=review.id,
+                report_type="SPAM",
+                description=f"Review report {i}",
+                status="PENDING",
+            )
+            for i in range(REPORTS_PER_PAGE)
+        )
+        self.client.login(username="admin", password="adminpass")
+
+        # Reporters and reported objects are loaded for the whole page at once
+        response = self.client.get(self.admin_reports_url)
+        metrics = response.request_metrics
+        self.assertEqual(len(response.context["reports"]), REPORTS_PER_PAGE)
+        self.assertEqual(response.context["reports"].paginator.num_pages, 2)
+        self.assertEqual(response.context["status_counts"]["PENDING"], 21)
+        self.assertContains(response, "Too small")
+        self.assertContains(response, "?status=PENDING&page=2")
+        self.assertEqual(metrics.repeated_queries(), [])
+
+        response = self.client.get(self.admin_reports_url, {"page": 2})
+        self.assertEqual(
+            [report.id for report in response.context["reports"]],
+            [self.pending_report.id],
+        )
+        self.assertContains(response, "Test Message")
+
+    def test_admin_reports_deleted_target(self):
+        """A report whose target was deleted is still listed"""
+        self.message.delete()
+        self.client.login(username="admin", password="adminpass")
+        response = self.client.get(self.admin_reports_url)
+        self.assertContains(response, "The reported message has been deleted")
+
+    def test_moderation_queue(self):
+        """Targets with open reports, most severe first, counted once each"""
+        fraud_listing = Listing.objects.create(
+            user=self.admin_user,
+            title="Fraud Listing",
+            location="Elsewhere",
+            rent_per_hour=10.00,
+            description="Too good to be true",
+        )
+        Report.objects.create(
+            reporter=self.regular_user,
+            content_type=self.listing_content_type,
+            object_id=fraud_listing.id,
+            report_type="FRAUD",
+            description="Fraud",
+        )
+        url = reverse("admin_report_targets")
+
+        self.client.login(username="user", password="userpass")
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.login(username="admin", password="adminpass")
+        response = self.client.get(url)
+        targets = list(response.context["targets"])
+        # The message has one pending report, the first listing one being
+        # reviewed; resolved and dismissed reports are not counted
+        self.assertEqual(
+            [target.object_id for target in targets],
+            [fraud_listing.id, self.message.id, self.listing.id],
+        )
+        self.assertEqual([target.report_count for target in targets], [1, 1, 1])
+        self.assertContains(response, "Fraud Listing")
+        self.assertContains(response, "Critical")
+
+    def test_admin_reports_filtered_by_target(self):
+        """The reports of one target can be listed on their own"""
+        self.client.login(username="admin", password="adminpass")
+        response = self.client.get(
+            self.admin_reports_url,
+            {"status": "ALL", "target": self.pending_report.target_id},
+        )
+        self.assertEqual(
+            {report.id for report in response.context["reports"]},
+            {self.pending_report.id, self.resolved_report.id},
+        )
+        self.assertContains(response, f"target={self.pending_report.target_id}")
+
+        response = self.client.get(self.admin_reports_url, {"target": "bad"})
+        self.assertEqual(len(response.context["reports"]), 0)
+
+    def test_bulk_resolve_selected_reports(self):
+        """Selected open reports are resolved with one UPDATE and one INSERT"""
+        self.client.login(username="admin", password="adminpass")
+        ids = [
+            self.pending_report.id,
+            self.reviewing_report.id,
+            self.resolved_report.id,
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse("admin_reports_bulk"),
+                {"action": "resolve", "report_ids": ids, "admin_notes": "Handled"},
+                headers={"X-Requested-With": "XMLHttpRequest"},
+            )
+        self.assertEqual(response.json()["updated"], 2)
+        self.assertEqual(response.json()["status"], "RESOLVED")
+
+        statements = [query["sql"] for query in queries.captured_queries]
+        self.assertEqual(
+            len(
+                [sql for sql in statements if sql.startswith('UPDATE "reports_report"')]
+            ),
+            1,
+        )
+        self.assertEqual(
+            len(
+                [
+                    sql
+                    for sql in statements
+                    if sql.startswith('INSERT INTO "accounts_notification"')
+                ]
+            ),
+            1,
+        )
+
+        self.assertEqual(
+            Report.objects.filter(status="RESOLVED", admin_notes="Handled").count(), 2
+        )
+        notifications = Notification.objects.filter(
+            recipient=self.regular_user, notification_type="REPORT"
+        )
+        self.assertEqual(
+            {notification.subject for notification in notifications},
+            {
+                f"Report #{self.pending_report.id} resolved",
+                f"Report #{self.reviewing_report.id} resolved",
+            },
+        )
+        self.assertIn("Admin note: Handled", notifications[0].content)
+        # The targets no longer count the closed reports
+        self.assertFalse(ReportTarget.objects.filter(report_count__gt=0).exists())
+
+    def test_bulk_dismiss_all_reports_for_target(self):
+        """Every open report about one object can be dismissed at once"""
+        other_report = Report.objects.create(
+            reporter=self.admin_user,
+            content_type=self.message_content_type,
+            object_id=self.message.id,
+            report_type="SPAM",
+            description="Another report",
+        )
+        self.client.login(username="admin", password="adminpass")
+        next_url = f"{self.admin_reports_url}?status=ALL"
+        response = self.client.post(
+            reverse("admin_reports_bulk"),
+            {
+                "action": "dismiss",
+                "target": self.pending_report.target_id,
+                "next": next_url,
+            },
+            follow=True,
+        )
+        self.assertRedirects(response, next_url)
+        self.assertContains(response, "2 reports dismissed.")
+        other_report.refresh_from_db()
+        self.pending_report.refresh_from_db()
+        self.assertEqual(other_report.status, "DISMISSED")
+        self.assertEqual(self.pending_report.status, "DISMISSED")
+        self.assertEqual(self.pending_report.resolved_by, self.admin_user)
+        # Reports about other objects are untouched
+        self.reviewing_report.refresh_from_db()
+        self.assertEqual(self.reviewing_report.status, "REVIEWING")
+
+    def test_bulk_action_requires_admin_and_valid_input(self):
+        url = reverse("admin_reports_bulk")
+        data = {"action": "resolve", "report_ids": [self.pending_report.id]}
+        self.client.login(username="user", password="userpass")
+        self.assertEqual(self.client.post(url, data).status_code, 403)
+
+        self.client.login(username="admin", password="adminpass")
+        self.assertEqual(self.client.get(url).status_code, 405)
+        response = self.client.post(
+            url,
+            {"action": "delete", "report_ids": [self.pending_report.id]},
+            follow=True,
+        )
+        self.assertContains(response, "Choose an action")
+        # Redirects elsewhere are ignored
+        response = self.client.post(url, {**data, "next": "https://example.com/"})
+        self.assertRedirects(response, self.admin_reports_url)
+        self.pending_report.refresh_from_db()
+        self.assertEqual(self.pending_report.status, "RESOLVED")
+
     def test_admin_report_detail_view_requires_admin(self):
         """Test that only admins can access the report detail page"""
         # Unauthenticated user should be redirected to login
@@ -8,6 +8,8 @@ urlpatterns = [
         name="admin_report_detail",
     ),
     path("admin/", views.admin_reports, name="admin_reports"),
+    path("admin/queue/", views.admin_report_targets, name="admin_report_targets"),
+    path("admin/bulk/", views.admin_reports_bulk, name="admin_reports_bulk"),
     path(
         "<str:content_type_str>/<int:object_id>/", views.report_item, name="report_item"
     ),
@@ -1,13 +1,51 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.contenttypes.models import ContentType
-from django.http import HttpResponseForbidden
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count
+from django.http import HttpResponseForbidden, JsonResponse
+from django.template.defaultfilters import pluralize
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_POST
 from .forms import ReportForm
 from messaging.models import Message
 from listings.models import Listing, Review
-from .models import Report
-from accounts.models import Notification
+from .models import OPEN_STATUSES, Report, ReportTarget, refresh_report_targets
+from accounts.counters import reset_counts
+from accounts.models import Notification, create_notifications
 from django.contrib.auth.models import User
+from urllib.parse import urlencode
+
+# Reports listed per page of the moderation queue
+REPORTS_PER_PAGE = 20
+
+# Bulk moderation actions and the status they give the reports
+BULK_ACTIONS = {"resolve": "RESOLVED", "dismiss": "DISMISSED"}
+
+
+def notify_admins_of_report(sender, report, content_type_str):
+    content = f"""A new {report.get_report_type_display().lower()} report has been submitted for a
+                            {content_type_str}. Please review it."""
+    if report.target.report_count > 1:
+        content += f" It has {report.target.report_count} open reports."
+    create_notifications(
+        [
+            Notification(
+                sender=sender,
+                recipient_id=admin_id,
+                subject=f"New Report: {report.get_report_type_display()}",
+                content=content,
+                notification_type="ADMIN_ALERT",
+            )
+            for admin_id in User.objects.filter(is_staff=True).values_list(
+                "pk", flat=True
+            )
+        ]
+    )
 
 
 @login_required
@@ -56,29 +94,36 @@ def report_item(request, content_type_str, object_id):
     if request.method == "POST":
         form = ReportForm(request.POST)
         if form.is_valid():
-            report = form.save(commit=False)
-            report.reporter = request.user
-            report.content_type = content_type
-            report.object_id = object_id
-            report.save()
-
-            # Store the success message in the session
-            request.session["success_message"] = (
-                "Thank you for your report. Our team will review it shortly."
-            )
+            target = ReportTarget.for_object(content_type.pk, object_id)
+            already_reported = target.reports.filter(
+                reporter=request.user, status__in=OPEN_STATUSES
+            ).exists()
+
+            if already_reported:
+                # One open report per user and object is enough
+                request.session["success_message"] = (
+                    f"You have already reported this {content_type_str}. "
+                    "Our team will review it shortly."
+                )
+            else:
+                report = form.save(commit=False)
+                report.reporter = request.user
+                report.content_type = content_type
+                report.object_id = object_id
+                report.target = target
+                report.save()
 
-            # Notify admins about the new report
-            admins = User.objects.filter(is_staff=True)
-            for admin in admins:
-                Notification.objects.create(
-                    sender=request.user,
-                    recipient=admin,
-                    subject=f"New Report: {report.get_report_type_display()}",
-                    content=f"""A new {report.get_report_type_display().lower()} report has been submitted for a
-                            {content_type_str}. Please review it.""",
-                    notification_type="ADMIN_ALERT",
+                # Store the success message in the session
+                request.session["success_message"] = (
+                    "Thank you for your report. Our team will review it shortly."
                 )
 
+                # Notify admins about the new report, at most once per
+                # ADMIN_NOTIFICATION_INTERVAL and reported object however
+                # many users report it
+                if target.claim_admin_notification():
+                    notify_admins_of_report(request.user, report, content_type_str)
+
             # Redirect based on content type
             if content_type_str == "message":
                 return redirect("inbox")
@@ -100,6 +145,15 @@ def report_item(request, content_type_str, object_id):
     return render(request, "reports/report_form.html", context)
 
 
+def report_status_counts():
+    """Return the number of reports per status, plus "ALL", in one query."""
+    status_counts = {status: 0 for status, _ in Report.STATUS_CHOICES}
+    for row in Report.objects.order_by().values("status").annotate(count=Count("pk")):
+        status_counts[row["status"]] = row["count"]
+    status_counts["ALL"] = sum(status_counts.values())
+    return status_counts
+
+
 @login_required
 def admin_reports(request):
     """View for administrators to see all reports."""
@@ -121,31 +175,158 @@ def admin_reports(request):
     if report_type:
         reports_query = reports_query.filter(report_type=report_type)
 
-    # Order by creation date (newest first)
-    reports = reports_query.order_by("-created_at")
+    target = None
+    target_id = request.GET.get("target")
+    if target_id:
+        try:
+            target = ReportTarget.objects.select_related("content_type").get(
+                pk=target_id
+            )
+        except (ReportTarget.DoesNotExist, ValueError):
+            reports_query = reports_query.none()
+        else:
+            reports_query = reports_query.filter(target=target)
+
+    # Order by creation date (newest first), loading what each row shows
+    reports = (
+        reports_query.select_related("reporter", "content_type")
+        .prefetch_related("reported_object")
+        .order_by("-created_at", "-pk")
+    )
 
     # Count by status for filter UI
-    status_counts = {
-        "PENDING": Report.objects.filter(status="PENDING").count(),
-        "REVIEWING": Report.objects.filter(status="REVIEWING").count(),
-        "RESOLVED": Report.objects.filter(status="RESOLVED").count(),
-        "DISMISSED": Report.objects.filter(status="DISMISSED").count(),
-        "ALL": Report.objects.count(),
-    }
+    status_counts = report_status_counts()
+
+    paginator = Paginator(reports, REPORTS_PER_PAGE)
+    if not (report_type or target_id) and status_filter in status_counts:
+        # Already counted above, no need for another COUNT query
+        paginator.count = status_counts[status_filter]
+    page = paginator.get_page(request.GET.get("page"))
+
+    query = {"status": status_filter}
+    if report_type:
+        query["type"] = report_type
+    if target is not None:
+        query["target"] = target.pk
 
     return render(
         request,
         "reports/admin_reports.html",
         {
-            "reports": reports,
+            "reports": page,
             "current_status": status_filter,
             "current_type": report_type or "ALL",
             "status_counts": status_counts,
             "report_types": Report.REPORT_TYPES,
+            "query": urlencode(query),
+            "target": target,
         },
     )
 
 
+@login_required
+def admin_report_targets(request):
+    """
+    The moderation queue: every object with open reports, most severe and
+    most reported first, with its reports counted once.
+    """
+    if not request.user.is_staff:
+        return HttpResponseForbidden("You do not have permission to view reports.")
+
+    # Matches the partial report_target_queue_idx index
+    targets = (
+        ReportTarget.objects.filter(report_count__gt=0)
+        .select_related("content_type")
+        .prefetch_related("reported_object")
+        .order_by("-severity", "-report_count", "-latest_report_at")
+    )
+    page = Paginator(targets, REPORTS_PER_PAGE).get_page(request.GET.get("page"))
+    return render(request, "reports/admin_report_targets.html", {"targets": page})
+
+
+def reporter_notification(sender, report, admin_notes=""):
+    """Return the unsaved notification telling a reporter their report was closed."""
+    content = f"""Your report about a {report.get_report_type_display().lower()}
+                                {report.content_type.model} has been {report.status.lower()}."""
+
+    # Add admin notes if provided
+    if admin_notes:
+        content += f"\n\nAdmin note: {admin_notes}"
+
+    return Notification(
+        sender=sender,
+        recipient_id=report.reporter_id,
+        subject=f"Report #{report.id} {report.status.lower()}",
+        content=content,
+        notification_type="REPORT",
+    )
+
+
+@login_required
+@require_POST
+def admin_reports_bulk(request):
+    """
+    Resolve or dismiss many open reports at once: the ones picked in the
+    list (report_ids) or every open report about one target. The reports
+    are changed with one UPDATE and their reporters notified with one
+    INSERT, in a single transaction.
+    """
+    if not request.user.is_staff:
+        return HttpResponseForbidden("You do not have permission to handle reports.")
+
+    next_url = request.POST.get("next")
+    if not url_has_allowed_host_and_scheme(
+        next_url, {request.get_host()}, request.is_secure()
+    ):
+        next_url = reverse("admin_reports")
+
+    new_status = BULK_ACTIONS.get(request.POST.get("action"))
+    report_ids = [pk for pk in request.POST.getlist("report_ids") if pk.isdigit()]
+    target_id = request.POST.get("target", "")
+    if new_status is None or not (report_ids or target_id.isdigit()):
+        messages.error(request, "Choose an action and the reports to apply it to.")
+        return redirect(next_url)
+    admin_notes = request.POST.get("admin_notes", "")
+
+    reports = Report.objects.filter(status__in=OPEN_STATUSES)
+    if report_ids:
+        reports = reports.filter(pk__in=report_ids)
+    else:
+        reports = reports.filter(target_id=target_id)
+
+    with transaction.atomic():
+        selected = list(
+            reports.select_related("content_type").select_for_update(of=("self",))
+        )
+        updated = Report.objects.filter(
+            pk__in=[report.pk for report in selected]
+        ).update(
+            status=new_status,
+            admin_notes=admin_notes,
+            resolved_by=request.user,
+            updated_at=timezone.now(),
+        )
+        for report in selected:
+            report.status = new_status
+        create_notifications(
+            [
+                reporter_notification(request.user, report, admin_notes)
+                for report in selected
+            ]
+        )
+        # queryset.update() skips the Report receivers
+        refresh_report_targets({report.target_id for report in selected})
+        reset_counts(["pending_reports"])
+
+    message = f"{updated} report{pluralize(updated)} {new_status.lower()}."
+    if request.headers.get("X-Requested-With") == "XMLHttpRequest":
+        return JsonResponse(
+            {"updated": updated, "status": new_status, "message": message}
+        )
+    messages.success(request, message)
+    return redirect(next_url)
+
+
 @login_required
 def admin_report_detail(request, report_id):
     """View for administrators to handle individual reports."""
@@ -183,21 +364,7 @@ def admin_report_detail(request, report_id):
 
                 # Optionally notify the reporter about status change
                 if new_status in ["RESOLVED", "DISMISSED"]:
-                    # Create notification with new format
-                    notification_content = f"""Your report about a {report.get_report_type_display().lower()}
-                                {report.content_type.model} has been {new_status.lower()}."""
-
-                    # Add admin notes if provided
-                    if admin_notes:
-                        notification_content += f"\n\nAdmin note: {admin_notes}"
-
-                    Notification.objects.create(
-                        sender=request.user,
-                        recipient=report.reporter,
-                        subject=f"Report #{report.id} {new_status.lower()}",
-                        content=notification_content,
-                        notification_type="REPORT",
-                    )
+                    reporter_notification(request.user, report, admin_notes).save()
 
                 return redirect("admin_reports")
 
@@ -0,0 +1,68 @@
+// Keeps the navbar badges current and shows a toast for new notifications,
+// messages and booking changes, using the server-sent events of live_updates.
+(function() {
+  if (!window.EventSource) {
+    return;
+  }
+  const url = document.currentScript.dataset.url;
+
+  function updateCounts(counts) {
+    Object.keys(counts).forEach(function(name) {
+      document.querySelectorAll('[data-live-count="' + name + '"]').forEach(function(badge) {
+        badge.textContent = counts[name];
+        badge.classList.toggle('d-none', counts[name] <= 0);
+      });
+    });
+    document.querySelectorAll('[data-live-indicator]').forEach(function(indicator) {
+      const names = indicator.dataset.liveIndicator.split(' ');
+      if (!names.some(name => name in counts)) {
+        return;
+      }
+      const total = names.reduce(function(sum, name) {
+        const badge = document.querySelector('[data-live-count="' + name + '"]');
+        const value = name in counts ? counts[name] : parseInt(badge ? badge.textContent : '0', 10);
+        return sum + (value || 0);
+      }, 0);
+      indicator.classList.toggle('d-none', total <= 0);
+    });
+  }
+
+  function showToast(title, body) {
+    const container = document.getElementById('liveToasts');
+    if (!container || !window.bootstrap) {
+      return;
+    }
+    const toast = document.createElement('div');
+    toast.className = 'toast';
+    toast.setAttribute('role', 'status');
+    const header = document.createElement('div');
+    header.className = 'toast-header';
+    header.innerHTML = '<strong class="me-auto"></strong>' +
+      '<button type="button" class="btn-close" data-bs-dismiss="toast" aria-label="Close"></button>';
+    header.querySelector('strong').textContent = title;
+    const content = document.createElement('div');
+    content.className = 'toast-body';
+    content.textContent = body;
+    toast.appendChild(header);
+    toast.appendChild(content);
+    container.appendChild(toast);
+    toast.addEventListener('hidden.bs.toast', () => toast.remove());
+    new bootstrap.Toast(toast).show();
+  }
+
+  const source = new EventSource(url);
+  source.addEventListener('counters', function(event) {
+    updateCounts(JSON.parse(event.data));
+  });
+  source.addEventListener('notification', function(event) {
+    showToast('New notification', JSON.parse(event.data).subject);
+  });
+  source.addEventListener('message', function(event) {
+    const data = JSON.parse(event.data);
+    showToast('New message from ' + data.sender, data.subject || '(No Subject)');
+  });
+  source.addEventListener('booking', function(event) {
+    const data = JSON.parse(event.data);
+    showToast('Booking ' + data.status.toLowerCase(), data.listing);
+  });
+})();